@@ -0,0 +1,430 @@
+"""
+Columnar in-memory snapshot of the invoice lines for the analytics API.
+
+Top customers, top products, sales by category and month-over-month
+growth are group-bys over every invoice line. Run as ORM queries they
+would keep a web worker busy for seconds, so each worker keeps the
+lines it needs as NumPy arrays, one element per line:
+
+    invoice, day, month, customer, product, quantity, taxable
+
+(int32 except taxable, about 32 bytes a line). A group-by is then a
+boolean mask plus np.bincount(), and a top-N is np.argpartition() on the
+totals: 10-20 ms for a million lines, against half a second in SQL.
+
+Invoice lines are only ever inserted, so every query first fetches the
+lines with an id above the highest one already loaded and appends them.
+The arrays grow by doubling, and readers slice them to the length they
+saw, so appends never disturb a query in progress. Customers are coded
+by the invoice's customer_id; an invoice not linked to a customer is
+coded by its printed name instead. The product and customer lookups are
+re-read whenever new lines arrive.
+
+edit_invoice and delete_customer call refresh_invoices(ids) after they
+commit, which re-codes those invoices' lines in copies of the customer
+and date columns and publishes the copies, so a query in progress keeps
+the columns it started with. Other workers do not see those calls, and
+product category changes are not tracked at all, so the snapshot also
+reloads from scratch once it is older than max_age seconds. One request
+does the reload while the others keep querying the previous arrays.
+
+NumPy is imported by the functions that use it, so importing this module
+(as the app does at startup) does not load it.
+"""
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import select
+
+from models import Category, Customer, Invoice, InvoiceItem, Product, db
+
+LOAD_CHUNK = 50_000     # lines fetched per query
+INITIAL_CAPACITY = 1024
+
+COLUMNS = {
+    'invoice': 'int32',
+    'day': 'int32',       # days since 1970-01-01
+    'month': 'int32',     # months since 1970-01
+    'customer': 'int32',  # index into customers
+    'product': 'int32',
+    'quantity': 'int32',
+    'taxable': 'float64',
+}
+RECODED_COLUMNS = ('customer', 'day', 'month')  # what refresh_invoices() changes
+
+NO_CATEGORY = -1
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_number(value):
+    """Days since 1970-01-01 of a date or datetime."""
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def month_label(month):
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+def _line_rows(after_id, limit):
+    item = InvoiceItem.__table__
+    inv = Invoice.__table__
+    return db.session.execute(
+        select(item.c.id, item.c.invoice_id, inv.c.created_at, inv.c.customer_id, inv.c.customer_name,
+               item.c.product_id, item.c.quantity, item.c.taxable_value)
+        .select_from(item.join(inv, inv.c.id == item.c.invoice_id))
+        .where(item.c.id > after_id)
+        .order_by(item.c.id)
+        .limit(limit)
+    ).all()
+
+
+def _days(created):
+    # toordinal() is far quicker than NumPy converting datetime objects
+    import numpy as np
+    days = np.array([value.toordinal() for value in created], dtype=np.int32) - EPOCH_ORDINAL
+    return days, days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+
+
+class Lines:
+    """
+    A consistent read-only view of the snapshot: the column arrays cut to
+    one length, plus the lookups needed to label the results.
+    """
+
+    def __init__(self, columns, customers, category_of, product_names, category_names, customer_names):
+        self.columns = columns
+        self.customers = customers
+        self.customer_names = customer_names
+        self.category_of = category_of
+        self.product_names = product_names
+        self.category_names = category_names
+
+    def __len__(self):
+        return len(self.columns['taxable'])
+
+    def __getattr__(self, name):
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def categories(self, rows=slice(None)):
+        return self.category_of[self.product[rows]]
+
+    def customer_of(self, code):
+        """(customer_id or None, name) for a customer code."""
+        key, printed = self.customers[code]
+        if isinstance(key, int):
+            return key, self.customer_names.get(key, printed)
+        return None, printed
+
+    def select(self, date_from=None, date_to=None, customer_id=None, product_id=None, category_id=None):
+        """Boolean mask of the lines matching every filter given (dates inclusive)."""
+        import numpy as np
+        mask = np.ones(len(self), dtype=bool)
+        if date_from is not None:
+            mask &= self.day >= day_number(date_from)
+        if date_to is not None:
+            mask &= self.day <= day_number(date_to)
+        if customer_id is not None:
+            codes = [code for code, (key, _) in enumerate(self.customers) if key == customer_id]
+            mask &= self.customer == (codes[0] if codes else -1)
+        if product_id is not None:
+            mask &= self.product == product_id
+        if category_id is not None:
+            mask &= self.categories() == category_id
+        return mask
+
+
+def _empty_columns():
+    import numpy as np
+    return {name: np.empty(INITIAL_CAPACITY, dtype) for name, dtype in COLUMNS.items()}
+
+
+def _customer_code(customer_id, name, customers, codes):
+    # an int key is a customer id; a str key the name on an unlinked invoice
+    key = name if customer_id is None else customer_id
+    if key not in codes:
+        codes[key] = len(customers)
+        customers.append((key, name))
+    return codes[key]
+
+
+def _append(columns, size, rows, customers, codes):
+    """Write `rows` after the first `size` lines, growing the arrays if needed."""
+    import numpy as np
+    ids, invoices, created, customer_ids, names, products, quantities, taxable = zip(*rows)
+    days, months = _days(created)
+    chunk = {
+        'invoice': invoices,
+        'day': days,
+        'month': months,
+        'customer': [_customer_code(cid, name, customers, codes) for cid, name in zip(customer_ids, names)],
+        'product': products,
+        'quantity': quantities,
+        'taxable': taxable,
+    }
+
+    end = size + len(rows)
+    capacity = len(columns['taxable'])
+    if end > capacity:
+        while end > capacity:
+            capacity *= 2
+        grown = {}
+        for name, column in columns.items():
+            grown[name] = np.empty(capacity, column.dtype)
+            grown[name][:size] = column[:size]
+        columns = grown
+
+    # readers slice to the published size, so nothing past it is visible yet
+    for name, values in chunk.items():
+        columns[name][size:end] = values
+    return columns, end
+
+
+def _read_lookups(products_sold):
+    """(category_of array indexed by product id, product names, category names, customer names)."""
+    import numpy as np
+    products = db.session.query(Product.id, Product.name, Product.category_id).all()
+    categories = dict(db.session.query(Category.id, Category.name).all())
+    customers = dict(db.session.query(Customer.id, Customer.customer_name).all())
+
+    top = max([row.id for row in products] + [int(products_sold.max(initial=0))])
+    category_of = np.full(top + 1, NO_CATEGORY, np.int32)
+    for row in products:
+        if row.category_id in categories:
+            category_of[row.id] = row.category_id
+    return category_of, {row.id: row.name for row in products}, categories, customers
+
+
+class SalesSnapshot:
+    def __init__(self, max_age=None):
+        self.max_age = max_age  # seconds between full reloads; None reloads only when invalidated
+
+        self._refresh_lock = threading.Lock()  # one loader at a time
+        self._lock = threading.Lock()          # guards publishing a new state
+        self._columns = None  # allocated by the first load
+        self._size = 0
+        self._last_id = 0
+        self._customers = []       # customer code -> (customer_id or unlinked name, printed name)
+        self._customer_codes = {}  # and back
+        self._lookups = None
+        self._loaded_at = None
+
+    def __len__(self):
+        return self._size
+
+    def _stale(self):
+        if self._loaded_at is None:
+            return True
+        return self.max_age is not None and time.monotonic() - self._loaded_at > self.max_age
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    # ---------------- LOADING ----------------
+    def _pull(self, columns, size, last_id, customers, codes):
+        """Append every line with an id above `last_id`; returns (columns, size, last_id)."""
+        while True:
+            rows = _line_rows(last_id, LOAD_CHUNK)
+            if rows:
+                columns, size = _append(columns, size, rows, customers, codes)
+                last_id = rows[-1].id
+            if len(rows) < LOAD_CHUNK:
+                return columns, size, last_id
+
+    def _publish(self, columns, size, last_id, customers, codes):
+        # the lookups must cover every product in the lines made visible with them
+        lookups = _read_lookups(columns['product'][:size])
+        with self._lock:
+            self._columns = columns
+            self._size = size
+            self._customers = customers
+            self._customer_codes = codes
+            self._lookups = lookups
+        self._last_id = last_id
+
+    def rebuild(self):
+        with self._refresh_lock:
+            self._build()
+
+    def _build(self):
+        customers, codes = [], {}
+        self._publish(*self._pull(_empty_columns(), 0, 0, customers, codes), customers, codes)
+        self._loaded_at = time.monotonic()
+
+    def refresh(self):
+        """
+        Bring the snapshot up to date: a full reload if stale, else new lines
+        only. One request reloads at a time; the others keep querying the
+        arrays already published, and wait only when there are none yet.
+        """
+        if self._stale():
+            if not self._refresh_lock.acquire(blocking=self._columns is None):
+                return  # another request is reloading
+            try:
+                if self._stale():  # unless that other request has just finished
+                    self._build()
+                    return
+            finally:
+                self._refresh_lock.release()
+        with self._refresh_lock:
+            customers, codes = self._customers, self._customer_codes
+            columns, size, last_id = self._pull(self._columns, self._size, self._last_id, customers, codes)
+            if size != self._size:
+                self._publish(columns, size, last_id, customers, codes)
+
+    def refresh_invoices(self, ids):
+        """Re-read the customer and date of `ids` after an invoice edit."""
+        import numpy as np
+
+        if self._loaded_at is None:
+            return  # the next query reloads anyway
+        invoices = db.session.query(
+            Invoice.id, Invoice.created_at, Invoice.customer_id, Invoice.customer_name
+        ).filter(Invoice.id.in_(list(ids))).all()
+        if not invoices:
+            return
+
+        with self._refresh_lock:
+            # Lines views share the published arrays, so change copies and swap them in
+            columns = dict(self._columns)
+            for name in RECODED_COLUMNS:
+                columns[name] = columns[name].copy()
+            size = self._size
+            customers, codes = self._customers, self._customer_codes
+            for invoice in invoices:
+                rows = np.flatnonzero(columns['invoice'][:size] == invoice.id)
+                days, months = _days([invoice.created_at])
+                columns['customer'][rows] = _customer_code(
+                    invoice.customer_id, invoice.customer_name, customers, codes)
+                columns['day'][rows] = days[0]
+                columns['month'][rows] = months[0]
+            with self._lock:
+                self._columns = columns
+
+    def lines(self):
+        """Refresh, then return a Lines view that later appends do not change."""
+        self.refresh()
+        with self._lock:
+            size = self._size
+            columns = {name: column[:size] for name, column in self._columns.items()}
+            customers = self._customers[:]
+            category_of, product_names, category_names, customer_names = self._lookups
+        return Lines(columns, customers, category_of, product_names, category_names, customer_names)
+
+
+# ---------------- QUERIES ----------------
+def top_indexes(totals, limit):
+    """Indexes of the `limit` largest non-zero totals, largest first."""
+    import numpy as np
+    candidates = np.flatnonzero(totals)
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-totals[candidates], limit - 1)[:limit]]
+    return candidates[np.argsort(-totals[candidates], kind='stable')]
+
+
+def _share(value, total):
+    return round(100 * value / total, 2) if total else 0.0
+
+
+def top_customers(lines, limit, **filters):
+    import numpy as np
+    rows = lines.select(**filters)
+    customer = lines.customer[rows]
+    size = len(lines.customers)
+    value = np.bincount(customer, weights=lines.taxable[rows], minlength=size)
+    quantity = np.bincount(customer, weights=lines.quantity[rows], minlength=size)
+    # an invoice's lines all carry its customer, so one scatter per invoice id
+    # leaves each selected invoice counted once, against that customer
+    invoice = lines.invoice[rows]
+    customer_of = np.full(int(invoice.max(initial=0)) + 1, -1, np.int32)
+    customer_of[invoice] = customer
+    customer_of = customer_of[customer_of >= 0]
+    invoices = np.bincount(customer_of, minlength=size)
+
+    total = value.sum()
+    results = []
+    for i in top_indexes(value, limit):
+        customer_id, name = lines.customer_of(i)
+        results.append({
+            'customer_id': customer_id,
+            'customer': name,
+            'taxable_value': round(float(value[i]), 2),
+            'quantity': int(quantity[i]),
+            'invoices': int(invoices[i]),
+            'share': _share(value[i], total),
+        })
+    return results
+
+
+def top_products(lines, limit, **filters):
+    import numpy as np
+    rows = lines.select(**filters)
+    product = lines.product[rows]
+    size = len(lines.category_of)
+    value = np.bincount(product, weights=lines.taxable[rows], minlength=size)
+    quantity = np.bincount(product, weights=lines.quantity[rows], minlength=size)
+
+    total = value.sum()
+    results = []
+    for i in top_indexes(value, limit):
+        category_id = int(lines.category_of[i])
+        results.append({
+            'product_id': int(i),
+            'product': lines.product_names.get(i, f"Product {i}"),
+            'category_id': None if category_id == NO_CATEGORY else category_id,
+            'category': lines.category_names.get(category_id, "Uncategorised"),
+            'taxable_value': round(float(value[i]), 2),
+            'quantity': int(quantity[i]),
+            'share': _share(value[i], total),
+        })
+    return results
+
+
+def category_summary(lines, **filters):
+    """Sales per category, largest first; lines of unknown products count as uncategorised."""
+    import numpy as np
+    rows = lines.select(**filters)
+    # shift by one so NO_CATEGORY (-1) lands in bin 0
+    category = lines.categories(rows) + 1
+    size = max(lines.category_names, default=0) + 2
+    value = np.bincount(category, weights=lines.taxable[rows], minlength=size)
+    quantity = np.bincount(category, weights=lines.quantity[rows], minlength=size)
+    sold = np.zeros(len(lines.category_of), dtype=bool)
+    sold[lines.product[rows]] = True
+    products = np.bincount(lines.category_of[sold] + 1, minlength=size)
+
+    total = value.sum()
+    return [{
+        'category_id': None if i == 0 else int(i - 1),
+        'category': lines.category_names.get(int(i - 1), "Uncategorised"),
+        'taxable_value': round(float(value[i]), 2),
+        'quantity': int(quantity[i]),
+        'products': int(products[i]),
+        'share': _share(value[i], total),
+    } for i in top_indexes(value, size)]
+
+
+def monthly_sales(lines, **filters):
+    """Sales per calendar month with growth over the month before (None after an empty month)."""
+    import numpy as np
+    rows = lines.select(**filters)
+    month = lines.month[rows]
+    if not len(month):
+        return []
+    first = int(month.min())
+    value = np.bincount(month - first, weights=lines.taxable[rows])
+
+    series = []
+    previous = None
+    for offset, amount in enumerate(value):
+        series.append({
+            'month': month_label(first + offset),
+            'taxable_value': round(float(amount), 2),
+            'growth': round(100 * (amount - previous) / previous, 2) if previous else None,
+        })
+        previous = amount
+    return series
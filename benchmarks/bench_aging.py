@@ -0,0 +1,126 @@
+"""
+Timing and cross-check for the receivables aging query.
+
+    python -m benchmarks.bench_aging --invoices 100000
+
+Builds a throwaway SQLite database with --invoices open invoices spread
+over the last six months (about half of them part-paid, one in ten for
+a walk-in buyer not linked to a customer), runs
+aging_statement() and checks its buckets against a plain Python pass
+over the same rows.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+import migrations
+from models import db
+from views.reports import AGING_BUCKETS, aging_statement
+
+AS_OF = date(2025, 3, 31)
+
+
+def populate(engine, count, customers):
+    db.metadata.create_all(engine)
+    migrations.upgrade(engine)
+
+    rng = random.Random(7)
+    start = datetime.combine(AS_OF, datetime.min.time()) - timedelta(days=180)
+
+    raw = engine.raw_connection()
+    cur = raw.cursor()
+    cur.executemany(
+        "INSERT INTO customer (id, customer_name, customer_gstin, customer_address, billing_address, "
+        "receivables) VALUES (?, ?, ?, 'addr', 'addr', 0)",
+        [(n + 1, f"Customer {n}", f"33CUST{n:07d}Z5") for n in range(customers)])
+    invoices = []
+    payments = []
+    for n in range(1, count + 1):
+        customer = n % customers
+        created = start + timedelta(minutes=rng.randrange(200 * 24 * 60))  # some after AS_OF
+        amount = round(rng.uniform(100, 50_000), 2)
+        if n % 10:
+            customer_id, name = customer + 1, f"Customer {customer}"
+        else:
+            customer_id, name = None, f"Walk-in {customer}"  # not linked to a customer
+        invoices.append((n, customer_id, name, f"33CUST{customer:07d}Z5", amount,
+                         "addr", "addr", "Pending", created))
+        if n % 2:
+            payments.append((f"PAY-{n}", n, customer, round(amount / 3, 2),
+                             created + timedelta(days=rng.randrange(60)), created))
+    cur.executemany(
+        "INSERT INTO invoice (id, customer_id, customer_name, customer_gstin, amount, customer_address, "
+        "billing_address, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", invoices)
+    cur.executemany(
+        "INSERT INTO payment (payment_no, invoice_id, customer_id, amount, payment_date, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)", payments)
+    raw.commit()
+    raw.close()
+
+
+def reference(engine):
+    """The same report computed row by row in Python."""
+    day_end = datetime.combine(AS_OF, datetime.min.time()) + timedelta(days=1)
+    with engine.connect() as conn:
+        paid = defaultdict(float)
+        for invoice_id, amount, payment_date in conn.execute(
+                text("SELECT invoice_id, amount, payment_date FROM payment")):
+            if datetime.fromisoformat(payment_date) < day_end:
+                paid[invoice_id] += amount
+
+        report = defaultdict(lambda: [0.0] * len(AGING_BUCKETS))
+        for invoice_id, name, gstin, amount, created_at in conn.execute(
+                text("SELECT id, customer_name, customer_gstin, amount, created_at FROM invoice")):
+            created = datetime.fromisoformat(created_at)
+            balance = amount - paid[invoice_id]
+            if created >= day_end or balance <= 0.005:
+                continue
+            age = (AS_OF - created.date()).days
+            bucket = 0 if age <= 30 else 1 if age <= 60 else 2 if age <= 90 else 3
+            report[(name, gstin)][bucket] += balance
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=100_000)
+    parser.add_argument('--customers', type=int, default=2_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        started = time.perf_counter()
+        populate(engine, args.invoices, args.customers)
+        print(f"populated {args.invoices} invoices in {time.perf_counter() - started:.1f}s")
+
+        best = float('inf')
+        with engine.connect() as conn:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                rows = conn.execute(aging_statement(AS_OF)).all()
+                best = min(best, time.perf_counter() - started)
+
+        expected = reference(engine)
+
+    mismatches = 0
+    for row in rows:
+        buckets = expected.pop((row[0], row[1]), None)
+        if buckets is None or any(abs(got - want) > 0.01 for got, want in zip(row[3:7], buckets)):
+            mismatches += 1
+    mismatches += len(expected)
+
+    print(f"aging query: {len(rows)} customers, best of {args.repeat}: {best * 1000:.1f} ms")
+    print(f"mismatches against Python reference: {mismatches}")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Analytics API from the columnar sales snapshot vs the same group-bys in SQL.
+
+    python -m benchmarks.bench_analytics --items 1000000
+
+Builds a throwaway SQLite database with --items invoice lines over three
+years, loads the snapshot from scratch, then times each analytics query
+(a year's top customers and top products, categories, monthly growth,
+and a drill-down into one category) from the snapshot and as the
+equivalent ORM query. Then appends --append more lines and times the
+incremental refresh that picks them up.
+
+The snapshot's results are compared with SQL's (same names, amounts to
+the paisa); any difference fails the run.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+
+import analytics
+from app import create_app, init_db
+from models import Category, Invoice, InvoiceItem, Product, db
+
+START = datetime(2023, 4, 1)
+DAYS = 3 * 365
+YEAR = dict(date_from=date(2025, 4, 1), date_to=date(2026, 3, 31))
+
+
+def populate(items, customers, products, categories, first_invoice=1):
+    rng = random.Random(22 + first_invoice)
+    if first_invoice == 1:
+        db.session.execute(Category.__table__.insert(),
+                           [{'id': n, 'name': f"Category {n}"} for n in range(1, categories + 1)])
+        db.session.execute(Product.__table__.insert(), [
+            {'id': n, 'name': f"Product {n}", 'price': 100.0, 'quantity': 0, 'tax_rate': 18.0,
+             'category_id': rng.randint(1, categories)}
+            for n in range(1, products + 1)
+        ])
+        db.session.commit()
+
+    invoices = []
+    lines = []
+    invoice_id = first_invoice - 1
+    while len(lines) < items:
+        invoice_id += 1
+        created = START + timedelta(minutes=rng.randrange(DAYS * 24 * 60))
+        for _ in range(rng.randint(1, 9)):
+            # a skew towards low ids so there are clear leaders
+            product = min(rng.randint(1, products), rng.randint(1, products))
+            qty = rng.randint(1, 20)
+            taxable = round(qty * rng.uniform(10, 5000), 2)
+            lines.append((invoice_id, product, "Item", qty, round(taxable / qty, 2), 18.0,
+                          taxable, 0.0, 0.0, 0.0, taxable))
+        invoices.append((invoice_id, f"Customer {min(rng.randrange(customers), rng.randrange(customers))}",
+                         "", 0.0, "addr", "addr", "Pending", created))
+
+    raw = db.engine.raw_connection()
+    cur = raw.cursor()
+    cur.executemany(
+        "INSERT INTO invoice (id, customer_name, customer_gstin, amount, customer_address, "
+        "billing_address, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", invoices)
+    cur.executemany(
+        "INSERT INTO invoice_item (invoice_id, product_id, product_name, quantity, unit_price, gst_rate, "
+        "taxable_value, cgst, sgst, igst, total) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", lines)
+    raw.commit()
+    raw.close()
+    return invoice_id, len(lines)
+
+
+# ---- the same questions as ORM queries ----
+def in_year(query):
+    return query.join(Invoice, Invoice.id == InvoiceItem.invoice_id).filter(
+        Invoice.created_at >= YEAR['date_from'],
+        Invoice.created_at < YEAR['date_to'] + timedelta(days=1)
+    )
+
+
+def sql_top_customers(limit):
+    value = func.sum(InvoiceItem.taxable_value)
+    return [(name, round(total, 2)) for name, total in in_year(
+        db.session.query(Invoice.customer_name, value)
+    ).group_by(Invoice.customer_name).order_by(value.desc()).limit(limit)]
+
+
+def sql_top_products(limit, category_id=None):
+    value = func.sum(InvoiceItem.taxable_value)
+    query = in_year(db.session.query(InvoiceItem.product_id, value))
+    if category_id is not None:
+        query = query.join(Product, Product.id == InvoiceItem.product_id).filter(
+            Product.category_id == category_id)
+    return [(product, round(total, 2)) for product, total in
+            query.group_by(InvoiceItem.product_id).order_by(value.desc()).limit(limit)]
+
+
+def sql_categories():
+    value = func.sum(InvoiceItem.taxable_value)
+    return [(category, round(total, 2)) for category, total in in_year(
+        db.session.query(Product.category_id, value).join(Product, Product.id == InvoiceItem.product_id)
+    ).group_by(Product.category_id).order_by(value.desc())]
+
+
+def sql_monthly():
+    month = func.strftime('%Y-%m', Invoice.created_at)
+    return [(m, round(total, 2)) for m, total in in_year(
+        db.session.query(month, func.sum(InvoiceItem.taxable_value))
+    ).group_by(month).order_by(month)]
+
+
+QUERIES = (
+    ('top customers', lambda lines: [(r['customer'], r['taxable_value'])
+                                     for r in analytics.top_customers(lines, 10, **YEAR)],
+     lambda: sql_top_customers(10)),
+    ('top products', lambda lines: [(r['product_id'], r['taxable_value'])
+                                    for r in analytics.top_products(lines, 10, **YEAR)],
+     lambda: sql_top_products(10)),
+    ('categories', lambda lines: [(r['category_id'], r['taxable_value'])
+                                  for r in analytics.category_summary(lines, **YEAR)],
+     sql_categories),
+    ('monthly growth', lambda lines: [(r['month'], r['taxable_value'])
+                                      for r in analytics.monthly_sales(lines, **YEAR)],
+     sql_monthly),
+    ('category drill-down', lambda lines: [(r['product_id'], r['taxable_value'])
+                                           for r in analytics.top_products(lines, 10, category_id=1, **YEAR)],
+     lambda: sql_top_products(10, category_id=1)),
+)
+
+
+def same(ours, theirs):
+    return len(ours) == len(theirs) and all(
+        a[0] == b[0] and abs(a[1] - b[1]) <= 0.01 for a, b in zip(ours, theirs))
+
+
+def best_of(repeat, run):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=1_000_000)
+    parser.add_argument('--append', type=int, default=5_000, help='lines added before the incremental refresh')
+    parser.add_argument('--customers', type=int, default=5_000)
+    parser.add_argument('--products', type=int, default=2_000)
+    parser.add_argument('--categories', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        flask_app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with flask_app.app_context():
+            init_db()
+            last_invoice, items = populate(args.items, args.customers, args.products, args.categories)
+            print(f"populated {items} lines")
+
+            snapshot = analytics.SalesSnapshot()
+            started = time.perf_counter()
+            snapshot.rebuild()
+            print(f"full load: {len(snapshot)} lines in {time.perf_counter() - started:.2f}s")
+
+            print(f"{'query':<20} {'snapshot ms':>12} {'SQL ms':>10}")
+            for name, ours, theirs in QUERIES:
+                snapshot_time, result = best_of(args.repeat, lambda: ours(snapshot.lines()))
+                sql_time, expected = best_of(args.repeat, theirs)
+                if not same(result, expected):
+                    failed.append(name)
+                print(f"{name:<20} {snapshot_time * 1000:>12.1f} {sql_time * 1000:>10.1f}")
+
+            _, added = populate(args.append, args.customers, args.products, args.categories,
+                                first_invoice=last_invoice + 1)
+            started = time.perf_counter()
+            snapshot.refresh()
+            print(f"incremental refresh: +{added} lines in {(time.perf_counter() - started) * 1000:.1f} ms")
+            for name, ours, theirs in QUERIES:
+                if not same(ours(snapshot.lines()), theirs()):
+                    failed.append(f"{name} after refresh")
+            db.engine.dispose()
+
+    for name in failed:
+        print(f"{name}: snapshot differs from SQL")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
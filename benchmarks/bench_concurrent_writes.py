@@ -0,0 +1,132 @@
+"""
+Concurrent writers against the default and the tuned engine profile.
+
+    python -m benchmarks.bench_concurrent_writes --processes 8 --operations 300
+
+Each process runs short transactions like the payment routes do (insert a
+payment, bump the invoice's paid total) mixed with list-page reads, first
+against a fresh SQLite file with SQLAlchemy's defaults and then with the
+db_config profile (WAL, busy_timeout, pragmas, pooling). Failed
+operations ("database is locked") are counted, not retried.
+
+Pass --url to run only the tuned profile against another database, e.g.
+a scratch PostgreSQL: --url postgresql://localhost/invoiceo_bench
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+import db_config
+from models import db, Invoice, Payment
+
+INVOICES = 2_000
+READ_SHARE = 0.3
+
+
+def make_engine(url, tuned):
+    if not tuned:
+        return create_engine(url)
+    return db_config.configure_engine(create_engine(url, **db_config.engine_options(url)))
+
+
+def setup(url):
+    engine = make_engine(url, tuned=False)
+    db.metadata.create_all(engine, tables=[Invoice.__table__, Payment.__table__])
+    with engine.begin() as conn:
+        conn.execute(Payment.__table__.delete())
+        conn.execute(Invoice.__table__.delete())
+        conn.execute(insert(Invoice.__table__), [
+            {'id': n, 'customer_name': f"Customer {n % 50}", 'customer_gstin': "33ABCDE1234F1Z5",
+             'customer_address': "addr", 'billing_address': "addr", 'amount': 10_000.0,
+             'paid_total': 0.0, 'status': 'Pending', 'created_at': datetime(2025, 1, 1)}
+            for n in range(1, INVOICES + 1)
+        ])
+    engine.dispose()
+
+
+def worker(args):
+    url, tuned, operations, seed = args
+    engine = make_engine(url, tuned)
+    rng = random.Random(seed)
+    inv = Invoice.__table__
+    latencies = []
+    errors = 0
+
+    for n in range(operations):
+        started = time.perf_counter()
+        try:
+            if rng.random() < READ_SHARE:
+                with engine.connect() as conn:
+                    conn.execute(
+                        select(inv.c.id, inv.c.amount - inv.c.paid_total)
+                        .order_by(inv.c.created_at.desc(), inv.c.id.desc()).limit(50)
+                    ).all()
+            else:
+                invoice_id = rng.randrange(1, INVOICES + 1)
+                with engine.begin() as conn:
+                    conn.execute(insert(Payment.__table__).values(
+                        payment_no=f"B-{seed}-{n}", invoice_id=invoice_id, customer_id=1,
+                        amount=10.0, payment_date=datetime.utcnow(), created_at=datetime.utcnow()
+                    ))
+                    conn.execute(
+                        update(inv).where(inv.c.id == invoice_id)
+                        .values(paid_total=inv.c.paid_total + 10.0, status='Partially Paid')
+                    )
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+    engine.dispose()
+    return latencies, errors
+
+
+def run(url, tuned, processes, operations):
+    setup(url)
+    started = time.perf_counter()
+    with Pool(processes) as pool:
+        results = pool.map(worker, [(url, tuned, operations, seed) for seed in range(processes)])
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for done, _ in results for l in done)
+    errors = sum(e for _, e in results)
+    return {
+        'ops': len(latencies) / elapsed,
+        'errors': errors,
+        'p50': statistics.median(latencies) if latencies else 0,
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=300, help='per process')
+    parser.add_argument('--url', help='database URL (tuned profile only)')
+    args = parser.parse_args()
+
+    results = {}
+    if args.url:
+        results['tuned'] = run(args.url, True, args.processes, args.operations)
+    else:
+        for label, tuned in (('default', False), ('tuned', True)):
+            with tempfile.TemporaryDirectory() as tmp:
+                url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+                results[label] = run(url, tuned, args.processes, args.operations)
+
+    print(f"{args.processes} processes x {args.operations} operations ({READ_SHARE:.0%} reads)")
+    print(f"{'profile':<10} {'ops/s':>8} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, r in results.items():
+        print(f"{label:<10} {r['ops']:>8.0f} {r['errors']:>7} {r['p50'] * 1000:>8.1f} {r['p95'] * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
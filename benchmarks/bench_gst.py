@@ -0,0 +1,105 @@
+"""
+GST engine vs the old per-item calculate_gst().
+
+    python -m benchmarks.bench_gst --sizes 10,1000,1000000
+
+Times both implementations and counts lines where the old float
+rounding lands on a different paisa: tax differences should only occur
+at exact half-paisa ties, total differences come from the engine
+defining the line total as the sum of the rounded components. The
+golden values the engine must hit are in tests/test_gst.py.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+import gst
+
+
+def legacy_calculate_gst(price, qty, gst_rate, seller_state, buyer_state):
+    # the pre-engine implementation from app.py, kept as the baseline
+    taxable = price * qty
+
+    if seller_state == buyer_state:
+        cgst = taxable * (gst_rate / 2) / 100
+        sgst = taxable * (gst_rate / 2) / 100
+        igst = 0
+    else:
+        cgst = 0
+        sgst = 0
+        igst = taxable * gst_rate / 100
+
+    total = taxable + cgst + sgst + igst
+
+    return {
+        "taxable": round(taxable, 2),
+        "cgst": round(cgst, 2),
+        "sgst": round(sgst, 2),
+        "igst": round(igst, 2),
+        "total": round(total, 2)
+    }
+
+
+def is_tie(price, qty, rate, intra):
+    # exact tax lands on half a paisa, where float rounding can go either way
+    exact = Decimal(str(price)) * qty * Decimal(str(rate)) / (200 if intra else 100)
+    return (exact * 100) % 1 == Decimal('0.5')
+
+
+def make_lines(n, rng):
+    rates = [0, 0.25, 3, 5, 12, 18, 28]
+    return [
+        (round(rng.uniform(0.5, 25_000), 2), rng.randint(1, 50), rng.choice(rates), rng.random() < 0.6)
+        for _ in range(n)
+    ]
+
+
+def run(n, rng):
+    lines = make_lines(n, rng)
+    prices, quantities, rates, intra = map(list, zip(*lines))
+
+    started = time.perf_counter()
+    legacy = [
+        legacy_calculate_gst(price, qty, rate, "33", "33" if same else "29")
+        for price, qty, rate, same in lines
+    ]
+    legacy_s = time.perf_counter() - started
+
+    gst.to_paise.cache_clear()
+    started = time.perf_counter()
+    engine = gst.compute(prices, quantities, rates, intra)
+    engine_s = time.perf_counter() - started
+
+    component_diff = total_diff = not_ties = 0
+    for i, old in enumerate(legacy):
+        if any(gst.to_paise(old[f]) != engine[f][i] for f in ('taxable', 'cgst', 'sgst', 'igst')):
+            component_diff += 1
+            if not is_tie(*lines[i]):
+                not_ties += 1
+        elif gst.to_paise(old['total']) != engine['total'][i]:
+            total_diff += 1
+
+    backend = 'numpy' if n >= gst.VECTOR_THRESHOLD and gst.numpy() is not None else 'python'
+    print(f"{n:>9} {legacy_s * 1000:>11.2f} {engine_s * 1000:>11.2f} {legacy_s / engine_s:>7.1f}x "
+          f"{backend:>7} {component_diff:>10} {total_diff:>10}")
+    if not_ties:
+        print(f"  {not_ties} tax differences are not half-paisa ties")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10,1000,1000000')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    gst.numpy()  # imported lazily; keep that out of the timings
+    rng = random.Random(args.seed)
+    print(f"{'lines':>9} {'legacy ms':>11} {'engine ms':>11} {'speedup':>8} {'backend':>7} "
+          f"{'tax diffs':>10} {'total diffs':>10}")
+    for n in [int(size) for size in args.sizes.split(',')]:
+        run(n, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+GSTR-1 summaries from the GST rollups vs scanning invoice_item.
+
+    python -m benchmarks.bench_gst_returns --items 1000000
+
+Builds a throwaway SQLite database with --items invoice lines (about five
+per invoice) over one financial year, half of the buyers registered, and
+fills the rollups with rebuild_gst_rollups(). Then, for the whole year:
+
+- rollups: rate_summary() for B2B and B2C plus b2b_summary(), as the
+  /reports/gstr1 page runs them
+- scan: the same rate-wise totals grouped straight from invoice_item
+- verify: gst_rollup_drift(), which must find nothing
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import create_app, init_db
+from gst_returns import GSTIN_LENGTH, b2b_summary, gst_rollup_drift, rate_summary, rebuild_gst_rollups
+from models import Invoice, InvoiceItem, db
+
+START, END = datetime(2025, 4, 1), datetime(2026, 4, 1)
+RATES = (0.0, 5.0, 12.0, 18.0, 28.0)
+STATES = ('33', '33', '33', '29', '27')
+
+
+def populate(items, customers):
+    rng = random.Random(21)
+    buyers = [
+        (f"Customer {n}", f"{rng.choice(STATES)}ABCDE{n:04d}F1Z5" if n % 2 else "")
+        for n in range(customers)
+    ]
+    span = int((END - START).total_seconds())
+
+    invoices = []
+    lines = []
+    invoice_id = 0
+    while len(lines) < items:
+        invoice_id += 1
+        name, gstin = rng.choice(buyers)
+        intra = gstin[:2] == '33'
+        amount = 0.0
+        for _ in range(rng.randint(1, 9)):
+            qty = rng.randint(1, 20)
+            price = round(rng.uniform(10, 5000), 2)
+            rate = rng.choice(RATES)
+            taxable = round(price * qty, 2)
+            half = round(taxable * rate / 200, 2) if intra else 0.0
+            igst = 0.0 if intra else round(taxable * rate / 100, 2)
+            total = round(taxable + 2 * half + igst, 2)
+            amount += total
+            lines.append((invoice_id, 1, "Item", qty, price, rate, taxable, half, half, igst, total))
+        invoices.append((invoice_id, name, gstin, round(amount, 2), "addr", "addr", "Pending",
+                         START + timedelta(seconds=rng.randrange(span))))
+
+    raw = db.engine.raw_connection()
+    cur = raw.cursor()
+    cur.executemany(
+        "INSERT INTO invoice (id, customer_name, customer_gstin, amount, customer_address, "
+        "billing_address, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", invoices)
+    cur.executemany(
+        "INSERT INTO invoice_item (invoice_id, product_id, product_name, quantity, unit_price, gst_rate, "
+        "taxable_value, cgst, sgst, igst, total) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", lines)
+    raw.commit()
+    raw.close()
+    return len(invoices), len(lines)
+
+
+def scan_summary():
+    inv = Invoice.__table__
+    item = InvoiceItem.__table__
+    key = (func.length(inv.c.customer_gstin) == GSTIN_LENGTH, item.c.gst_rate,
+           func.substr(inv.c.customer_gstin, 1, 2) != '33')
+    return db.session.execute(
+        select(*key, func.sum(item.c.taxable_value), func.sum(item.c.cgst),
+               func.sum(item.c.sgst), func.sum(item.c.igst))
+        .select_from(item.join(inv, inv.c.id == item.c.invoice_id))
+        .where(inv.c.created_at >= START, inv.c.created_at < END)
+        .group_by(*key)
+    ).all()
+
+
+def best_of(repeat, run):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=1_000_000)
+    parser.add_argument('--customers', type=int, default=2_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flask_app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with flask_app.app_context():
+            init_db()
+            started = time.perf_counter()
+            invoices, items = populate(args.items, args.customers)
+            print(f"populated {invoices} invoices / {items} lines in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            rebuild_gst_rollups()
+            print(f"rebuilt rollups in {time.perf_counter() - started:.1f}s")
+
+            def from_rollups():
+                rate_summary(START, END, b2b=True)
+                rate_summary(START, END, b2b=False)
+                b2b_summary(START, END)
+
+            rollups = best_of(args.repeat, from_rollups)
+            scan = best_of(args.repeat, scan_summary)
+
+            started = time.perf_counter()
+            drift = gst_rollup_drift(START, END)
+            verify = time.perf_counter() - started
+            db.engine.dispose()
+
+    print(f"full-year summaries from rollups, best of {args.repeat}: {rollups * 1000:8.1f} ms")
+    print(f"rate-wise totals scanning lines, best of {args.repeat}: {scan * 1000:8.1f} ms")
+    print(f"verify: {len(drift)} row(s) out of sync in {verify:.1f}s")
+    raise SystemExit(1 if drift else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Before/after timings for the migration-managed indexes.
+
+    python -m benchmarks.bench_indexes --rows 1000000
+
+Builds a throwaway SQLite database with --rows invoices (and one payment
+per two invoices), times the hot queries without indexes, applies the
+migrations and times them again.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, extract, func, select, text, tuple_
+
+import migrations
+from ledger import year_bounds
+from models import db, Invoice, Payment
+
+YEAR = 2024
+
+
+def populate(engine, rows):
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+    rng = random.Random(42)
+    start = datetime(YEAR - 3, 1, 1)
+    statuses = ['Pending', 'Paid', 'Partially Paid', 'Overdue']
+
+    raw = engine.raw_connection()
+    cur = raw.cursor()
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        invoices = []
+        payments = []
+        for n in range(offset + 1, min(offset + batch, rows) + 1):
+            created = start + timedelta(minutes=rng.randrange(4 * 365 * 24 * 60))
+            amount = round(rng.uniform(100, 50_000), 2)
+            invoices.append((n, f"Customer {n % 5000}", "33ABCDE1234F1Z5", amount,
+                             "addr", "addr", rng.choice(statuses), created))
+            if n % 2:
+                payments.append((f"PAY-{n}", n, 1, amount / 2, created + timedelta(days=10), created))
+        cur.executemany(
+            "INSERT INTO invoice (id, customer_name, customer_gstin, amount, customer_address, "
+            "billing_address, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", invoices)
+        cur.executemany(
+            "INSERT INTO payment (payment_no, invoice_id, customer_id, amount, payment_date, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", payments)
+        raw.commit()
+    raw.close()
+
+
+def queries():
+    start, end = year_bounds(YEAR)
+    month = extract('month', Invoice.created_at)
+    paid = select(func.coalesce(func.sum(Payment.amount), 0)).where(
+        Payment.invoice_id == Invoice.id).scalar_subquery()
+    cursor = (datetime(YEAR, 6, 1), 0)
+
+    return [
+        ("year sales, extract() filter",
+         select(month, func.sum(Invoice.amount))
+         .where(extract('year', Invoice.created_at) == YEAR).group_by(month)),
+        ("year sales, half-open range",
+         select(month, func.sum(Invoice.amount))
+         .where(Invoice.created_at >= start, Invoice.created_at < end).group_by(month)),
+        ("invoice page (keyset + paid total)",
+         select(Invoice.id, paid)
+         .where(tuple_(Invoice.created_at, Invoice.id) < tuple_(*cursor))
+         .order_by(Invoice.created_at.desc(), Invoice.id.desc()).limit(50)),
+        ("invoice page, status filter",
+         select(Invoice.id)
+         .where(Invoice.status == 'Overdue')
+         .order_by(Invoice.created_at.desc()).limit(50)),
+        ("payment page (keyset)",
+         select(Payment.id)
+         .where(tuple_(Payment.payment_date, Payment.id) < tuple_(*cursor))
+         .order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(50)),
+        ("payments of one invoice",
+         select(func.sum(Payment.amount)).where(Payment.invoice_id == 777_777)),
+    ]
+
+
+def time_queries(engine, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for label, query in queries():
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(query).fetchall()
+                best = min(best, time.perf_counter() - started)
+            results[label] = best
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+
+        started = time.perf_counter()
+        populate(engine, args.rows)
+        print(f"populated {args.rows} invoices in {time.perf_counter() - started:.1f}s")
+
+        before = time_queries(engine, args.repeat)
+
+        started = time.perf_counter()
+        migrations.upgrade(engine)
+        print(f"applied migrations in {time.perf_counter() - started:.1f}s")
+
+        after = time_queries(engine, args.repeat)
+
+    print(f"{'query':<38} {'before ms':>10} {'after ms':>10}")
+    for label in before:
+        print(f"{label:<38} {before[label] * 1000:>10.1f} {after[label] * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
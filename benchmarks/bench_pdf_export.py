@@ -0,0 +1,71 @@
+"""
+Throughput of the bulk PDF export at different worker counts.
+
+    python -m benchmarks.bench_pdf_export --invoices 200 --items 10 --workers 1,2,4,8
+
+Invoices are built in memory, so no database rows are needed.
+"""
+import argparse
+import time
+from datetime import datetime
+
+from flask import render_template
+
+import pdf_export
+from app import app
+from models import Invoice, InvoiceItem
+
+
+def fake_invoice(n, items):
+    invoice = Invoice(
+        id=n,
+        customer_name=f"Customer {n}",
+        customer_gstin="33ABCDE1234F1Z5",
+        customer_address="1 Main Road, Chennai",
+        billing_address="1 Main Road, Chennai",
+        amount=0,
+        status="Pending",
+        created_at=datetime(2024, 3, 31),
+    )
+    for i in range(items):
+        invoice.items.append(InvoiceItem(
+            product_name=f"Product {i}",
+            quantity=2,
+            unit_price=499.0,
+            gst_rate=18.0,
+            taxable_value=998.0,
+            cgst=89.82,
+            sgst=89.82,
+            igst=0.0,
+            total=1177.64,
+        ))
+        invoice.amount += 1177.64
+    return invoice
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=200)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--workers', default='1,2,4,8')
+    args = parser.parse_args()
+
+    with app.app_context():
+        jobs = [
+            (f"invoice_{n}.pdf", render_template('invoice_pdf.html', invoice=fake_invoice(n, args.items)))
+            for n in range(1, args.invoices + 1)
+        ]
+
+    print(f"{args.invoices} invoices x {args.items} lines")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'zip MB':>8}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        started = time.perf_counter()
+        size = 0
+        for chunk in pdf_export.stream_zip(pdf_export.render_pdfs(jobs, workers=workers)):
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"{workers:>8} {elapsed:>9.2f} {len(jobs) / elapsed:>9.1f} {size / 1e6:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+WeasyPrint (HTML) vs ReportLab invoice rendering, side by side.
+
+    python -m benchmarks.bench_pdf_renderers
+    python -m benchmarks.bench_pdf_renderers --items 40 --batch 1000 --renderers reportlab
+
+For each renderer, in a fresh process so peak memory is its own:
+
+- per invoice: p50/p95 latency of --single renders of one invoice
+- per batch: time and pages/s for --batch invoices rendered one after
+  another, the way a single export worker sees them
+
+Peak RSS is the process high-water mark after the run, minus what it was
+once the app was imported (reported as "+MB").
+"""
+import argparse
+import multiprocessing
+import resource
+import statistics
+import time
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run(renderer, items, single, batch, results):
+    from flask import render_template
+
+    import pdf_export
+    import pdf_reportlab
+    from app import app
+    from benchmarks.bench_pdf_export import fake_invoice
+
+    with app.app_context():
+        invoices = [fake_invoice(n, items) for n in range(1, batch + 1)]
+        if renderer == 'reportlab':
+            render = pdf_reportlab.render
+            payloads = [pdf_reportlab.invoice_data(invoice) for invoice in invoices]
+        else:
+            render = pdf_export.render_pdf
+            payloads = [render_template('invoice_pdf.html', invoice=invoice) for invoice in invoices]
+
+    render(payloads[0])  # fonts, caches
+    baseline = peak_rss_mb()
+
+    latencies = []
+    for _ in range(single):
+        started = time.perf_counter()
+        size = len(render(payloads[0]))
+        latencies.append(time.perf_counter() - started)
+    single_peak = peak_rss_mb()
+
+    started = time.perf_counter()
+    batch_bytes = sum(len(render(payload)) for payload in payloads)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    results.put({
+        'renderer': renderer,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'pdf_kb': size / 1024,
+        'single_rss': single_peak - baseline,
+        'batch_s': elapsed,
+        'pages_s': batch / elapsed,
+        'batch_mb': batch_bytes / 1e6,
+        'batch_rss': peak_rss_mb() - baseline,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=10, help='lines per invoice')
+    parser.add_argument('--single', type=int, default=100, help='renders of one invoice')
+    parser.add_argument('--batch', type=int, default=1000, help='invoices per batch')
+    parser.add_argument('--renderers', default='html,reportlab')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for renderer in args.renderers.split(','):
+        results = ctx.Queue()
+        child = ctx.Process(target=run, args=(renderer, args.items, args.single, args.batch, results))
+        child.start()
+        child.join()
+        if child.exitcode:
+            print(f"{renderer}: failed (exit {child.exitcode}); is it installed with its system libraries?")
+            continue
+        rows.append(results.get())
+
+    print(f"\n{args.items} lines per invoice, {args.single} single renders, batch of {args.batch}")
+    print(f"{'renderer':<10} {'p50 ms':>8} {'p95 ms':>8} {'PDF KB':>7} {'RSS':>7}"
+          f" {'batch s':>8} {'pages/s':>8} {'MB out':>7} {'RSS':>7}")
+    for r in rows:
+        print(f"{r['renderer']:<10} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['pdf_kb']:>7.1f} "
+              f"{r['single_rss']:>+6.1f}M {r['batch_s']:>8.2f} {r['pages_s']:>8.1f} "
+              f"{r['batch_mb']:>7.2f} {r['batch_rss']:>+6.1f}M")
+
+
+if __name__ == '__main__':
+    main()
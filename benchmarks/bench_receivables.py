@@ -0,0 +1,203 @@
+"""
+Parallel payment writers on the same customers and invoices: exact totals.
+
+    python -m benchmarks.bench_receivables --processes 8 --payments 500
+
+Sets up a throwaway SQLite database with a few --customers owning
+--invoices invoices between them, one opening payment on each, then
+starts --processes processes that each make --payments requests through
+the test client: mostly /add_payment against a random invoice, some
+/edit_payment changing one of the opening payments. Together they pay in
+more than some invoices are worth, so those payments get capped at the
+balance left.
+
+Afterwards, with the payments table as the truth:
+
+    receivables = opening receivables - payments of the customer's invoices
+    paid_total  = payments of the invoice, never more than its amount
+    status      = Paid once nothing is left, else Partially Paid
+
+and the dashboard rollups must match the base tables. Conflicts (a
+payment retried because another one changed its invoice first) are
+counted. For contrast the same payments are then made as a naive
+read-modify-write of the customer's receivables, which loses updates.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from sqlalchemy import create_engine, event, func, select, update
+
+import db_config
+import ledger
+from app import create_app, init_db
+from models import BALANCE_EPSILON, Customer, Invoice, Payment, db
+
+TOLERANCE = 0.01
+
+
+def setup(url, customers, invoices):
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    rng = random.Random(25)
+    with flask_app.app_context():
+        init_db()
+        db.session.add_all(Customer(id=n, customer_name=f"Customer {n}", customer_gstin=f"33ABCDE{n:04d}F1Z5",
+                                    customer_address="addr", billing_address="addr", receivables=0)
+                           for n in range(1, customers + 1))
+        for n in range(1, invoices + 1):
+            customer_id = n % customers + 1
+            db.session.add(Invoice(id=n, customer_id=customer_id, customer_name=f"Customer {customer_id}",
+                                   customer_gstin=f"33ABCDE{customer_id:04d}F1Z5", customer_address="addr",
+                                   billing_address="addr", amount=round(rng.uniform(2_000, 8_000), 2),
+                                   status="Pending", created_at=datetime(2026, 4, 1)))
+        db.session.flush()
+        for n in range(1, customers + 1):
+            owed = db.session.query(func.sum(Invoice.amount)).filter_by(customer_id=n).scalar()
+            ledger.adjust_receivables(n, owed)
+        db.session.commit()
+        ledger.rebuild_rollups()
+
+        client = flask_app.test_client()
+        for n in range(1, invoices + 1):
+            client.post(f'/add_payment/{n}', data={'amount': '100', 'mode': 'UPI', 'payment_date': '2026-04-02'})
+        opening = {c.id: c.receivables + sum(p.amount for p in Payment.query.filter_by(customer_id=c.id))
+                   for c in Customer.query}
+        db.engine.dispose()
+    return opening
+
+
+def payment_writer(args):
+    url, _, invoices, payments, seed = args
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    client = flask_app.test_client()
+    rng = random.Random(seed)
+
+    conflicts = []
+    with flask_app.app_context():
+        event.listen(db.session, 'after_soft_rollback', lambda session, previous: conflicts.append(1))
+
+    statuses = {}
+    for _ in range(payments):
+        if rng.random() < 0.1:
+            path = f'/edit_payment/{rng.randint(1, invoices)}'  # an opening payment
+            form = {'amount': f"{rng.uniform(1, 200):.2f}", 'mode': 'UPI'}
+        else:
+            path = f'/add_payment/{rng.randint(1, invoices)}'
+            form = {'amount': f"{rng.uniform(1, 100):.2f}", 'mode': 'UPI', 'payment_date': '2026-04-03'}
+        status = client.post(path, data=form).status_code
+        statuses[status] = statuses.get(status, 0) + 1
+    with flask_app.app_context():
+        db.engine.dispose()
+    return statuses, len(conflicts)
+
+
+def naive_writer(args):
+    url, customers, invoices, payments, seed = args
+    engine = db_config.configure_engine(create_engine(url, **db_config.engine_options(url)))
+    cust = Customer.__table__
+    rng = random.Random(seed)
+    paid = 0.0
+    for _ in range(payments):
+        customer_id = rng.randint(1, invoices) % customers + 1
+        amount = round(rng.uniform(1, 100), 2)
+        with engine.begin() as conn:
+            receivables = conn.execute(select(cust.c.receivables).where(cust.c.id == customer_id)).scalar()
+            conn.execute(update(cust).where(cust.c.id == customer_id).values(receivables=receivables - amount))
+        paid += amount
+    engine.dispose()
+    return paid
+
+
+def run(writer, url, args):
+    started = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(writer, [(url, args.customers, args.invoices, args.payments, seed)
+                                    for seed in range(args.processes)])
+    return results, time.perf_counter() - started
+
+
+def check(url, opening):
+    """Lines describing every total that is off; empty when all are exact."""
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    problems = []
+    with flask_app.app_context():
+        paid = dict(db.session.query(Payment.invoice_id, func.sum(Payment.amount)).group_by(Payment.invoice_id))
+        by_customer = dict(db.session.query(Payment.customer_id, func.sum(Payment.amount))
+                           .group_by(Payment.customer_id))
+
+        for customer in Customer.query.order_by(Customer.id):
+            expected = opening[customer.id] - by_customer.get(customer.id, 0)
+            if abs(customer.receivables - expected) > TOLERANCE:
+                problems.append(f"customer {customer.id}: receivables {customer.receivables:.2f}, "
+                                f"expected {expected:.2f}")
+
+        for invoice in Invoice.query.order_by(Invoice.id):
+            total = paid.get(invoice.id, 0)
+            status = "Paid" if invoice.amount - total <= BALANCE_EPSILON else "Partially Paid"
+            if abs(invoice.paid_total - total) > TOLERANCE or total > invoice.amount + TOLERANCE:
+                problems.append(f"invoice {invoice.id}: paid_total {invoice.paid_total:.2f}, "
+                                f"payments {total:.2f}, amount {invoice.amount:.2f}")
+            elif invoice.status != status:
+                problems.append(f"invoice {invoice.id}: {invoice.status}, expected {status}")
+
+        for key, stored, expected in ledger.rollup_drift():
+            problems.append(f"rollup {key}: {stored:.2f}, expected {expected:.2f}")
+
+        payments = Payment.query.count()
+        fully_paid = Invoice.query.filter_by(status="Paid").count()
+        db.engine.dispose()
+    return problems, payments, fully_paid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--payments', type=int, default=500, help='requests per process')
+    parser.add_argument('--customers', type=int, default=3)
+    parser.add_argument('--invoices', type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.payments} payment requests on {args.invoices} invoices "
+          f"of {args.customers} customers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        opening = setup(url, args.customers, args.invoices)
+        results, elapsed = run(payment_writer, url, args)
+        statuses = {}
+        for result, _ in results:
+            for status, count in result.items():
+                statuses[status] = statuses.get(status, 0) + count
+        conflicts = sum(c for _, c in results)
+        problems, payments, fully_paid = check(url, opening)
+
+        print(f"atomic UPDATEs + versions: {sum(statuses.values()) / elapsed:.0f} requests/s, "
+              f"{payments} payments stored, {fully_paid} invoices paid off, "
+              f"{conflicts} conflicts retried, statuses {dict(sorted(statuses.items()))}")
+        for problem in problems:
+            print(f"  {problem}  <-- MISMATCH")
+        if not problems:
+            print("  receivables, paid totals, statuses and rollups all exact")
+        failed = bool(problems) or set(statuses) - {302}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        opening = setup(url, args.customers, args.invoices)
+        results, _ = run(naive_writer, url, args)
+        flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+        with flask_app.app_context():
+            left = db.session.query(func.sum(Customer.receivables)).scalar()
+            db.engine.dispose()
+        lost = left - (sum(opening.values()) - args.invoices * 100 - sum(results))
+        print(f"naive read-modify-write: {sum(results):.2f} paid in, "
+              f"{lost:.2f} of it never came off the receivables (lost updates)")
+
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Route-level load benchmark.
+
+    python -m benchmarks.bench_routes                        # seeds a small temp database
+    python -m benchmarks.bench_routes --scale medium --http --concurrency 4
+    python -m benchmarks.bench_routes --db /tmp/invoiceo.db --save medium-http
+    python -m benchmarks.bench_routes --db /tmp/invoiceo.db --compare medium-http
+
+Drives the main read and write routes, either in-process through the
+Flask test client or over real HTTP against a threaded server on a free
+local port. Reports p50/p95/p99 latency and throughput per route.
+
+--db takes a database made by benchmarks.seed_data; it is copied first so
+the write routes never touch the original. Without --db a fresh one is
+seeded at --scale.
+
+--save NAME stores the results in benchmarks/baselines/NAME.json. --compare
+NAME prints the change against it and exits 1 if any route's p95 is more
+than --tolerance slower.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from urllib.parse import urlencode
+
+from werkzeug.datastructures import MultiDict
+
+from benchmarks import seed_data
+from models import Customer, Invoice, Product, db
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+# ---------------- scenarios ----------------
+class Scenarios:
+    """Request builders for each route, drawing ids from the seeded data."""
+
+    def __init__(self, flask_app, rng):
+        self.rng = rng
+        with flask_app.app_context():
+            self.customers = [r[0] for r in db.session.query(Customer.id)]
+            # enough on hand that a run of invoices never hits the oversell check
+            self.products = [r[0] for r in db.session.query(Product.id).filter(Product.quantity >= 100)]
+            self.open_invoices = [
+                r[0] for r in db.session.query(Invoice.id).filter(Invoice.status != 'Paid')
+            ]
+            self.names = [r[0] for r in db.session.query(Customer.customer_name).limit(200)]
+        self.today = date.today().isoformat()
+
+    def routes(self):
+        rng = self.rng
+        return {
+            'dashboard': lambda: ('GET', '/dashboard', None),
+            'invoices': lambda: ('GET', '/invoices', None),
+            'invoices by balance': lambda: ('GET', '/invoices?outstanding=1&sort=balance', None),
+            'invoices by customer': lambda: (
+                'GET', '/invoices?' + urlencode({'customer': rng.choice(self.names).split()[0]}), None),
+            'payments': lambda: ('GET', '/payments', None),
+            'sales orders': lambda: ('GET', '/sales_orders', None),
+            'aging report': lambda: ('GET', '/reports/aging', None),
+            'search': lambda: ('GET', '/search?' + urlencode({'q': rng.choice(seed_data.WORDS)}), None),
+            'typeahead': lambda: (
+                'GET', '/typeahead/products?' + urlencode({'q': rng.choice(seed_data.WORDS)[:3]}), None),
+            'add_invoice': self.add_invoice,
+            'add_payment': self.add_payment,
+        }
+
+    def add_invoice(self):
+        products = self.rng.sample(self.products, self.rng.randint(1, 8))
+        form = [('invoice_date', self.today), ('customer_id', str(self.rng.choice(self.customers))),
+                ('status', 'Pending')]
+        for pid in products:
+            form += [('product_id[]', str(pid)), ('quantity[]', str(self.rng.randint(1, 10)))]
+        return 'POST', '/add_invoice', form
+
+    def add_payment(self):
+        invoice_id = self.rng.choice(self.open_invoices)
+        form = [('amount', '1'), ('mode', 'UPI'), ('payment_date', self.today)]
+        return 'POST', f'/add_payment/{invoice_id}', form
+
+
+# ---------------- drivers ----------------
+class TestClientDriver:
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def __call__(self, method, path, form):
+        response = self.client.open(path, method=method, data=MultiDict(form) if form else None)
+        response.get_data()
+        return response.status_code
+
+
+class HttpDriver:
+    """One keep-alive connection per thread against a local threaded server."""
+
+    def __init__(self, flask_app):
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+        self.server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+        self.port = self.server.server_port
+        self.local = threading.local()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def __call__(self, method, path, form):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        body = urlencode(form) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            return 599
+        if response.getheader('Connection', '').lower() == 'close':
+            conn.close()
+            self.local.conn = None
+        return response.status
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run_route(driver, build, requests, warmup, concurrency):
+    for _ in range(warmup):
+        driver(*build())
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0)
+                  for i in range(concurrency)]
+
+    def work(count):
+        nonlocal errors
+        mine = []
+        bad = 0
+        for _ in range(count):
+            method, path, form = build()
+            started = time.perf_counter()
+            status = driver(method, path, form)
+            mine.append(time.perf_counter() - started)
+            if status >= 400:
+                bad += 1
+        with lock:
+            latencies.extend(mine)
+            errors += bad
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        work(requests)
+    else:
+        threads = [threading.Thread(target=work, args=(count,)) for count in per_thread]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(pct(95), 3),
+        'p99_ms': round(pct(99), 3),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+# ---------------- baselines ----------------
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name, meta, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump({'meta': meta, 'routes': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"saved baseline {baseline_path(name)}")
+
+
+def compare(name, results, tolerance):
+    with open(baseline_path(name)) as f:
+        baseline = json.load(f)
+    print(f"\nagainst {name} ({baseline['meta'].get('mode')}, {baseline['meta'].get('scale')}, "
+          f"{baseline['meta'].get('python')})")
+    print(f"{'route':<24} {'p95 then':>9} {'p95 now':>9} {'change':>8} {'rps change':>11}")
+
+    regressions = []
+    for route, now in results.items():
+        then = baseline['routes'].get(route)
+        if not then:
+            continue
+        change = now['p95_ms'] / then['p95_ms'] - 1 if then['p95_ms'] else 0
+        rps_change = now['rps'] / then['rps'] - 1 if then['rps'] else 0
+        flag = '  <-- slower' if change > tolerance else ''
+        print(f"{route:<24} {then['p95_ms']:>9.2f} {now['p95_ms']:>9.2f} {change:>+8.0%} {rps_change:>+11.0%}{flag}")
+        if flag:
+            regressions.append(route)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', help='database made by benchmarks.seed_data (copied before use)')
+    parser.add_argument('--scale', choices=sorted(seed_data.SCALES), default='small',
+                        help='scale to seed when --db is not given')
+    parser.add_argument('--http', action='store_true', help='go through a real HTTP server')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads (with --http)')
+    parser.add_argument('--requests', type=int, default=200, help='per route')
+    parser.add_argument('--warmup', type=int, default=20, help='per route')
+    parser.add_argument('--routes', help='comma-separated subset of routes')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', metavar='NAME', help='save results as a baseline')
+    parser.add_argument('--compare', metavar='NAME', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    if args.concurrency > 1 and not args.http:
+        parser.error("--concurrency needs --http (the test client is single-threaded)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        url = f"sqlite:///{path}"
+        if args.db:
+            shutil.copyfile(args.db, path)
+            flask_app = seed_data.load_app(url)
+        else:
+            flask_app = seed_data.seed(url, seed_data.SCALES[args.scale], report=lambda message: None)
+
+        scenarios = Scenarios(flask_app, random.Random(args.seed))
+        routes = scenarios.routes()
+        if args.routes:
+            wanted = [name.strip() for name in args.routes.split(',')]
+            routes = {name: routes[name] for name in wanted}
+
+        driver = HttpDriver(flask_app) if args.http else TestClientDriver(flask_app)
+        mode = f"http x{args.concurrency}" if args.http else 'test client'
+
+        results = {}
+        print(f"{'route':<24} {'reqs':>5} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for name, build in routes.items():
+            r = run_route(driver, build, args.requests, args.warmup, args.concurrency)
+            results[name] = r
+            print(f"{name:<24} {r['requests']:>5} {r['errors']:>6} {r['p50_ms']:>8.2f} "
+                  f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rps']:>8.1f}")
+
+        if args.http:
+            driver.close()
+        with flask_app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    meta = {
+        'mode': mode,
+        'scale': os.path.basename(args.db) if args.db else args.scale,
+        'requests': args.requests,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+    if args.save:
+        save_baseline(args.save, meta, results)
+    if args.compare:
+        regressions = compare(args.compare, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
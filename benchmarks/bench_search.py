@@ -0,0 +1,131 @@
+"""
+Full-text search at scale.
+
+    python -m benchmarks.bench_search --docs 1000000
+
+Builds a throwaway SQLite database with --docs searchable rows (a quarter
+invoices, half invoice lines, the rest customers and products), written
+through the sync triggers, then times typical /search queries and a full
+rebuild of the indexes.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+import migrations
+import search
+from models import db
+
+WORDS = ("steel copper brass mild rod pipe sheet wire bolt nut washer flange "
+         "valve elbow tee coupling cable tray panel box clamp hinge bracket "
+         "angle channel plate coil gasket seal bearing").split()
+TOWNS = ("chennai madurai coimbatore salem trichy erode vellore tirunelveli "
+         "hosur karur thanjavur nagercoil").split()
+STATES = ('33', '29', '32', '27', '24')
+
+
+def gstin(rng):
+    letters = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(5))
+    return f"{rng.choice(STATES)}{letters}{rng.randrange(10000):04d}{rng.choice('ABCDEFGH')}1Z{rng.randrange(10)}"
+
+
+def address(rng):
+    return f"{rng.randrange(1, 300)} {rng.choice(WORDS).title()} Street, {rng.choice(TOWNS).title()}"
+
+
+def populate(engine, docs):
+    db.metadata.create_all(engine)
+    migrations.upgrade(engine)
+
+    rng = random.Random(21)
+    invoices = docs // 4
+    items = docs // 2
+    customers = docs // 10
+    products = docs - invoices - items - customers
+    now = datetime(2025, 1, 1)
+
+    raw = engine.raw_connection()
+    cur = raw.cursor()
+    cur.executemany(
+        "INSERT INTO customer (id, customer_name, customer_gstin, customer_address, billing_address, receivables) "
+        "VALUES (?, ?, ?, ?, ?, 0)",
+        ((n, f"{rng.choice(WORDS).title()} {rng.choice(TOWNS).title()} Traders {n}",
+          gstin(rng), address(rng), address(rng)) for n in range(1, customers + 1)))
+    cur.executemany(
+        "INSERT INTO product (id, name, description, price, quantity, tax_rate) VALUES (?, ?, ?, 100, 0, 18)",
+        ((n, f"{' '.join(rng.sample(WORDS, 2)).title()} {rng.randrange(1, 500)}mm", rng.choice(WORDS))
+         for n in range(1, products + 1)))
+    cur.executemany(
+        "INSERT INTO invoice (id, customer_name, customer_gstin, customer_address, billing_address, "
+        "amount, status, created_at) VALUES (?, ?, ?, '', ?, 100, 'Pending', ?)",
+        ((n, f"{rng.choice(WORDS).title()} {rng.choice(TOWNS).title()} Traders {n % customers}",
+          gstin(rng), address(rng), now) for n in range(1, invoices + 1)))
+    cur.executemany(
+        "INSERT INTO invoice_item (invoice_id, product_id, product_name, quantity, unit_price, gst_rate, "
+        "taxable_value, cgst, sgst, igst, total) VALUES (?, 1, ?, 1, 100, 18, 100, 9, 9, 0, 118)",
+        ((rng.randrange(1, invoices + 1), f"{' '.join(rng.sample(WORDS, 2)).title()}")
+         for _ in range(items)))
+    raw.commit()
+    raw.close()
+
+
+QUERIES = [
+    ("rare: GSTIN fragment", None),
+    ("town + word", "salem flange"),
+    ("common word", "steel"),
+    ("very common fragment", "ste"),
+    ("customer name, exact", "Traders 4242"),
+]
+
+
+def time_queries(engine, repeat):
+    results = []
+    with engine.connect() as conn:
+        sample = conn.exec_driver_sql("SELECT customer_gstin FROM invoice WHERE id = 4242").scalar()
+        for label, query in QUERIES:
+            query = query or sample[2:9]
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = search.search(conn, query, limit=21)
+                best = min(best, time.perf_counter() - started)
+            total = conn.exec_driver_sql(
+                "SELECT COUNT(*) FROM invoice_fts WHERE invoice_fts MATCH ?",
+                (search.match_expression(query),)).scalar()
+            results.append((f"{label} ({query})", best, len(rows), total))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        engine = create_engine(f"sqlite:///{path}")
+
+        started = time.perf_counter()
+        populate(engine, args.docs)
+        elapsed = time.perf_counter() - started
+        print(f"inserted {args.docs} documents through the triggers in {elapsed:.1f}s "
+              f"({args.docs / elapsed:,.0f}/s), database {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+
+        print(f"{'query':<46} {'ms':>8} {'page':>5} {'invoice hits':>13}")
+        for label, best, page, total in time_queries(engine, args.repeat):
+            print(f"{label:<46} {best * 1000:>8.1f} {page:>5} {total:>13}")
+
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            search.rebuild(conn)
+        print(f"rebuild + optimize: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Multi-process stress test for the document number sequences.
+
+    python -m benchmarks.bench_sequences --processes 8 --allocations 500
+
+Every process allocates numbers (single numbers and blocks) from the same
+series in its own short transactions. Afterwards all handed-out ranges
+must tile 1..N exactly: any overlap is a collision, any hole a lost
+update. Pass --url to run against another database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from sqlalchemy import create_engine
+
+import sequences
+from models import db, DocumentSequence
+
+WHEN = datetime(2025, 6, 1)
+
+
+def make_engine(url):
+    if url.startswith('sqlite'):
+        return create_engine(url, connect_args={'timeout': 60})
+    return create_engine(url)
+
+
+def worker(args):
+    url, allocations, seed = args
+    engine = make_engine(url)
+    rng = random.Random(seed)
+    taken = []
+    for _ in range(allocations):
+        count = 1 if rng.random() < 0.8 else rng.randint(2, 50)
+        with engine.begin() as conn:
+            taken.append((sequences.allocate(conn, "PAY", WHEN, count), count))
+    engine.dispose()
+    return taken
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--allocations', type=int, default=500, help='per process')
+    parser.add_argument('--url', help='database URL (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'sequences.db')}"
+        engine = make_engine(url)
+        db.metadata.create_all(engine, tables=[DocumentSequence.__table__])
+        with engine.begin() as conn:
+            conn.execute(DocumentSequence.__table__.delete())
+
+        started = time.perf_counter()
+        with Pool(args.processes) as pool:
+            results = pool.map(worker, [
+                (url, args.allocations, seed) for seed in range(args.processes)
+            ])
+        elapsed = time.perf_counter() - started
+
+    ranges = sorted(r for taken in results for r in taken)
+    allocations = len(ranges)
+    numbers = sum(count for _, count in ranges)
+
+    collisions = holes = 0
+    expected = 1
+    for first, count in ranges:
+        if first < expected:
+            collisions += 1
+        elif first > expected:
+            holes += 1
+        expected = max(expected, first + count)
+
+    print(f"{args.processes} processes, {allocations} allocations, {numbers} numbers in {elapsed:.2f}s "
+          f"({allocations / elapsed:.0f} allocations/s)")
+    print(f"collisions: {collisions}, holes: {holes}, last number: {expected - 1}")
+    if collisions or holes or expected - 1 != numbers:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Cold start: import time and time to first request for a fresh worker.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --db /tmp/invoiceo.db --route /dashboard --runs 10
+    python -m benchmarks.bench_startup --tree /tmp/invoiceo-old     # another checkout, to compare
+
+Every run is a new Python process, the way a WSGI worker or a CLI command
+starts:
+
+- import: `import app` alone
+- first request: from the end of the import to the first response of
+  --route through the test client (engine connect, template compile, ...)
+- process: interpreter start to first response, measured from outside
+- cli: `flask --app app --help`, end to end
+
+It also lists which of the heavy optional stacks (WeasyPrint, ReportLab,
+NumPy) ended up loaded. --db is copied first; without it an empty,
+migrated database is used.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY = ('weasyprint', 'reportlab', 'numpy')
+
+PREPARE = '''
+import app
+if hasattr(app, 'init_db'):
+    with app.app.app_context():
+        app.init_db()
+'''
+
+WORKER = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+response.get_data()
+done = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'first_request': done - imported,
+    'status': response.status_code,
+    'heavy': [name for name in sys.argv[2].split(',') if name in sys.modules],
+}))
+'''
+
+
+def run(args, tree, env):
+    started = time.perf_counter()
+    out = subprocess.run(args, cwd=tree, env=env, check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - started, out
+
+
+def summary(values):
+    return f"{statistics.median(values) * 1000:>9.0f} {min(values) * 1000:>9.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tree', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='checkout to measure (default: this one)')
+    parser.add_argument('--db', help='database to copy (default: empty)')
+    parser.add_argument('--route', default='/invoices')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    tree = os.path.abspath(args.tree)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'startup.db')
+        if args.db:
+            shutil.copyfile(args.db, path)
+
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [tree, os.environ.get('PYTHONPATH')]))
+        run([sys.executable, '-c', PREPARE], tree, env)
+
+        samples = {'import': [], 'first_request': [], 'process': [], 'cli': []}
+        for _ in range(args.runs):
+            elapsed, out = run([sys.executable, '-c', WORKER, args.route, ','.join(HEAVY)], tree, env)
+            result = json.loads(out.strip().splitlines()[-1])
+            samples['import'].append(result['import'])
+            samples['first_request'].append(result['first_request'])
+            samples['process'].append(elapsed)
+
+            elapsed, _ = run([sys.executable, '-m', 'flask', '--app', 'app', '--help'], tree, env)
+            samples['cli'].append(elapsed)
+
+    print(f"{tree}, GET {args.route} -> {result['status']}, {args.runs} runs")
+    print(f"{'':<15} {'median ms':>9} {'min ms':>9}")
+    for name, values in samples.items():
+        print(f"{name.replace('_', ' '):<15} {summary(values)}")
+    print(f"heavy modules loaded: {', '.join(result['heavy']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
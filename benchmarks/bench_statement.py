@@ -0,0 +1,134 @@
+"""
+Customer statement streaming: time and memory against statement length.
+
+    python -m benchmarks.bench_statement
+    python -m benchmarks.bench_statement --transactions 5000,50000,200000
+
+For each size, builds a throwaway SQLite database where one customer has
+--transactions invoices and payments (about two invoices per payment)
+among --others rows of other customers, then downloads
+/customers/<id>/statement as CSV and as PDF through the test client.
+
+Reports time, output size and the peak Python heap while the response was
+being consumed (tracemalloc, so timings in that pass are slower and are
+not shown). A streamed statement's peak should stay flat as it grows. The
+CSV running balances are also checked against a plain Python pass.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app import create_app, init_db
+from models import db
+
+CUSTOMER = "Statement Customer"
+
+
+def populate(transactions, others):
+    rng = random.Random(20)
+    start = datetime(2020, 4, 1, 9)
+    invoices = []
+    payments = []
+
+    def add(name, customer_id, count):
+        for n in range(count):
+            invoice_id = len(invoices) + 1
+            created = start + timedelta(minutes=rng.randrange(6 * 365 * 24 * 60))
+            amount = round(rng.uniform(100, 50_000), 2)
+            invoices.append((invoice_id, f"INV/{invoice_id:07d}", customer_id, name, "33ABCDE0000F1Z5", amount,
+                             "addr", "12 Main Road\nChennai", "Pending", created))
+            if n % 2:
+                payments.append((f"PAY/{len(payments) + 1:07d}", invoice_id, 1, round(amount / 2, 2),
+                                 (created + timedelta(days=rng.randrange(90))).replace(hour=0), created))
+
+    # two invoices for every payment: 2/3 of the transactions are invoices
+    add(CUSTOMER, 1, round(transactions * 2 / 3))
+    add("Someone Else", None, others)
+
+    raw = db.engine.raw_connection()
+    cur = raw.cursor()
+    cur.execute("INSERT INTO customer (id, customer_name, customer_gstin, customer_address, "
+                "billing_address, receivables) VALUES (1, ?, '33ABCDE0000F1Z5', 'addr', "
+                "'12 Main Road\nChennai', 0)", (CUSTOMER,))
+    cur.executemany(
+        "INSERT INTO invoice (id, invoice_no, customer_id, customer_name, customer_gstin, amount, "
+        "customer_address, billing_address, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", invoices)
+    cur.executemany(
+        "INSERT INTO payment (payment_no, invoice_id, customer_id, amount, payment_date, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)", payments)
+    raw.commit()
+    raw.close()
+
+
+def download(client, fmt, trace):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(f'/customers/1/statement?format={fmt}', buffered=False)
+    size = 0
+    chunks = [] if fmt == 'csv' and not trace else None  # keeping them would count in the peak
+    for chunk in response.response:
+        size += len(chunk)
+        if chunks is not None:
+            chunks.append(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    body = b''.join(chunks).decode('utf-8-sig') if chunks is not None else None
+    return elapsed, size, peak, body
+
+
+def check_balances(body):
+    """Running balances recomputed row by row; returns the number of mismatches."""
+    rows = list(csv.reader(io.StringIO(body)))[1:]
+    balance = float(rows[0][6])
+    mismatches = 0
+    for row in rows[1:]:
+        balance += float(row[4] or 0) - float(row[5] or 0)
+        if abs(balance - float(row[6])) > 0.01:
+            mismatches += 1
+    return len(rows) - 1, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transactions', default='5000,50000',
+                        help='comma-separated statement lengths for the one customer')
+    parser.add_argument('--others', type=int, default=20_000, help='invoices of other customers')
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'format':>6} {'seconds':>8} {'lines/s':>9} {'MB out':>7} {'peak heap MB':>12}")
+    failed = False
+    for transactions in map(int, args.transactions.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            flask_app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+            with flask_app.app_context():
+                init_db()
+                populate(transactions, args.others)
+                client = flask_app.test_client()
+                for fmt in ('csv', 'pdf'):
+                    download(client, fmt, trace=False)  # warm-up: imports, statement cache
+                    elapsed, size, _, body = download(client, fmt, trace=False)
+                    _, _, peak, _ = download(client, fmt, trace=True)
+                    if body is not None:
+                        lines, mismatches = check_balances(body)
+                        failed = failed or mismatches > 0
+                    print(f"{lines:>8} {fmt:>6} {elapsed:>8.2f} {lines / elapsed:>9.0f} "
+                          f"{size / 1e6:>7.2f} {peak / 1e6:>12.2f}")
+                db.engine.dispose()
+    if failed:
+        print("running balance mismatches against Python reference")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
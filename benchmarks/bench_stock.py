@@ -0,0 +1,161 @@
+"""
+Parallel invoice writers racing for the same stock: no lost updates.
+
+    python -m benchmarks.bench_stock --processes 8 --invoices 200
+
+Sets up a throwaway SQLite database with a few --products, each with
+--stock units, then starts --processes processes that each post
+--invoices invoices to /add_invoice through the test client, every one
+taking 1-5 units of one to three of those products. Together they ask for
+more than there is, so some invoices must be turned away (409).
+
+Afterwards every product must satisfy
+
+    stock left = opening stock - units on the invoices that went through
+
+with no stock below zero and the stock movements adding up to it. For
+contrast the same load is then run as a naive read-modify-write (read
+the quantity, subtract in Python, write it back), which loses updates.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from multiprocessing import Pool
+
+from sqlalchemy import create_engine, func, select, update
+from werkzeug.datastructures import MultiDict
+
+import db_config
+import stock
+from app import create_app, init_db
+from models import Customer, Invoice, InvoiceItem, Product, StockMovement, db
+
+
+def setup(url, products, opening):
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    with flask_app.app_context():
+        init_db()
+        db.session.add(Customer(id=1, customer_name="Stock Customer", customer_gstin="33ABCDE0000F1Z5",
+                                customer_address="addr", billing_address="addr", receivables=0))
+        db.session.add_all(Product(id=n, name=f"Hot product {n}", price=100.0, quantity=opening,
+                                   tax_rate=18.0) for n in range(1, products + 1))
+        db.session.flush()
+        stock.record_movements((n, opening, 'opening', None) for n in range(1, products + 1))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def order(rng, products):
+    return [(pid, rng.randint(1, 5)) for pid in rng.sample(range(1, products + 1), rng.randint(1, 3))]
+
+
+def invoice_writer(args):
+    url, products, invoices, seed = args
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    client = flask_app.test_client()
+    rng = random.Random(seed)
+    statuses = {}
+    for _ in range(invoices):
+        form = [('invoice_date', '2026-04-01'), ('customer_id', '1'), ('status', 'Pending')]
+        for pid, qty in order(rng, products):
+            form += [('product_id[]', str(pid)), ('quantity[]', str(qty))]
+        status = client.post('/add_invoice', data=MultiDict(form)).status_code
+        statuses[status] = statuses.get(status, 0) + 1
+    with flask_app.app_context():
+        db.engine.dispose()
+    return statuses
+
+
+def naive_writer(args):
+    url, products, invoices, seed = args
+    engine = db_config.configure_engine(create_engine(url, **db_config.engine_options(url)))
+    product = Product.__table__
+    rng = random.Random(seed)
+    taken = 0
+    for _ in range(invoices):
+        for pid, qty in order(rng, products):
+            with engine.begin() as conn:
+                on_hand = conn.execute(select(product.c.quantity).where(product.c.id == pid)).scalar()
+                if on_hand >= qty:
+                    conn.execute(update(product).where(product.c.id == pid).values(quantity=on_hand - qty))
+                    taken += qty
+    engine.dispose()
+    return taken
+
+
+def run(writer, url, args):
+    started = time.perf_counter()
+    with Pool(args.processes) as pool:
+        results = pool.map(writer, [(url, args.products, args.invoices, seed)
+                                    for seed in range(args.processes)])
+    return results, time.perf_counter() - started
+
+
+def check(url, opening):
+    """Per-product (left, opening - invoiced, sum of movements)."""
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    with flask_app.app_context():
+        invoiced = dict(db.session.query(InvoiceItem.product_id, func.sum(InvoiceItem.quantity))
+                        .group_by(InvoiceItem.product_id).all())
+        moved = dict(db.session.query(StockMovement.product_id, func.sum(StockMovement.change))
+                     .group_by(StockMovement.product_id).all())
+        rows = [(p.quantity, opening - invoiced.get(p.id, 0), moved.get(p.id, 0))
+                for p in Product.query.order_by(Product.id)]
+        invoices = Invoice.query.count()
+        db.engine.dispose()
+    return rows, invoices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--invoices', type=int, default=200, help='per process')
+    parser.add_argument('--products', type=int, default=5)
+    parser.add_argument('--stock', type=int, default=1_500, help='opening units per product')
+    args = parser.parse_args()
+
+    wanted = args.processes * args.invoices * 2 * 3 / args.products  # units asked for, per product
+    print(f"{args.processes} processes x {args.invoices} invoices over {args.products} products, "
+          f"{args.stock} units each (about {wanted:.0f} asked for)")
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        setup(url, args.products, args.stock)
+        results, elapsed = run(invoice_writer, url, args)
+        statuses = {}
+        for result in results:
+            for status, count in result.items():
+                statuses[status] = statuses.get(status, 0) + count
+        rows, invoices = check(url, args.stock)
+
+        accepted = statuses.get(302, 0)
+        print(f"conditional UPDATE: {sum(statuses.values()) / elapsed:.0f} invoices/s, "
+              f"{accepted} accepted, {statuses.get(409, 0)} rejected for stock, "
+              f"other: {({s: n for s, n in statuses.items() if s not in (302, 409)}) or 'none'}")
+        for pid, (left, expected, moved) in enumerate(rows, 1):
+            ok = left == expected == moved and left >= 0
+            failed = failed or not ok
+            print(f"  product {pid}: {left} left, {expected} expected from the invoices, "
+                  f"movements {moved}{'' if ok else '  <-- MISMATCH'}")
+        if invoices != accepted:
+            failed = True
+            print(f"  {invoices} invoices stored but {accepted} accepted  <-- MISMATCH")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        setup(url, args.products, args.stock)
+        results, elapsed = run(naive_writer, url, args)
+        rows, _ = check(url, args.stock)
+        left = sum(row[0] for row in rows)
+        lost = left - (args.stock * args.products - sum(results))
+        print(f"naive read-modify-write: {sum(results)} units taken, "
+              f"{lost} of them never came off the stock (lost updates)")
+
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
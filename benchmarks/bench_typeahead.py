@@ -0,0 +1,92 @@
+"""
+Build time, memory and lookup latency of the typeahead prefix index.
+
+    python -m benchmarks.bench_typeahead --rows 20000
+
+Indexes --rows synthetic product names (no database involved), then
+times lookups for random 1-4 letter prefixes and single-row refreshes.
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+
+import typeahead
+
+Row = namedtuple('Row', 'id name price tax_rate')
+
+WORDS = ("steel copper brass mild rod pipe sheet wire bolt nut washer flange "
+         "valve elbow tee coupling cable tray panel box clamp hinge bracket "
+         "angle channel plate coil gasket seal bearing").split()
+
+
+def make_rows(count, rng):
+    return [
+        Row(n, f"{' '.join(rng.sample(WORDS, 3)).title()} {rng.randrange(1, 500)}mm",
+            round(rng.uniform(10, 5000), 2), rng.choice((5.0, 12.0, 18.0, 28.0)))
+        for n in range(1, count + 1)
+    ]
+
+
+def percentile(samples, pct):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--lookups', type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(13)
+    rows = make_rows(args.rows, rng)
+    by_id = {row.id: row for row in rows}
+
+    index = typeahead.PrefixIndex(
+        load=lambda ids=None: rows if ids is None else [by_id[i] for i in ids if i in by_id],
+        describe=lambda row: (row.id, (row.name,), {
+            'id': row.id, 'name': row.name, 'price': row.price, 'tax_rate': row.tax_rate,
+        }),
+        fallback=lambda prefix, limit: [],
+        max_entries=max(args.rows, typeahead.DEFAULT_MAX_ENTRIES),
+    )
+
+    started = time.perf_counter()
+    index.rebuild()
+    build = time.perf_counter() - started
+
+    # rebuild again under tracemalloc (which slows it down) for the memory figure
+    index.invalidate()
+    tracemalloc.start()
+    index.rebuild()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    prefixes = [
+        rng.choice(WORDS)[:rng.randrange(1, 5)] for _ in range(args.lookups)
+    ]
+    lookups = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.search(prefix, 10)
+        lookups.append(time.perf_counter() - started)
+
+    refreshes = []
+    for _ in range(1000):
+        row_id = rng.randrange(1, args.rows + 1)
+        by_id[row_id] = by_id[row_id]._replace(name=f"{rng.choice(WORDS).title()} renamed")
+        started = time.perf_counter()
+        index.refresh([row_id])
+        refreshes.append(time.perf_counter() - started)
+
+    print(f"rows: {len(index)}, build: {build * 1000:.0f} ms, memory: {memory / 1024 / 1024:.1f} MB")
+    print(f"lookup  p50 {statistics.median(lookups) * 1e6:.1f} us, "
+          f"p99 {percentile(lookups, 99) * 1e6:.1f} us")
+    print(f"refresh p50 {statistics.median(refreshes) * 1e6:.1f} us, "
+          f"p99 {percentile(refreshes, 99) * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
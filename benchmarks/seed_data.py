@@ -0,0 +1,355 @@
+"""
+Seeded synthetic data for benchmarks and local testing.
+
+    python -m benchmarks.seed_data --db /tmp/invoiceo.db --scale medium
+    python -m benchmarks.seed_data --db /tmp/invoiceo.db --invoices 100000 --seed 7
+
+Fills every model in models.py: categories, products, customers, sales
+orders (open, part-invoiced and completed), invoices with GST line items,
+full and partial payments, and expenses, spread over the last --days days.
+The same seed always produces the same rows.
+
+Rows go in through Core executemany; the derived state is then made to
+match, so verify-rollups and check-paid-totals pass on the result:
+invoice/SO/payment numbers come from the document sequences, paid totals
+and statuses follow the payments, customer receivables are the open
+balances, the dashboard rollups are rebuilt and each product's stock is
+its opening movement (seeded invoices are history and take no stock).
+The full-text index is filled by its triggers.
+"""
+import argparse
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+import gst
+import sequences
+from extensions import TYPEAHEAD_INDEXES
+from gst_returns import rebuild_gst_rollups
+from ledger import rebuild_rollups
+from models import (SELLER_GSTIN, Category, Customer, Expense, Invoice, InvoiceItem, Payment, Product,
+                    SalesOrder, SalesOrderItem, StockMovement, db)
+
+SCALES = {
+    'small': dict(categories=10, products=500, customers=100, sales_orders=300,
+                  invoices=3_000, expenses=500),
+    'medium': dict(categories=20, products=5_000, customers=1_000, sales_orders=3_000,
+                   invoices=30_000, expenses=3_000),
+    'large': dict(categories=50, products=20_000, customers=5_000, sales_orders=20_000,
+                  invoices=300_000, expenses=20_000),
+}
+
+BATCH = 5_000
+
+WORDS = ("steel copper brass mild rod pipe sheet wire bolt nut washer flange "
+         "valve elbow tee coupling cable tray panel box clamp hinge bracket "
+         "angle channel plate coil gasket seal bearing").split()
+TOWNS = ("chennai madurai coimbatore salem trichy erode vellore tirunelveli "
+         "hosur karur thanjavur nagercoil bengaluru kochi").split()
+CATEGORIES = ("Hardware Electrical Plumbing Fasteners Tools Safety Pipes Cables "
+              "Valves Fittings Paints Adhesives").split()
+EXPENSE_CATEGORIES = ('Rent', 'Salary', 'Fuel', 'Electricity', 'Freight', 'Office', 'Repairs')
+MODES = ('Cash', 'UPI', 'Bank')
+OTHER_STATES = ('29', '32', '27', '24', '36')
+
+
+def load_app(url):
+    """An app on `url`, with its schema created and migrated."""
+    from app import create_app, init_db
+
+    flask_app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    with flask_app.app_context():
+        init_db()
+    return flask_app
+
+
+class Generator:
+    def __init__(self, seed, end, days, report):
+        self.rng = random.Random(seed)
+        self.end = datetime.combine(end, datetime.min.time()) + timedelta(hours=18)
+        self.start = self.end - timedelta(days=days)
+        self.report = report
+
+    # ---- helpers ----
+    def when(self):
+        span = (self.end - self.start).total_seconds()
+        return self.start + timedelta(seconds=self.rng.random() * span)
+
+    def gstin(self, state):
+        letters = ''.join(self.rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(5))
+        return f"{state}{letters}{self.rng.randrange(10000):04d}{self.rng.choice('ABCDEFGH')}1Z{self.rng.randrange(10)}"
+
+    def address(self):
+        return (f"{self.rng.randrange(1, 300)}, {self.rng.choice(WORDS).title()} Street, "
+                f"{self.rng.choice(TOWNS).title()}")
+
+    def numbers(self, conn, prefix, dates):
+        """Document numbers for `dates`, allocated per fiscal year in date order."""
+        by_year = defaultdict(list)
+        for i, when in enumerate(dates):
+            by_year[sequences.fiscal_year(when)].append(i)
+        out = [None] * len(dates)
+        for indexes in by_year.values():
+            first = dates[indexes[0]]
+            for i, number in zip(indexes, sequences.next_numbers(conn, prefix, first, len(indexes))):
+                out[i] = number
+        return out
+
+    def insert(self, model, rows):
+        conn = db.session.connection()
+        for offset in range(0, len(rows), BATCH):
+            conn.execute(insert(model.__table__), rows[offset:offset + BATCH])
+
+    def next_id(self, model):
+        return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+    # ---- tables ----
+    def categories(self, count):
+        rows = [
+            {'id': n, 'name': f"{CATEGORIES[(n - 1) % len(CATEGORIES)]} {n}",
+             'description': "Seeded category"}
+            for n in range(1, count + 1)
+        ]
+        self.insert(Category, rows)
+        return [row['id'] for row in rows]
+
+    def products(self, count, category_ids):
+        rng = self.rng
+        self.product_rows = [
+            {'id': n,
+             'name': f"{' '.join(rng.sample(WORDS, 2)).title()} {rng.randrange(1, 500)}mm",
+             'description': f"{rng.choice(WORDS)} {rng.choice(WORDS)}",
+             'price': round(rng.uniform(10, 5000), 2),
+             'quantity': rng.randrange(0, 1000),
+             'tax_rate': rng.choice((0.0, 5.0, 12.0, 18.0, 18.0, 28.0)),
+             'discount': 0.0,
+             'category_id': rng.choice(category_ids),
+             'created_at': self.start}
+            for n in range(1, count + 1)
+        ]
+        self.insert(Product, self.product_rows)
+        self.insert(StockMovement, [
+            {'product_id': row['id'], 'change': row['quantity'], 'reason': 'opening',
+             'created_at': self.start}
+            for row in self.product_rows if row['quantity']
+        ])
+
+    def customers(self, count):
+        rng = self.rng
+        seller_state = SELLER_GSTIN[:2]
+        self.customer_rows = [
+            {'id': n,
+             'customer_name': f"{rng.choice(WORDS).title()} {rng.choice(TOWNS).title()} Traders {n}",
+             'customer_gstin': self.gstin(seller_state if rng.random() < 0.7 else rng.choice(OTHER_STATES)),
+             'customer_address': self.address(),
+             'billing_address': self.address(),
+             'receivables': 0.0}
+            for n in range(1, count + 1)
+        ]
+        self.insert(Customer, self.customer_rows)
+
+    def sales_orders(self, count):
+        rng = self.rng
+        conn = db.session.connection()
+        dates = sorted(self.when() for _ in range(count))
+        numbers = self.numbers(conn, "SO", dates)
+
+        orders = []
+        items = []
+        for n, (order_date, so_number) in enumerate(zip(dates, numbers), start=1):
+            customer = rng.choice(self.customer_rows)
+            state = rng.choices(('Open', 'Partially Invoiced', 'Completed'), (3, 3, 4))[0]
+            order_items = []
+            for product in rng.sample(self.product_rows, rng.randint(1, 8)):
+                ordered = rng.randint(1, 50)
+                invoiced = {'Open': 0, 'Completed': ordered}.get(state, rng.randint(0, ordered - 1))
+                order_items.append({'sales_order_id': n, 'product_id': product['id'],
+                                    'product_name': product['name'], 'ordered_qty': ordered,
+                                    'invoiced_qty': invoiced,
+                                    'unit_price': round(product['price'] * rng.uniform(0.9, 1.0), 2)})
+            if state == 'Partially Invoiced' and not any(i['invoiced_qty'] for i in order_items):
+                state = 'Open'
+            items.extend(order_items)
+            total = sum(i['ordered_qty'] * i['unit_price'] for i in order_items)
+            orders.append({'id': n, 'so_number': so_number,
+                           'customer_po_number': f"PO-{rng.randrange(100000):05d}",
+                           'total_value': round(total, 2), 'customer_id': customer['id'],
+                           'order_date': order_date, 'created_at': order_date, 'status': state})
+
+        self.insert(SalesOrder, orders)
+        self.insert(SalesOrderItem, items)
+
+    def invoices(self, count):
+        rng = self.rng
+        seller = SELLER_GSTIN
+        next_invoice = self.next_id(Invoice)
+
+        for offset in range(0, count, BATCH):
+            size = min(BATCH, count - offset)
+            conn = db.session.connection()
+            dates = sorted(self.when() for _ in range(size))
+            numbers = self.numbers(conn, "INV", dates)
+
+            invoices = []
+            lines = []
+            for invoice_date, invoice_no in zip(dates, numbers):
+                customer = rng.choice(self.customer_rows)
+                intra = gst.is_intra_state(seller, customer['customer_gstin'])
+                invoice_id = next_invoice
+                next_invoice += 1
+                for product in rng.sample(self.product_rows, rng.randint(1, 10)):
+                    lines.append((invoice_id, product, rng.randint(1, 20), intra))
+                invoices.append({
+                    'id': invoice_id, 'invoice_no': invoice_no,
+                    'customer_name': customer['customer_name'],
+                    'customer_gstin': customer['customer_gstin'],
+                    'customer_address': customer['customer_address'],
+                    'billing_address': customer['billing_address'],
+                    'created_at': invoice_date, 'amount': 0, 'paid_total': 0.0,
+                    'customer_id': customer['id'],
+                })
+
+            paise = gst.compute(
+                [product['price'] for _, product, _, _ in lines],
+                [qty for _, _, qty, _ in lines],
+                [product['tax_rate'] for _, product, _, _ in lines],
+                [intra for _, _, _, intra in lines],
+            )
+            by_id = {invoice['id']: invoice for invoice in invoices}
+            items = []
+            for i, (invoice_id, product, qty, _) in enumerate(lines):
+                total = paise['total'][i]
+                by_id[invoice_id]['amount'] += total
+                items.append({
+                    'invoice_id': invoice_id, 'product_id': product['id'],
+                    'product_name': product['name'], 'quantity': qty,
+                    'unit_price': product['price'], 'gst_rate': product['tax_rate'],
+                    'taxable_value': gst.rupees(paise['taxable'][i]),
+                    'cgst': gst.rupees(paise['cgst'][i]),
+                    'sgst': gst.rupees(paise['sgst'][i]),
+                    'igst': gst.rupees(paise['igst'][i]),
+                    'total': gst.rupees(total),
+                })
+            for invoice in invoices:
+                invoice['amount'] = gst.rupees(invoice['amount'])
+
+            payments = self.payments_for(invoices)
+            payment_numbers = self.numbers(conn, "PAY", [p['payment_date'] for p in payments])
+            for payment, number in zip(payments, payment_numbers):
+                payment['payment_no'] = number
+
+            self.insert(Invoice, invoices)
+            self.insert(InvoiceItem, items)
+            self.insert(Payment, payments)
+            db.session.commit()
+            self.report(f"  invoices {offset + size}/{count}")
+
+    def payments_for(self, invoices):
+        """Full, partial or no payments; sets each invoice's paid_total and status."""
+        rng = self.rng
+        payments = []
+        for invoice in invoices:
+            amount = invoice['amount']
+            age = (self.end - invoice['created_at']).days
+            outcome = rng.choices(('paid', 'partial', 'open'), (35, 30, 35))[0]
+
+            if outcome == 'paid':
+                half = round(amount / 2, 2)
+                parts = [amount] if rng.random() < 0.7 else [half, round(amount - half, 2)]
+            elif outcome == 'partial':
+                parts = [round(amount * rng.uniform(0.1, 0.9), 2)]
+            else:
+                parts = []
+
+            for part in parts:
+                paid_on = min(invoice['created_at'] + timedelta(days=rng.randint(0, 60)), self.end)
+                payments.append({'invoice_id': invoice['id'], 'customer_id': invoice['customer_id'],
+                                 'amount': part, 'mode': rng.choice(MODES),
+                                 'reference': f"TXN{rng.randrange(10**8):08d}",
+                                 'payment_date': paid_on, 'created_at': paid_on})
+
+            invoice['paid_total'] = round(sum(parts), 2)
+            if outcome == 'paid':
+                invoice['status'] = 'Paid'
+            elif outcome == 'partial':
+                invoice['status'] = 'Partially Paid'
+            else:
+                invoice['status'] = 'Overdue' if age > 45 else 'Pending'
+        payments.sort(key=lambda p: p['payment_date'])
+        return payments
+
+    def expenses(self, count):
+        rng = self.rng
+        rows = []
+        for _ in range(count):
+            category = rng.choice(EXPENSE_CATEGORIES)
+            rows.append({'title': f"{category} {rng.choice(TOWNS).title()}", 'category': category,
+                         'amount': round(rng.uniform(100, 50_000), 2), 'payment_mode': rng.choice(MODES),
+                         'reference': f"BILL-{rng.randrange(10**6):06d}", 'expense_date': self.when(),
+                         'notes': None})
+        self.insert(Expense, rows)
+
+    def receivables(self):
+        db.session.execute(text(
+            "UPDATE customer SET receivables = COALESCE(("
+            "SELECT SUM(amount - paid_total) FROM invoice "
+            "WHERE invoice.customer_id = customer.id AND invoice.status != 'Paid'), 0)"
+        ))
+
+
+def seed(url, counts, seed=42, end=None, days=730, report=print):
+    """Seed an empty database at `url`; returns an app bound to it."""
+    flask_app = load_app(url)
+    started = time.perf_counter()
+
+    with flask_app.app_context():
+        if db.session.execute(select(func.count()).select_from(Invoice.__table__)).scalar():
+            raise RuntimeError(f"{url} already has invoices; seed an empty database")
+
+        gen = Generator(seed, end or date.today(), days, report)
+        category_ids = gen.categories(counts['categories'])
+        gen.products(counts['products'], category_ids)
+        gen.customers(counts['customers'])
+        gen.sales_orders(counts['sales_orders'])
+        db.session.commit()
+        report(f"  catalogue, customers and {counts['sales_orders']} sales orders")
+
+        gen.invoices(counts['invoices'])
+        gen.expenses(counts['expenses'])
+        gen.receivables()
+        db.session.commit()
+
+        rebuild_rollups()
+        rebuild_gst_rollups()
+        for index in TYPEAHEAD_INDEXES:
+            index.invalidate()
+
+    report(f"seeded {url} in {time.perf_counter() - started:.1f}s")
+    return flask_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite file to create (or a database URL)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end', type=date.fromisoformat, help='last day of data (default: today)')
+    parser.add_argument('--days', type=int, default=730)
+    for name in SCALES['small']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                            help=f"override the scale's {name.replace('_', ' ')} count")
+    args = parser.parse_args()
+
+    counts = dict(SCALES[args.scale])
+    counts.update({name: getattr(args, name) for name in counts if getattr(args, name) is not None})
+
+    url = args.db if '://' in args.db else f"sqlite:///{os.path.abspath(args.db)}"
+    seed(url, counts, seed=args.seed, end=args.end, days=args.days)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+App-wide helpers that hold state between requests, created unbound like
+`db` and configured by create_app():
+
+- pdf_cache: rendered invoice PDFs on disk
+- request_metrics: per-endpoint request and SQL metrics
+- product_index / customer_index / sales_order_index: typeahead lookups
+- sales_snapshot: columnar invoice lines behind the analytics API
+"""
+from sqlalchemy import func
+
+import analytics
+import metrics
+import typeahead
+from models import Customer, Product, SalesOrder, db
+from pdf_cache import PdfCache
+
+ANALYTICS_MAX_AGE = 3600  # seconds between full sales snapshot reloads
+
+pdf_cache = PdfCache()
+request_metrics = metrics.RequestMetrics()
+sales_snapshot = analytics.SalesSnapshot(ANALYTICS_MAX_AGE)
+
+
+# ---------------- TYPEAHEAD INDEXES ----------------
+def typeahead_index(query, id_col, name_col, describe):
+    """PrefixIndex over `query()`, falling back to a name prefix match in SQL."""
+    def load(ids=None):
+        rows = query()
+        if ids is None:
+            return rows.yield_per(1000)
+        return rows.filter(id_col.in_(ids)).all()
+
+    def fallback(prefix, limit):
+        return query().filter(
+            func.lower(name_col).startswith(typeahead.normalize(prefix), autoescape=True)
+        ).order_by(name_col).limit(limit).all()
+
+    return typeahead.PrefixIndex(load, describe, fallback)
+
+
+product_index = typeahead_index(
+    lambda: db.session.query(Product.id, Product.name, Product.price, Product.tax_rate),
+    Product.id, Product.name,
+    lambda row: (row.id, (row.name,), {
+        'id': row.id, 'name': row.name, 'price': row.price or 0, 'tax_rate': row.tax_rate,
+    })
+)
+
+customer_index = typeahead_index(
+    lambda: db.session.query(
+        Customer.id, Customer.customer_name, Customer.customer_gstin,
+        Customer.customer_address, Customer.billing_address
+    ),
+    Customer.id, Customer.customer_name,
+    lambda row: (row.id, (row.customer_name, row.customer_gstin), {
+        'id': row.id,
+        'name': row.customer_name,
+        'gstin': row.customer_gstin,
+        'address': row.customer_address,
+        'billing': row.billing_address,
+    })
+)
+
+# only open orders can be invoiced, so completed ones drop out of the index
+sales_order_index = typeahead_index(
+    lambda: db.session.query(
+        SalesOrder.id, SalesOrder.so_number, SalesOrder.customer_po_number,
+        Customer.customer_name, Customer.customer_gstin,
+        Customer.customer_address, Customer.billing_address
+    ).join(SalesOrder.customer).filter(SalesOrder.status != 'Completed'),
+    SalesOrder.id, SalesOrder.so_number,
+    lambda row: (row.id, (row.so_number, row.customer_name), {
+        'id': row.id,
+        'so_number': row.so_number,
+        'po': row.customer_po_number,
+        'customer': row.customer_name,
+        'gstin': row.customer_gstin,
+        'address': row.customer_address,
+        'billing': row.billing_address,
+    })
+)
+
+
+TYPEAHEAD_INDEXES = (product_index, customer_index, sales_order_index)
+
+
+def init_app(app):
+    pdf_cache.init_app(app)
+    request_metrics.init_app(app)
+    for index in TYPEAHEAD_INDEXES:
+        index.max_entries = app.config['TYPEAHEAD_MAX_ENTRIES']
+        index.max_age = app.config['TYPEAHEAD_MAX_AGE']
+    sales_snapshot.max_age = app.config['ANALYTICS_MAX_AGE']
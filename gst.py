@@ -0,0 +1,157 @@
+"""
+GST engine.
+
+Works on whole invoices (or whole import batches) at once, in integer
+paise, so results are exact and do not depend on float rounding:
+
+- unit prices are converted to paise and rates to basis points once
+  (both lookups are memoized, as is the GSTIN state code)
+- taxable = price * qty
+- intra-state: CGST = SGST = taxable * rate / 2, inter-state: IGST = taxable * rate,
+  each rounded half-up to the paisa
+- line total = taxable + CGST + SGST + IGST, so the printed columns add up
+
+With NumPy installed, batches of VECTOR_THRESHOLD lines or more are
+computed with int64 array arithmetic; otherwise (and for small invoices)
+the same formulas run as a plain Python loop. NumPy is only imported on
+the first such batch, so single invoices never pay for loading it.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+VECTOR_THRESHOLD = 256
+
+FIELDS = ('taxable', 'cgst', 'sgst', 'igst', 'total')
+
+
+@lru_cache(maxsize=None)
+def numpy():
+    """The numpy module, or None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:  # optional speed-up
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=4096)
+def state_code(gstin):
+    return gstin[:2] if gstin and len(gstin) >= 2 else None
+
+
+def is_intra_state(seller_gstin, buyer_gstin):
+    return state_code(seller_gstin) == state_code(buyer_gstin)
+
+
+# Float amounts within this distance of a whole number of hundredths are
+# taken as exact; anything else goes through Decimal.
+SNAP = 1e-6
+
+
+def _hundredths(value):
+    scaled = (value or 0) * 100
+    nearest = round(scaled)
+    if abs(scaled - nearest) < SNAP:
+        return int(nearest)
+    return int((Decimal(str(value)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+@lru_cache(maxsize=65536)
+def to_paise(amount):
+    return _hundredths(amount)
+
+
+@lru_cache(maxsize=256)
+def rate_bp(rate):
+    """GST rate in percent -> basis points (18.0 -> 1800)."""
+    return _hundredths(rate)
+
+
+def rupees(paise):
+    return paise / 100
+
+
+def _compute_python(prices, quantities, rates, intra):
+    out = {field: [] for field in FIELDS}
+    for price, qty, rate, same_state in zip(prices, quantities, rates, intra):
+        taxable = price * qty
+        scaled = taxable * rate * 2
+        if same_state:
+            half = (scaled + 20000) // 40000
+            cgst, sgst, igst = half, half, 0
+        else:
+            cgst, sgst, igst = 0, 0, (scaled + 10000) // 20000
+        out['taxable'].append(taxable)
+        out['cgst'].append(cgst)
+        out['sgst'].append(sgst)
+        out['igst'].append(igst)
+        out['total'].append(taxable + cgst + sgst + igst)
+    return out
+
+
+def _hundredths_array(values, convert):
+    np = numpy()
+    scaled = np.asarray(values, dtype=np.float64) * 100
+    nearest = np.rint(scaled)
+    if np.all(np.abs(scaled - nearest) < SNAP):
+        return nearest.astype(np.int64)
+    return np.asarray([convert(v) for v in values], dtype=np.int64)
+
+
+def _compute_numpy(prices, quantities, rates, intra):
+    np = numpy()
+    price = _hundredths_array(prices, to_paise)
+    qty = np.asarray(quantities, dtype=np.int64)
+    rate = _hundredths_array(rates, rate_bp)
+    same_state = np.asarray(intra, dtype=bool)
+
+    taxable = price * qty
+    scaled = taxable * rate * 2
+    half = np.where(same_state, (scaled + 20000) // 40000, 0)
+    igst = np.where(same_state, 0, (scaled + 10000) // 20000)
+    total = taxable + 2 * half + igst
+
+    return {
+        'taxable': taxable.tolist(),
+        'cgst': half.tolist(),
+        'sgst': half.tolist(),
+        'igst': igst.tolist(),
+        'total': total.tolist(),
+    }
+
+
+def compute(prices, quantities, rates, intra):
+    """
+    GST for many lines in one pass.
+
+    prices are in rupees, rates in percent, intra is a bool per line (or a
+    single bool for the whole batch). Returns {field: [paise, ...]} for
+    taxable, cgst, sgst, igst and total.
+    """
+    if isinstance(intra, bool):
+        intra = [intra] * len(prices)
+
+    if len(prices) >= VECTOR_THRESHOLD and numpy() is not None:
+        return _compute_numpy(prices, quantities, rates, intra)
+
+    return _compute_python(
+        [to_paise(p) for p in prices],
+        [int(q) for q in quantities],
+        [rate_bp(r) for r in rates],
+        intra
+    )
+
+
+def invoice_lines(lines, seller_gstin, buyer_gstin):
+    """
+    GST for one invoice. `lines` is a list of (price, qty, rate); returns a
+    list of dicts in rupees, shaped like the old calculate_gst() result.
+    """
+    if not lines:
+        return []
+    prices, quantities, rates = zip(*lines)
+    paise = compute(prices, quantities, rates, is_intra_state(seller_gstin, buyer_gstin))
+    return [
+        {field: rupees(paise[field][i]) for field in FIELDS}
+        for i in range(len(lines))
+    ]
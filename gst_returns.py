@@ -0,0 +1,344 @@
+"""
+GSTR-1 style summaries of the GST charged on invoice lines.
+
+The reports never scan invoice_item. Line totals are rolled up as invoices
+are written, in integer paise so sums are exact, into three tables:
+
+- gst_rollup: per day, B2B/B2C, intra/inter-state and rate. The rate-wise
+  summaries read only this, so a financial year is a few thousand rows
+  however many lines were invoiced.
+- gst_customer_rollup: per month, registered buyer GSTIN, supply type and
+  rate, for the B2B summary by GSTIN.
+- gst_invoice_rollup: per invoice and rate, for the invoice-wise B2B table
+  and for the part months at either end of a B2B summary period.
+
+add_invoice_gst() records new invoices and apply_invoice_gst() moves one
+when its GSTIN is edited, both inside the caller's transaction.
+gst_rollup_drift() recomputes the tables from invoice_item and compares
+them in SQL; rebuild_gst_rollups() replaces them.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, cast, extract, func, insert, or_, select, true
+
+import gst
+from models import (SELLER_GSTIN, GstCustomerRollup, GstInvoiceRollup, GstRollup, Invoice, InvoiceItem,
+                    db)
+
+GSTIN_LENGTH = 15
+ITEM_FIELDS = ('taxable_value', 'cgst', 'sgst', 'igst')
+PAISE_COLUMNS = ('taxable_paise', 'cgst_paise', 'sgst_paise', 'igst_paise')
+
+KEYS = {
+    GstRollup: ('day', 'b2b', 'inter_state', 'gst_rate'),
+    GstCustomerRollup: ('year', 'month', 'customer_gstin', 'inter_state', 'gst_rate'),
+    GstInvoiceRollup: ('invoice_id', 'gst_rate'),
+}
+
+
+# ---------------- MAINTENANCE ----------------
+def is_b2b(gstin):
+    return len(gstin or '') == GSTIN_LENGTH
+
+
+def rate_totals(items):
+    """{gst_rate: [taxable, cgst, sgst, igst] in paise} for invoice_item dicts."""
+    totals = {}
+    for item in items:
+        amounts = totals.setdefault(item['gst_rate'], [0, 0, 0, 0])
+        for i, field in enumerate(ITEM_FIELDS):
+            amounts[i] += gst.to_paise(item[field])
+    return totals
+
+
+def _add(totals, key, amounts, sign=1):
+    total = totals.setdefault(key, [0, 0, 0, 0])
+    for i, amount in enumerate(amounts):
+        total[i] += sign * amount
+
+
+def _invoice_totals(daily, customers, created_at, gstin, rates, sign=1):
+    b2b = is_b2b(gstin)
+    inter_state = not gst.is_intra_state(SELLER_GSTIN, gstin)
+    for rate, amounts in rates.items():
+        _add(daily, (created_at.date(), b2b, inter_state, rate), amounts, sign)
+        if b2b:
+            _add(customers, (created_at.year, created_at.month, gstin, inter_state, rate), amounts, sign)
+
+
+def bump_gst_rollup(model, key, amounts):
+    """Add paise `amounts` to one rollup row inside the current transaction."""
+    key = dict(zip(KEYS[model], key))
+    updated = model.query.filter_by(**key).update(
+        {getattr(model, column): getattr(model, column) + delta
+         for column, delta in zip(PAISE_COLUMNS, amounts)},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(model(**key, **dict(zip(PAISE_COLUMNS, amounts))))
+        db.session.flush()
+
+
+def _bump_all(daily, customers):
+    for key, amounts in daily.items():
+        bump_gst_rollup(GstRollup, key, amounts)
+    for key, amounts in customers.items():
+        bump_gst_rollup(GstCustomerRollup, key, amounts)
+
+
+def add_invoice_gst(invoices):
+    """
+    Roll up newly written invoices, given as (invoice_id, created_at,
+    customer_gstin, invoice_item dicts) tuples. Totals are merged across
+    the batch first, so an import touches each rollup row once.
+    """
+    daily, customers, invoice_rows = {}, {}, []
+    for invoice_id, created_at, gstin, items in invoices:
+        rates = rate_totals(items)
+        _invoice_totals(daily, customers, created_at, gstin, rates)
+        invoice_rows += [
+            dict(invoice_id=invoice_id, gst_rate=rate, **dict(zip(PAISE_COLUMNS, amounts)))
+            for rate, amounts in rates.items()
+        ]
+
+    if invoice_rows:
+        db.session.execute(insert(GstInvoiceRollup.__table__), invoice_rows)
+    _bump_all(daily, customers)
+
+
+def apply_invoice_gst(invoice, sign=1):
+    # call with sign=-1 before changing an invoice's GSTIN and again after
+    rates = {
+        row.gst_rate: [getattr(row, column) for column in PAISE_COLUMNS]
+        for row in GstInvoiceRollup.query.filter_by(invoice_id=invoice.id)
+    }
+    daily, customers = {}, {}
+    _invoice_totals(daily, customers, invoice.created_at, invoice.customer_gstin, rates, sign)
+    _bump_all(daily, customers)
+
+
+# ---------------- PERIODS ----------------
+def month_start(when):
+    return datetime(when.year, when.month, 1)
+
+
+def next_month(when):
+    return datetime(when.year + when.month // 12, when.month % 12 + 1, 1)
+
+
+def month_number(year, month):
+    return year * 12 + month - 1
+
+
+def widen_to_months(start, end):
+    """[start, end) grown to whole months, the grain of gst_customer_rollup."""
+    start = month_start(start) if start else None
+    if end and end != month_start(end):
+        end = next_month(end)
+    return start, end
+
+
+def _bounds(model, start, end):
+    return widen_to_months(start, end) if model is GstCustomerRollup else (start, end)
+
+
+def _invoice_range(inv, start, end):
+    conditions = []
+    if start:
+        conditions.append(inv.c.created_at >= start)
+    if end:
+        conditions.append(inv.c.created_at < end)
+    return and_(true(), *conditions)
+
+
+def _stored_range(model, start, end):
+    """Conditions selecting the rows of `model` for invoices dated in [start, end)."""
+    conditions = []
+    if model is GstRollup:
+        if start:
+            conditions.append(GstRollup.day >= start.date())
+        if end:
+            conditions.append(GstRollup.day < end.date())
+    elif model is GstCustomerRollup:
+        number = month_number(GstCustomerRollup.year, GstCustomerRollup.month)
+        if start:
+            conditions.append(number >= month_number(start.year, start.month))
+        if end:
+            conditions.append(number < month_number(end.year, end.month))
+    else:
+        inv = Invoice.__table__
+        conditions.append(GstInvoiceRollup.invoice_id.in_(
+            select(inv.c.id).where(_invoice_range(inv, start, end))
+        ))
+    return conditions
+
+
+# ---------------- VERIFY / REBUILD ----------------
+def rollup_sources(start=None, end=None):
+    """
+    {model: select computing its rows from invoice_item} for invoices dated
+    in [start, end) (midnights, or None for unbounded; gst_customer_rollup
+    always covers whole months). The columns are the model's keys then its
+    paise amounts, so a select can be compared with the stored rows or
+    inserted as it is.
+    """
+    inv = Invoice.__table__
+    item = InvoiceItem.__table__
+    joined = item.join(inv, inv.c.id == item.c.invoice_id)
+    paise = [cast(func.sum(func.round(item.c[field] * 100)), db.BigInteger) for field in ITEM_FIELDS]
+
+    b2b = func.length(inv.c.customer_gstin) == GSTIN_LENGTH
+    inter_state = func.substr(inv.c.customer_gstin, 1, 2) != gst.state_code(SELLER_GSTIN)
+    keys = {
+        GstRollup: (func.date(inv.c.created_at, type_=db.Date), b2b, inter_state, item.c.gst_rate),
+        GstCustomerRollup: (extract('year', inv.c.created_at), extract('month', inv.c.created_at),
+                            inv.c.customer_gstin, inter_state, item.c.gst_rate),
+        GstInvoiceRollup: (item.c.invoice_id, item.c.gst_rate),
+    }
+
+    sources = {}
+    for model, key in keys.items():
+        statement = select(*key, *paise).select_from(joined).where(
+            _invoice_range(inv, *_bounds(model, start, end))
+        )
+        if model is GstCustomerRollup:
+            statement = statement.where(b2b)
+        sources[model] = statement.group_by(*key)
+    return sources
+
+
+def _stored(model, start, end):
+    columns = [getattr(model, column) for column in KEYS[model] + PAISE_COLUMNS]
+    nonzero = or_(*[getattr(model, column) != 0 for column in PAISE_COLUMNS])
+    return select(*columns).where(nonzero, *_stored_range(model, *_bounds(model, start, end)))
+
+
+def gst_rollup_drift(start=None, end=None):
+    """
+    (table, key, stored, expected) for every rollup row that differs from
+    invoice_item; amounts are [taxable, cgst, sgst, igst] in paise. The
+    comparison is an EXCEPT both ways, so only differences leave the
+    database.
+    """
+    drift = []
+    zero = [0, 0, 0, 0]
+    for model, source in rollup_sources(start, end).items():
+        stored = _stored(model, start, end)
+        width = len(KEYS[model])
+        have, want = {}, {}
+        for found, statement in ((want, source.except_(stored)), (have, stored.except_(source))):
+            for row in db.session.execute(statement):
+                found[tuple(row[:width])] = list(row[width:])
+        for key in sorted(set(have) | set(want)):
+            drift.append((model.__tablename__, key, have.get(key, zero), want.get(key, zero)))
+    return drift
+
+
+def fill_gst_rollups(conn, start=None, end=None):
+    """INSERT ... SELECT the rollups for [start, end) from invoice_item; the rows must not exist."""
+    for model, source in rollup_sources(start, end).items():
+        conn.execute(insert(model.__table__).from_select(KEYS[model] + PAISE_COLUMNS, source))
+
+
+def rebuild_gst_rollups(start=None, end=None):
+    """Replace the stored rollups for [start, end) with recomputed ones; returns the drift fixed."""
+    drift = gst_rollup_drift(start, end)
+    for model in KEYS:
+        model.query.filter(
+            *_stored_range(model, *_bounds(model, start, end))
+        ).delete(synchronize_session=False)
+    fill_gst_rollups(db.session.connection(), start, end)
+    db.session.commit()
+    return drift
+
+
+# ---------------- REPORTS ----------------
+def _paise_sums(model):
+    return [func.coalesce(func.sum(getattr(model, column)), 0) for column in PAISE_COLUMNS]
+
+
+def _with_tax(key, paise):
+    """Key columns, then the amounts in rupees and their total tax."""
+    return (*key, *[round(value / 100, 2) for value in paise], round(sum(paise[1:]) / 100, 2))
+
+
+def rate_summary(start, end, b2b=None):
+    """
+    (rate, inter_state, taxable, cgst, sgst, igst, tax) per rate and supply
+    type for invoices dated in [start, end); b2b=True/False limits it to
+    registered/unregistered buyers.
+    """
+    group_by = (GstRollup.gst_rate, GstRollup.inter_state)
+    query = db.session.query(*group_by, *_paise_sums(GstRollup)).filter(
+        *_stored_range(GstRollup, start, end)
+    )
+    if b2b is not None:
+        query = query.filter(GstRollup.b2b == b2b)
+    rows = query.group_by(*group_by).order_by(*group_by).all()
+    return [_with_tax(row[:2], row[2:]) for row in rows]
+
+
+def b2b_summary(start, end):
+    """
+    (gstin, taxable, cgst, sgst, igst, tax) per registered buyer. Whole
+    months come from gst_customer_rollup, a part month at either end of
+    the period from gst_invoice_rollup.
+    """
+    inner_start = start if start is None or start == month_start(start) else next_month(start)
+    inner_end = end if end is None else month_start(end)
+    if inner_start and inner_end and inner_start >= inner_end:
+        whole, edges = None, [(start, end)]
+    else:
+        whole, edges = (inner_start, inner_end), [(start, inner_start), (inner_end, end)]
+
+    totals = {}
+    if whole:
+        for gstin, *paise in db.session.query(
+            GstCustomerRollup.customer_gstin, *_paise_sums(GstCustomerRollup)
+        ).filter(
+            *_stored_range(GstCustomerRollup, *whole)
+        ).group_by(GstCustomerRollup.customer_gstin):
+            _add(totals, gstin, paise)
+
+    inv = Invoice.__table__
+    for edge_start, edge_end in edges:
+        if not (edge_start and edge_end and edge_start < edge_end):
+            continue
+        for gstin, *paise in db.session.query(
+            inv.c.customer_gstin, *_paise_sums(GstInvoiceRollup)
+        ).join(inv, inv.c.id == GstInvoiceRollup.invoice_id).filter(
+            _invoice_range(inv, edge_start, edge_end),
+            func.length(inv.c.customer_gstin) == GSTIN_LENGTH
+        ).group_by(inv.c.customer_gstin):
+            _add(totals, gstin, paise)
+
+    return [_with_tax((gstin,), paise) for gstin, paise in sorted(totals.items())]
+
+
+B2B_INVOICE_HEADER = [
+    'customer_gstin', 'customer_name', 'invoice_no', 'invoice_date', 'invoice_value',
+    'place_of_supply', 'inter_state', 'gst_rate', 'taxable_value', 'cgst', 'sgst', 'igst',
+]
+
+
+def b2b_invoices_statement(start, end):
+    """Invoice-wise B2B lines (one per invoice and rate), as a Core select to stream."""
+    inv = Invoice.__table__
+    rollup = GstInvoiceRollup.__table__
+    place_of_supply = func.substr(inv.c.customer_gstin, 1, 2)
+
+    return select(
+        inv.c.customer_gstin,
+        inv.c.customer_name,
+        inv.c.invoice_no,
+        func.date(inv.c.created_at),
+        inv.c.amount,
+        place_of_supply,
+        place_of_supply != gst.state_code(SELLER_GSTIN),
+        rollup.c.gst_rate,
+        *[rollup.c[column] / 100.0 for column in PAISE_COLUMNS],
+    ).select_from(
+        rollup.join(inv, inv.c.id == rollup.c.invoice_id)
+    ).where(
+        _invoice_range(inv, start, end), func.length(inv.c.customer_gstin) == GSTIN_LENGTH
+    ).order_by(inv.c.created_at, inv.c.id, rollup.c.gst_rate)
@@ -0,0 +1,95 @@
+"""
+Readers for bulk invoice import files.
+
+Both readers stream their input and yield (line_no, record, error) where
+record is a dict of invoice fields plus an `items` list of
+{'line', 'product_id', 'product_name', 'quantity'} dicts. When a line
+cannot be parsed, record is None and error says why; the caller reports
+it and carries on.
+
+CSV: one row per line item. Consecutive rows with the same invoice_ref
+make up one invoice; the invoice-level columns are read from its first row.
+
+    invoice_ref,invoice_date,customer_id,customer_gstin,customer_name,
+    customer_address,billing_address,status,product_id,product_name,quantity
+
+JSONL: one invoice per line, with the same invoice fields and an "items"
+array of {"product_id" or "product_name", "quantity"} objects.
+"""
+import csv
+import json
+
+INVOICE_FIELDS = (
+    'invoice_date', 'customer_id', 'customer_gstin', 'customer_name',
+    'customer_address', 'billing_address', 'status',
+)
+
+
+def _item(line, data):
+    return {
+        'line': line,
+        'product_id': data.get('product_id'),
+        'product_name': data.get('product_name'),
+        'quantity': data.get('quantity'),
+    }
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    current_ref = None
+    record = None
+    first_line = None
+
+    for row in reader:
+        line = reader.line_num
+        ref = row.get('invoice_ref') or f"line-{line}"
+
+        if ref != current_ref:
+            if record is not None:
+                yield first_line, record, None
+            current_ref = ref
+            first_line = line
+            record = {field: row.get(field) or None for field in INVOICE_FIELDS}
+            record['items'] = []
+
+        record['items'].append(_item(line, row))
+
+    if record is not None:
+        yield first_line, record, None
+
+
+def read_jsonl(stream):
+    for line, text in enumerate(stream, start=1):
+        text = text.strip()
+        if not text:
+            continue
+
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            yield line, None, f"invalid JSON: {e}"
+            continue
+
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+            yield line, None, "expected an object with an 'items' list"
+            continue
+
+        bad = [n for n, item in enumerate(data['items'], start=1) if not isinstance(item, dict)]
+        if bad:
+            yield line, None, f"item {bad[0]} is not an object"
+            continue
+
+        record = {field: data.get(field) for field in INVOICE_FIELDS}
+        record['items'] = [_item(line, item) for item in data['items']]
+        yield line, record, None
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def detect_format(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return 'jsonl' if ext in ('jsonl', 'ndjson', 'json') else 'csv'
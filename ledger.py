@@ -0,0 +1,291 @@
+"""
+Bookkeeping that several routes share: document numbers, invoice paid
+totals and customer receivables, the dashboard's monthly rollups and
+which customer an invoice belongs to. Everything here works inside the
+caller's transaction; committing is up to the caller, except for
+retry_on_conflict(), which commits.
+
+Balances are changed with a single UPDATE that does the arithmetic in
+the database (receivables = receivables + :delta), never read into
+Python, changed and written back, which would lose one of two
+concurrent changes. Customer and Invoice carry a version column that
+every write bumps. A write that depends on what it read first (a
+payment is capped at the balance it saw) only applies to the version it
+read; if someone got there first it raises StaleDataError, and
+retry_on_conflict() rolls back and runs the whole write again on fresh
+data.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, case, extract, func, insert, select, update
+from sqlalchemy.orm.exc import StaleDataError
+
+import sequences
+from models import (BALANCE_EPSILON, Customer, Expense, Invoice, MonthlyRollup, Payment, SalesOrder,
+                    SalesOrderItem, db)
+
+
+# ---------------- DOCUMENT NUMBERS ----------------
+def generate_payment_no(payment_date):
+    return sequences.next_number(db.session, "PAY", payment_date)
+
+
+def generate_so_number(order_date):
+    return sequences.next_number(db.session, "SO", order_date)
+
+
+def generate_invoice_no(invoice_date):
+    return sequences.next_number(db.session, "INV", invoice_date)
+
+
+WRITE_ATTEMPTS = 5
+
+
+def retry_on_conflict(write, attempts=WRITE_ATTEMPTS):
+    """
+    Run write() and commit, starting over after a rollback if a versioned
+    row it read was changed by someone else first. The rollback expires
+    every loaded object, so the next attempt reads them afresh. Re-raises
+    StaleDataError once `attempts` are used up.
+    """
+    for attempt in range(attempts):
+        try:
+            result = write()
+            db.session.commit()
+            return result
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+
+
+# ---------------- PAID TOTALS AND RECEIVABLES ----------------
+def apply_payment_to_invoice(invoice, delta):
+    """
+    Atomically add `delta` to an invoice's paid total and reset its status.
+    Only applies to the version of `invoice` the caller read; raises
+    StaleDataError if it has changed since.
+    """
+    new_paid = Invoice.paid_total + delta
+    updated = Invoice.query.filter_by(id=invoice.id, version=invoice.version).update({
+        Invoice.paid_total: new_paid,
+        Invoice.status: case(
+            (Invoice.amount - new_paid <= BALANCE_EPSILON, "Paid"),
+            else_="Partially Paid"
+        ),
+        Invoice.version: Invoice.version + 1,
+    }, synchronize_session=False)
+    if not updated:
+        raise StaleDataError(f"invoice {invoice.id} was changed by another request")
+    db.session.expire(invoice, ['paid_total', 'status', 'version'])
+
+
+def adjust_receivables(customer_id, delta):
+    """
+    Atomically add `delta` to a customer's receivables. Increments do not
+    conflict with each other, so there is no version check, but the
+    version is bumped so that an edit form opened earlier is refused.
+    """
+    if customer_id is None or not delta:
+        return
+    cust = Customer.__table__
+    db.session.execute(
+        update(cust)
+        .where(cust.c.id == customer_id)
+        .values(receivables=func.coalesce(cust.c.receivables, 0) + delta, version=cust.c.version + 1)
+    )
+
+
+def paid_total_mismatches():
+    """(invoice_id, stored, actual) for every invoice whose paid_total is off."""
+    actual = db.session.query(
+        Payment.invoice_id, func.sum(Payment.amount).label('total')
+    ).group_by(Payment.invoice_id).subquery()
+    actual_total = func.coalesce(actual.c.total, 0)
+
+    return db.session.query(
+        Invoice.id, Invoice.paid_total, actual_total
+    ).outerjoin(
+        actual, actual.c.invoice_id == Invoice.id
+    ).filter(
+        func.abs(Invoice.paid_total - actual_total) > BALANCE_EPSILON
+    ).order_by(Invoice.id).all()
+
+
+# ---------------- DASHBOARD ROLLUPS ----------------
+ROLLUP_METRICS = ('sales', 'payments', 'receivables', 'orders', 'expenses')
+ROLLUP_TOLERANCE = 0.005
+
+
+def bump_rollup(metric, when, delta):
+    """Add `delta` to one month's total inside the current transaction."""
+    if not delta:
+        return
+
+    key = dict(year=when.year, month=when.month, metric=metric)
+    updated = MonthlyRollup.query.filter_by(**key).update(
+        {MonthlyRollup.value: MonthlyRollup.value + delta},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(MonthlyRollup(value=delta, **key))
+        db.session.flush()
+
+
+def apply_invoice_rollups(invoice, sign=1):
+    # call with sign=-1 before changing an invoice and again after
+    bump_rollup('sales', invoice.created_at, sign * invoice.amount)
+    if invoice.status != 'Paid':
+        bump_rollup('receivables', invoice.created_at, sign * invoice.amount)
+
+
+def year_bounds(year):
+    # half-open [Jan 1, next Jan 1) so date filters can use the indexes
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def compute_rollups(year=None, conn=None):
+    """
+    Recompute rollups from the base tables: {(year, month, metric): value}.
+    Runs on `conn` when given (migrations), else on the session.
+    """
+    conn = conn or db.session
+    sources = [
+        ('sales', Invoice.created_at, func.sum(Invoice.amount), None, []),
+        ('receivables', Invoice.created_at, func.sum(Invoice.amount), None, [Invoice.status != 'Paid']),
+        ('payments', Payment.payment_date, func.sum(Payment.amount), None, []),
+        ('orders', SalesOrder.order_date,
+         func.sum(SalesOrderItem.ordered_qty * SalesOrderItem.unit_price),
+         (SalesOrderItem, SalesOrderItem.sales_order_id == SalesOrder.id), []),
+        ('expenses', Expense.expense_date, func.sum(Expense.amount), None, []),
+    ]
+
+    totals = {}
+    for metric, date_col, total, join, conditions in sources:
+        year_col = extract('year', date_col)
+        month_col = extract('month', date_col)
+
+        query = select(year_col, month_col, total)
+        if join is not None:
+            query = query.select_from(date_col.class_).join(*join)
+        query = query.where(date_col.isnot(None), *conditions)
+        if year:
+            start, end = year_bounds(year)
+            query = query.where(date_col >= start, date_col < end)
+
+        for y, m, value in conn.execute(query.group_by(year_col, month_col)):
+            totals[(int(y), int(m), metric)] = float(value or 0)
+
+    return totals
+
+
+def rollup_drift(year=None):
+    """(key, stored, expected) for every rollup that differs from the base tables."""
+    expected = compute_rollups(year)
+
+    stored_q = MonthlyRollup.query
+    if year:
+        stored_q = stored_q.filter_by(year=year)
+    stored = {(r.year, r.month, r.metric): r.value for r in stored_q.all()}
+
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        have = stored.get(key, 0.0)
+        want = expected.get(key, 0.0)
+        if abs(have - want) > ROLLUP_TOLERANCE:
+            drift.append((key, have, want))
+    return drift
+
+
+def rebuild_rollups(year=None):
+    """Replace the stored rollups with freshly computed ones; returns the drift fixed."""
+    drift = rollup_drift(year)
+
+    stored_q = MonthlyRollup.query
+    if year:
+        stored_q = stored_q.filter_by(year=year)
+    stored_q.delete()
+
+    for (y, month, metric), value in compute_rollups(year).items():
+        db.session.add(MonthlyRollup(year=y, month=month, metric=metric, value=value))
+    db.session.commit()
+    return drift
+
+
+def fill_rollups(conn):
+    """Replace every stored rollup with one computed on `conn`; returns how many there are."""
+    totals = compute_rollups(conn=conn)
+    conn.execute(MonthlyRollup.__table__.delete())
+    if totals:
+        conn.execute(insert(MonthlyRollup.__table__), [
+            {'year': y, 'month': month, 'metric': metric, 'value': value}
+            for (y, month, metric), value in totals.items()
+        ])
+    return len(totals)
+
+
+# ---------------- CUSTOMER LINKS ----------------
+# An invoice typed in by hand (or from before invoices had a customer_id)
+# belongs to the one customer with its GSTIN or, failing that, the one
+# customer with its name. Several candidates means ambiguous: it stays
+# unlinked rather than being pinned on the wrong customer.
+
+def find_customer(gstin, name):
+    """The customer for hand-typed invoice details, or None."""
+    conditions = [Customer.customer_name == name]
+    if gstin:
+        conditions.insert(0, Customer.customer_gstin == gstin)
+    for condition in conditions:
+        matches = Customer.query.filter(condition).limit(2).all()
+        if len(matches) == 1:
+            return matches[0]
+    return None
+
+
+def _candidates(inv, cust):
+    by_gstin = and_(inv.c.customer_gstin != '', cust.c.customer_gstin == inv.c.customer_gstin)
+    by_name = cust.c.customer_name == inv.c.customer_name
+    return by_gstin, by_name
+
+
+def link_invoice_customers(conn, bump_version=True):
+    """
+    Set customer_id on every unlinked invoice that has exactly one match;
+    returns how many. The version is bumped like every other write to an
+    invoice, except by migration 8, which runs before the column exists.
+    """
+    inv = Invoice.__table__
+    cust = Customer.__table__.alias('candidate')
+
+    def only(condition):
+        # the one customer meeting the condition; NULL when none or several do
+        return select(func.min(cust.c.id)).where(condition).having(func.count() == 1).scalar_subquery()
+
+    by_gstin, by_name = _candidates(inv, cust)
+    customer_id = func.coalesce(only(by_gstin), only(by_name))
+    values = {'customer_id': customer_id}
+    if bump_version:
+        values['version'] = inv.c.version + 1
+    # invoices left unlinked are not touched, so their edit forms stay valid
+    return conn.execute(
+        update(inv).where(inv.c.customer_id.is_(None), customer_id.isnot(None)).values(**values)
+    ).rowcount
+
+
+def unlinked_invoices(conn):
+    """
+    (id, customer_name, customer_gstin, customers with that GSTIN, customers
+    with that name) for every invoice still without a customer.
+    """
+    inv = Invoice.__table__
+    cust = Customer.__table__.alias('candidate')
+    by_gstin, by_name = _candidates(inv, cust)
+
+    def count(condition):
+        return select(func.count()).where(condition).scalar_subquery()
+
+    return conn.execute(
+        select(inv.c.id, inv.c.customer_name, inv.c.customer_gstin, count(by_gstin), count(by_name))
+        .where(inv.c.customer_id.is_(None))
+        .order_by(inv.c.id)
+    ).all()
@@ -0,0 +1,97 @@
+"""
+Query-string filters and keyset pagination shared by the list views and
+the exports.
+"""
+from datetime import datetime, timedelta
+
+from flask import abort, request
+from sqlalchemy import tuple_
+
+from models import BALANCE_EPSILON, Invoice, db
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, datetime):
+        value = value.strftime(CURSOR_FORMAT)
+    return f"{value}_{row_id}"
+
+
+def decode_cursor(cursor, sort_col):
+    try:
+        value, row_id = cursor.rsplit('_', 1)
+        if isinstance(sort_col.type, db.DateTime):
+            value = datetime.strptime(value, CURSOR_FORMAT)
+        else:
+            value = float(value)
+        return value, int(row_id)
+    except ValueError:
+        abort(400, "Invalid page cursor")
+
+
+def parse_date_arg(filters, name):
+    value = filters.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        abort(400, f"{name} must be YYYY-MM-DD")
+
+
+def list_filters():
+    """Filters shared by the paginated list views, read from the query string."""
+    return {
+        key: request.args[key]
+        for key in ('status', 'customer', 'mode', 'date_from', 'date_to', 'outstanding', 'sort')
+        if request.args.get(key)
+    }
+
+
+def filter_date_range(query, column, filters):
+    # half-open range so date_to includes the whole day
+    date_from = parse_date_arg(filters, 'date_from')
+    date_to = parse_date_arg(filters, 'date_to')
+    if date_from:
+        query = query.filter(column >= date_from)
+    if date_to:
+        query = query.filter(column < date_to + timedelta(days=1))
+    return query
+
+
+def filter_invoices(query, filters):
+    if filters.get('status'):
+        query = query.filter(Invoice.status == filters['status'])
+    if filters.get('customer'):
+        query = query.filter(Invoice.customer_name.ilike(f"%{filters['customer']}%"))
+    if filters.get('outstanding'):
+        query = query.filter(Invoice.balance > BALANCE_EPSILON)
+    return filter_date_range(query, Invoice.created_at, filters)
+
+
+def keyset_page(query, sort_col, id_col, cursor_of=None):
+    """
+    Descending keyset pagination on (sort_col, id_col).
+    Returns the rows of one page and the cursor of the next page (or None).
+    cursor_of(row) gives the (sort value, id) of a row when sort_col is
+    not a plain attribute of it.
+    """
+    per_page = max(1, min(request.args.get('per_page', PAGE_SIZE, type=int) or PAGE_SIZE, MAX_PAGE_SIZE))
+    if cursor_of is None:
+        cursor_of = lambda row: (getattr(row, sort_col.key), row.id)
+
+    after = request.args.get('after')
+    if after:
+        query = query.filter(tuple_(sort_col, id_col) < tuple_(*decode_cursor(after, sort_col)))
+
+    rows = query.order_by(sort_col.desc(), id_col.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(*cursor_of(rows[-1]))
+
+    return rows, next_cursor
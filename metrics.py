@@ -0,0 +1,186 @@
+"""
+Per-endpoint request and SQL metrics, exposed in Prometheus text format.
+
+SQLAlchemy cursor events time every statement and add it to the current
+request's tally; Flask request hooks time the request and, once the
+response has been fully sent (streamed exports included), fold the tally
+into per-endpoint totals:
+
+- request count by status and a latency histogram
+- a histogram of queries per request and the total SQL time
+- the slowest statement seen so far, with its duration
+
+The hot path is a perf_counter() call and two additions per statement and
+one short locked update per request, cheap enough to leave on. Statements
+slower than slow_query_ms are also logged as warnings.
+
+Metrics live in the process that served the request; with several
+workers, scrape each one (or sum them in Prometheus).
+"""
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+PREFIX = 'invoiceo'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+STATEMENT_LABEL_LENGTH = 200
+# anything else a client sends is counted as "other", so it cannot add label series
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.total:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class EndpointStats:
+    __slots__ = ('responses', 'latency', 'queries', 'sql_seconds', 'slowest')
+
+    def __init__(self):
+        self.responses = defaultdict(int)  # status -> count
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.slowest = (0.0, '')
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class RequestMetrics:
+    def __init__(self, slow_query_ms=0, logger=None):
+        self.slow_query_ms = slow_query_ms
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(EndpointStats)
+
+    # ---- wiring ----
+    def init_app(self, app):
+        self.slow_query_ms = app.config.get('SLOW_QUERY_MS', self.slow_query_ms)
+        self.logger = app.logger
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def instrument(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    # ---- SQL ----
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+
+        if self.slow_query_ms and elapsed * 1000 >= self.slow_query_ms and self.logger:
+            where = request.endpoint if has_request_context() else 'cli'
+            self.logger.warning("slow query (%.1f ms, %s): %s", elapsed * 1000, where, statement)
+
+        if not has_request_context() or 'metrics_queries' not in g:
+            return
+        g.metrics_queries += 1
+        g.metrics_sql_seconds += elapsed
+        if elapsed > g.metrics_slowest[0]:
+            g.metrics_slowest = (elapsed, statement)
+
+    def _handle_error(self, context):
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            started.pop()
+
+    # ---- requests ----
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_sql_seconds = 0.0
+        g.metrics_slowest = (0.0, '')
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        if 'metrics_started' not in g:
+            return
+        elapsed = time.perf_counter() - g.metrics_started
+        status = 500 if exc is not None else g.get('metrics_status', 500)
+        rule = request.url_rule
+        endpoint = rule.endpoint if rule is not None else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+
+        with self._lock:
+            stats = self._endpoints[(endpoint, method)]
+            stats.responses[status] += 1
+            stats.latency.observe(elapsed)
+            stats.queries.observe(g.metrics_queries)
+            stats.sql_seconds += g.metrics_sql_seconds
+            if g.metrics_slowest[0] > stats.slowest[0]:
+                stats.slowest = g.metrics_slowest
+
+    # ---- exposition ----
+    def render(self):
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+
+            name = f'{PREFIX}_http_requests_total'
+            lines += [f'# HELP {name} Requests served, by endpoint and status.', f'# TYPE {name} counter']
+            for (endpoint, method), stats in endpoints:
+                for status, count in sorted(stats.responses.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            name = f'{PREFIX}_http_request_duration_seconds'
+            lines += [f'# HELP {name} Request latency, including streamed bodies.', f'# TYPE {name} histogram']
+            for (endpoint, method), stats in endpoints:
+                lines += stats.latency.lines(name, f'endpoint="{endpoint}",method="{method}"')
+
+            name = f'{PREFIX}_db_queries_per_request'
+            lines += [f'# HELP {name} SQL statements issued per request.', f'# TYPE {name} histogram']
+            for (endpoint, method), stats in endpoints:
+                lines += stats.queries.lines(name, f'endpoint="{endpoint}",method="{method}"')
+
+            name = f'{PREFIX}_db_query_duration_seconds_total'
+            lines += [f'# HELP {name} Time spent executing SQL.', f'# TYPE {name} counter']
+            for (endpoint, method), stats in endpoints:
+                lines.append(f'{name}{{endpoint="{endpoint}",method="{method}"}} {stats.sql_seconds:.6f}')
+
+            name = f'{PREFIX}_db_slowest_query_seconds'
+            lines += [f'# HELP {name} Slowest statement seen per endpoint.', f'# TYPE {name} gauge']
+            for (endpoint, method), stats in endpoints:
+                seconds, statement = stats.slowest
+                if statement:
+                    text = _label(' '.join(statement.split())[:STATEMENT_LABEL_LENGTH])
+                    lines.append(
+                        f'{name}{{endpoint="{endpoint}",method="{method}",statement="{text}"}} {seconds:.6f}'
+                    )
+
+        return '\n'.join(lines) + '\n'
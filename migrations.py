@@ -0,0 +1,257 @@
+"""
+Versioned schema migrations.
+
+db.create_all() only creates missing tables; it never touches a table that
+already exists, so new indexes (and later, columns) on an existing
+invoices.db have to be applied here. Each migration runs once, in its own
+transaction, and is recorded in the schema_migrations table.
+
+A step is a SQL string or a callable(conn); a callable may return lines
+of notes, which are passed to `report` after the migration is applied.
+
+Migrations are frozen once released: add a new entry rather than editing
+an old one.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+
+AMBIGUOUS_REPORT_LIMIT = 20  # unlinked invoices listed by migration 8
+PAISE_COLUMNS = ', '.join(
+    f"{name}_paise BIGINT NOT NULL DEFAULT 0" for name in ('taxable', 'cgst', 'sgst', 'igst')
+)
+
+
+def add_column(table, column, ddl):
+    """Step that adds a column unless create_all already made it."""
+    def step(conn):
+        if column not in {c['name'] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return step
+
+
+def drop_not_null(table, column):
+    """
+    Step that lets `column` hold NULLs. SQLite cannot alter a column, so
+    there the table is rebuilt from its own CREATE statement with the
+    constraint removed, and its indexes and triggers are recreated.
+    """
+    def step(conn):
+        if conn.dialect.name != 'sqlite':
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL"))
+            return
+        create = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table"
+        ), {'table': table}).scalar()
+        relaxed, found = re.subn(rf"(\b{column}\s+\w+(?:\([\d, ]+\))?)\s+NOT NULL", r"\1", create)
+        if not found:
+            return  # already nullable
+        extras = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = :table "
+            "AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        ), {'table': table}).scalars().all()
+
+        conn.execute(text(re.sub(rf"^CREATE TABLE \"?{table}\"?", f"CREATE TABLE {table}_rebuilt", relaxed)))
+        # rows written before foreign keys were enforced may point at deleted
+        # parents; check them at commit, after later steps have cleared them
+        conn.execute(text("PRAGMA defer_foreign_keys = ON"))
+        conn.execute(text(f"INSERT INTO {table}_rebuilt SELECT * FROM {table}"))
+        conn.execute(text(f"DROP TABLE {table}"))
+        conn.execute(text(f"ALTER TABLE {table}_rebuilt RENAME TO {table}"))
+        for sql in extras:
+            conn.execute(text(sql))
+    return step
+
+
+def fts_table(table, columns):
+    """
+    Step that creates an external-content FTS5 index over `columns` of
+    `table`, with triggers to keep it in sync, and fills it from the
+    existing rows. SQLite only; other databases skip it.
+    """
+    fts = f"{table}_fts"
+    cols = ', '.join(columns)
+    new = ', '.join(f"new.{c}" for c in columns)
+    old = ', '.join(f"old.{c}" for c in columns)
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new});"
+
+    def step(conn):
+        if conn.dialect.name != 'sqlite':
+            return
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', tokenize='trigram')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} "
+            f"BEGIN {delete} {insert} END"
+        ))
+        conn.execute(text(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')"))
+    return step
+
+
+def fill_gst_rollups(conn):
+    """Step that fills the GST return rollups from the existing invoice lines."""
+    import gst_returns  # needs the models; imported only when the step runs
+    gst_returns.fill_gst_rollups(conn)
+
+
+def fill_monthly_rollups(conn):
+    """Step that fills the dashboard rollups from the existing invoices, payments, orders and expenses."""
+    import ledger  # needs the models; imported only when the step runs
+    return [f"Filled {ledger.fill_rollups(conn)} monthly rollup(s)"]
+
+
+def link_invoice_customers(conn):
+    """Step that links existing invoices to customers and notes the ones it could not."""
+    import ledger  # needs the models; imported only when the step runs
+    notes = [f"Linked {ledger.link_invoice_customers(conn, bump_version=False)} invoice(s) to customers"]
+
+    unlinked = ledger.unlinked_invoices(conn)
+    ambiguous = [row for row in unlinked if row[3] > 1 or row[4] > 1]
+    for invoice_id, name, gstin, by_gstin, by_name in ambiguous[:AMBIGUOUS_REPORT_LIMIT]:
+        notes.append(f"  invoice {invoice_id} ({name}, {gstin or 'no GSTIN'}): "
+                     f"{by_gstin} customer(s) with this GSTIN, {by_name} with this name")
+    if ambiguous:
+        notes.append(f"{len(ambiguous)} ambiguous invoice(s) left unlinked; "
+                     f"see flask --app app link-customers")
+    if len(unlinked) > len(ambiguous):
+        notes.append(f"{len(unlinked) - len(ambiguous)} invoice(s) match no customer (walk-in buyers)")
+    return notes
+
+MIGRATIONS = [
+    (1, "indexes for list views, dashboard rollups and payment totals", [
+        "CREATE INDEX IF NOT EXISTS ix_invoice_created_at_id ON invoice (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_invoice_status_created_at ON invoice (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_invoice_item_invoice_id ON invoice_item (invoice_id)",
+        "CREATE INDEX IF NOT EXISTS ix_payment_payment_date_id ON payment (payment_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_payment_invoice_id ON payment (invoice_id)",
+        "CREATE INDEX IF NOT EXISTS ix_sales_order_order_date_id ON sales_order (order_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_sales_order_status_order_date ON sales_order (status, order_date)",
+        "CREATE INDEX IF NOT EXISTS ix_sales_order_item_sales_order_id_product_id "
+        "ON sales_order_item (sales_order_id, product_id)",
+        "CREATE INDEX IF NOT EXISTS ix_expense_expense_date ON expense (expense_date)",
+    ]),
+    (2, "per-fiscal-year document numbers", [
+        "CREATE TABLE IF NOT EXISTS document_sequence ("
+        "name VARCHAR(30) NOT NULL PRIMARY KEY, next_value INTEGER NOT NULL)",
+        add_column('invoice', 'invoice_no', 'VARCHAR(20)'),
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_invoice_invoice_no ON invoice (invoice_no)",
+    ]),
+    (3, "stored invoice paid totals", [
+        add_column('invoice', 'paid_total', 'FLOAT NOT NULL DEFAULT 0'),
+        "UPDATE invoice SET paid_total = COALESCE("
+        "(SELECT SUM(amount) FROM payment WHERE payment.invoice_id = invoice.id), 0)",
+    ]),
+    (4, "full-text search indexes", [
+        fts_table('invoice', ('customer_name', 'customer_gstin', 'billing_address')),
+        fts_table('invoice_item', ('product_name',)),
+        fts_table('customer', ('customer_name', 'customer_gstin', 'customer_address', 'billing_address')),
+        fts_table('product', ('name', 'description')),
+    ]),
+    (5, "per-customer invoice index for statements", [
+        "CREATE INDEX IF NOT EXISTS ix_invoice_customer_name_created_at "
+        "ON invoice (customer_name, created_at)",
+    ]),
+    (6, "GST return rollups", [
+        "CREATE TABLE IF NOT EXISTS gst_rollup ("
+        "day DATE NOT NULL, b2b BOOLEAN NOT NULL, inter_state BOOLEAN NOT NULL, "
+        "gst_rate FLOAT NOT NULL, " + PAISE_COLUMNS + ", "
+        "PRIMARY KEY (day, b2b, inter_state, gst_rate))",
+        "CREATE TABLE IF NOT EXISTS gst_customer_rollup ("
+        "year INTEGER NOT NULL, month INTEGER NOT NULL, customer_gstin VARCHAR(15) NOT NULL, "
+        "inter_state BOOLEAN NOT NULL, gst_rate FLOAT NOT NULL, " + PAISE_COLUMNS + ", "
+        "PRIMARY KEY (year, month, customer_gstin, inter_state, gst_rate))",
+        "CREATE TABLE IF NOT EXISTS gst_invoice_rollup ("
+        "invoice_id INTEGER NOT NULL REFERENCES invoice (id), gst_rate FLOAT NOT NULL, "
+        + PAISE_COLUMNS + ", PRIMARY KEY (invoice_id, gst_rate))",
+        fill_gst_rollups,
+    ]),
+    (7, "stock movements, with an opening balance per product", [
+        "UPDATE product SET quantity = 0 WHERE quantity IS NULL",
+        "CREATE TABLE IF NOT EXISTS stock_movement ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "product_id INTEGER NOT NULL REFERENCES product (id), "
+        "change INTEGER NOT NULL, reason VARCHAR(20) NOT NULL, "
+        "invoice_id INTEGER REFERENCES invoice (id), created_at DATETIME)",
+        "CREATE INDEX IF NOT EXISTS ix_stock_movement_product_id_id ON stock_movement (product_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_product_quantity ON product (quantity)",
+        "INSERT INTO stock_movement (product_id, change, reason, created_at) "
+        "SELECT id, quantity, 'opening', CURRENT_TIMESTAMP FROM product WHERE quantity != 0",
+    ]),
+    (8, "invoice customer_id, backfilled by GSTIN then name", [
+        add_column('invoice', 'customer_id', "INTEGER REFERENCES customer (id)"),
+        "CREATE INDEX IF NOT EXISTS ix_invoice_customer_id_created_at ON invoice (customer_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_customer_customer_gstin ON customer (customer_gstin)",
+        "CREATE INDEX IF NOT EXISTS ix_customer_customer_name ON customer (customer_name)",
+        link_invoice_customers,
+    ]),
+    (9, "version columns for optimistic locking of customers and invoices", [
+        add_column('customer', 'version', "INTEGER NOT NULL DEFAULT 1"),
+        add_column('invoice', 'version', "INTEGER NOT NULL DEFAULT 1"),
+    ]),
+    (10, "payments of invoices without a customer", [
+        drop_not_null('payment', 'customer_id'),
+        # the old delete_customer left payments of deleted customers behind
+        "UPDATE payment SET customer_id = NULL "
+        "WHERE customer_id IS NOT NULL AND customer_id NOT IN (SELECT id FROM customer)",
+    ]),
+    (11, "dashboard rollups from the existing invoices, payments, orders and expenses", [
+        fill_monthly_rollups,
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def current_version(engine):
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+
+
+def upgrade(engine, report=None):
+    """Apply every pending migration. Returns the versions applied."""
+    applied = []
+    version = current_version(engine)
+
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+
+        notes = []
+        with engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    notes.extend(statement(conn) or ())
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) "
+                     "VALUES (:version, :description, :applied_at)"),
+                {'version': number, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+
+        applied.append(number)
+        if report:
+            report(f"Applied migration {number}: {description}")
+            for note in notes:
+                report(note)
+
+    return applied
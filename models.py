@@ -1,28 +1,82 @@
+"""
+Database models, shared by the app, the CLI commands and the benchmarks.
+
+`db` is not bound to an app here; create_app() in app.py calls
+db.init_app(). Importing this module needs only Flask-SQLAlchemy.
+"""
 from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.ext.hybrid import hybrid_property
 
 db = SQLAlchemy()
 
-class InvoiceItem(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
-    product_name = db.Column(db.String(100), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False)
-    unit_price = db.Column(db.Float, nullable=False)
-    tax_rate = db.Column(db.Float, default=0.0)
-    discount = db.Column(db.Float, default=0.0)
-    total = db.Column(db.Float, nullable=False)
+SELLER_GSTIN = "33ABCDE1234F1Z5"
+BALANCE_EPSILON = 0.005  # half a paisa
+
 
 class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    invoice_no = db.Column(db.String(20), unique=True, index=True)  # INV/2025-26/00001
+    # the customer master row; NULL for walk-in buyers typed in by hand.
+    # customer_name etc. below are the details as printed on the invoice
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))
     customer_name = db.Column(db.String(100), nullable=False)
     customer_gstin = db.Column(db.String(15), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     customer_address = db.Column(db.String(300), nullable=False)
     billing_address = db.Column(db.String(300), nullable=False)
     status = db.Column(db.String(20), default="Pending")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # sum of Payment.amount, maintained by the payment routes
+    paid_total = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    # bumped by every write; a write based on an older read fails (StaleDataError)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    customer = db.relationship('Customer')
     items = db.relationship('InvoiceItem', backref='invoice', cascade='all, delete-orphan')
+    payments = db.relationship('Payment', backref='invoice', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_invoice_created_at_id', 'created_at', 'id'),
+        db.Index('ix_invoice_status_created_at', 'status', 'created_at'),
+        db.Index('ix_invoice_customer_name_created_at', 'customer_name', 'created_at'),
+        db.Index('ix_invoice_customer_id_created_at', 'customer_id', 'created_at'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
+    @property
+    def total_paid(self):
+        return self.paid_total
+
+    @hybrid_property
+    def balance(self):
+        return round(self.amount - self.paid_total, 2)
+
+    @balance.expression
+    def balance(cls):
+        return cls.amount - cls.paid_total
+
+
+class InvoiceItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+
+    product_name = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+
+    gst_rate = db.Column(db.Float, nullable=False)
+    taxable_value = db.Column(db.Float, nullable=False)
+
+    cgst = db.Column(db.Float, default=0.0)
+    sgst = db.Column(db.Float, default=0.0)
+    igst = db.Column(db.Float, default=0.0)
+
+    total = db.Column(db.Float, nullable=False)
+
 
 class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -30,50 +84,85 @@ class Customer(db.Model):
     customer_gstin = db.Column(db.String(15), nullable=False)
     customer_address = db.Column(db.String(300), nullable=False)
     billing_address = db.Column(db.String(300), nullable=False)
-    receivables = db.Column(db.Float, nullable=False, default=0.0)
+    receivables = db.Column(db.Float, default=0.0)  # see ledger.adjust_receivables()
+    version = db.Column(db.Integer, nullable=False, server_default='1')  # as Invoice.version
+
+    __table_args__ = (
+        db.Index('ix_customer_customer_gstin', 'customer_gstin'),
+        db.Index('ix_customer_customer_name', 'customer_name'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False, unique=True)
+    name = db.Column(db.String(100), unique=True)
     description = db.Column(db.String(300))
-    products = db.relationship('Product', backref='category', lazy=True)
+    products = db.relationship('Product', backref='category')
+
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100))
     description = db.Column(db.String(300))
-    price = db.Column(db.Float, nullable=False)
-    quantity = db.Column(db.Integer, default=0)
-    tax_rate = db.Column(db.Float, default=0.0)
-    discount = db.Column(db.Float, default=0.0)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    price = db.Column(db.Float)
+    # stock on hand, changed only through stock.py
+    quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    tax_rate = db.Column(db.Float)
+    discount = db.Column(db.Float)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_product_quantity', 'quantity'),
+    )
+
+
+class StockMovement(db.Model):
+    # append-only: one row per change to Product.quantity, see stock.py
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    change = db.Column(db.Integer, nullable=False)        # + in, - out
+    reason = db.Column(db.String(20), nullable=False)     # opening / invoice / adjustment
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_stock_movement_product_id_id', 'product_id', 'id'),
+    )
 
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     payment_no = db.Column(db.String(20), unique=True, nullable=False)
 
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))  # None for walk-in invoices
 
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
-    mode = db.Column(db.String(50))
-    reference = db.Column(db.String(100))
+    mode = db.Column(db.String(50))       # Cash / UPI / Bank
+    reference = db.Column(db.String(100)) # optional
+    payment_date = db.Column(db.DateTime, nullable=False)   # 🔥 IMPORTANT
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_payment_payment_date_id', 'payment_date', 'id'),
+    )
+
+# ---------------- SALES ORDER MODELS ----------------
 
 class SalesOrder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     so_number = db.Column(db.String(20), unique=True, nullable=False)
     customer_po_number = db.Column(db.String(50), nullable=False)
-
+    total_value = db.Column(db.Float, default=0.0)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
     order_date = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    status = db.Column(db.String(20), default="Open")  
+    status = db.Column(db.String(30), default="Open")
     # Open / Partially Invoiced / Completed
 
     customer = db.relationship('Customer', backref='sales_orders')
@@ -83,7 +172,12 @@ class SalesOrder(db.Model):
         cascade='all, delete-orphan'
     )
 
-    
+    __table_args__ = (
+        db.Index('ix_sales_order_order_date_id', 'order_date', 'id'),
+        db.Index('ix_sales_order_status_order_date', 'status', 'order_date'),
+    )
+
+
 class SalesOrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
@@ -103,6 +197,9 @@ class SalesOrderItem(db.Model):
 
     product = db.relationship('Product')
 
+    __table_args__ = (
+        db.Index('ix_sales_order_item_sales_order_id_product_id', 'sales_order_id', 'product_id'),
+    )
 
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -115,8 +212,64 @@ class Expense(db.Model):
     payment_mode = db.Column(db.String(50))   # Cash / Bank / UPI / Card
     reference = db.Column(db.String(100))     # optional txn id / bill no
 
-    expense_date = db.Column(db.DateTime, default=datetime.utcnow)
+    expense_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     notes = db.Column(db.String(300))
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DocumentSequence(db.Model):
+    # next free number per series, see sequences.py
+    name = db.Column(db.String(30), primary_key=True)   # e.g. PAY/2025-26
+    next_value = db.Column(db.Integer, nullable=False)
+
+
+class MonthlyRollup(db.Model):
+    # dashboard totals, kept up to date by the write routes
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    # sales / payments / receivables / orders / expenses
+
+    value = db.Column(db.Float, nullable=False, default=0.0)
+
+
+
+class GstRollup(db.Model):
+    # invoice line GST per day, buyer type, supply type and rate, kept up to
+    # date by the invoice writes (see gst_returns.py); amounts in paise
+    day = db.Column(db.Date, primary_key=True)
+    b2b = db.Column(db.Boolean, primary_key=True)          # buyer has a GSTIN
+    inter_state = db.Column(db.Boolean, primary_key=True)
+    gst_rate = db.Column(db.Float, primary_key=True)
+
+    taxable_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    cgst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    sgst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    igst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class GstCustomerRollup(db.Model):
+    # the same amounts per month and registered buyer
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    customer_gstin = db.Column(db.String(15), primary_key=True)
+    inter_state = db.Column(db.Boolean, primary_key=True)
+    gst_rate = db.Column(db.Float, primary_key=True)
+
+    taxable_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    cgst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    sgst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    igst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class GstInvoiceRollup(db.Model):
+    # and per invoice and rate, for the invoice-wise B2B report
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), primary_key=True)
+    gst_rate = db.Column(db.Float, primary_key=True)
+
+    taxable_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    cgst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    sgst_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    igst_paise = db.Column(db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,151 @@
+"""
+On-disk cache for rendered invoice PDFs.
+
+Entries are stored as <invoice_id>/<key>.pdf where key is a content hash of
+everything that prints on the invoice (and of the renderer), so a changed
+invoice simply misses and each renderer keeps its own file. Writes that
+touch an invoice still call invalidate(), which removes that invoice's
+directory, so stale files do not sit around until they are evicted.
+
+The directory is capped at max_bytes. Each process scans it once at
+startup and then keeps a running total of what it writes and removes;
+only when that total goes over the cap does it rescan, dropping the
+least recently used files (by mtime, refreshed on every hit) until the
+cache is back under. Other workers' writes are picked up by that rescan.
+"""
+import os
+import tempfile
+import threading
+
+
+class PdfCache:
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # guards _size
+        self._size = 0
+        if directory:
+            self._open()
+
+    def init_app(self, app):
+        self.directory = app.config['PDF_CACHE_DIR']
+        self.max_bytes = app.config['PDF_CACHE_MAX_BYTES']
+        self._open()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._size = sum(size for _, size, _ in self._entries())
+
+    def _invoice_dir(self, invoice_id):
+        return os.path.join(self.directory, str(invoice_id))
+
+    def _path(self, invoice_id, key):
+        return os.path.join(self._invoice_dir(invoice_id), f"{key}.pdf")
+
+    def get(self, invoice_id, key):
+        path = self._path(invoice_id, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass  # invalidated meanwhile; what we read is still this key's PDF
+        return data
+
+    def put(self, invoice_id, key, data):
+        # other keys of the invoice stay: the HTML and ReportLab PDFs differ,
+        # and the write routes call invalidate() when the invoice changes
+        path = self._path(invoice_id, key)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+
+        directory = self._invoice_dir(invoice_id)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        except FileNotFoundError:  # another request's invalidate() removed it just now
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, invoice_id):
+        directory = self._invoice_dir(invoice_id)
+        removed = 0
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if not entry.name.endswith('.pdf'):
+                continue  # a write in progress
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            removed += size
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # another request just wrote into it
+        with self._lock:
+            # files other workers wrote were only counted at startup
+            self._size = max(0, self._size - removed)
+
+    def _entries(self):
+        """(mtime, size, path) of every cached PDF; leftovers of the old flat layout are removed."""
+        entries = []
+        for top in os.scandir(self.directory):
+            if not top.is_dir():
+                if top.name.endswith(('.pdf', '.tmp')):
+                    _remove(top.path)
+                continue
+            try:
+                invoice_entries = list(os.scandir(top.path))
+            except FileNotFoundError:
+                continue  # invalidated meanwhile
+            for entry in invoice_entries:
+                if entry.name.endswith('.pdf'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        # called with _lock held, once the running total says we are over
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass  # other keys (or a write in progress) still there
+        self._size = total
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,113 @@
+"""
+Bulk invoice PDF export.
+
+Rendering PDFs is CPU bound (WeasyPrint especially), so the work is spread
+over a process pool while the results are written into a ZIP that is
+streamed out chunk by chunk. Only a small window of invoices is in flight
+at any time, so memory stays flat however many invoices are exported.
+"""
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def render_pdf(html):
+    # runs inside a pool worker; WeasyPrint takes a second or more to
+    # import, so only processes that render HTML ever load it
+    from weasyprint import HTML
+    return HTML(string=html).write_pdf()
+
+
+def render_pdfs(jobs, workers=None, window=None, render=render_pdf):
+    """
+    Render (filename, payload) jobs across a process pool.
+
+    `render` turns a payload into PDF bytes and must be picklable (a module
+    level function): render_pdf for HTML, pdf_reportlab.render for
+    pdf_reportlab.invoice_data() dicts.
+
+    Yields (filename, pdf_bytes) in job order. At most `window` jobs are
+    submitted ahead of the consumer (default: two per worker).
+    """
+    workers = workers or default_workers()
+    window = window or workers * 2
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = []
+    try:
+        for name, payload in jobs:
+            pending.append((name, executor.submit(render, payload)))
+            if len(pending) >= window:
+                name, future = pending.pop(0)
+                yield name, future.result()
+
+        for name, future in pending:
+            yield name, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _ChunkBuffer:
+    # write-only sink for ZipFile; zipfile falls back to data descriptors
+    # because there is no seek/tell
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(files):
+    """Turn (filename, bytes) pairs into a stream of ZIP chunks."""
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files:
+            zf.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+class Progress:
+    """Counts rendered PDFs and reports every `every` pages through `report`."""
+
+    def __init__(self, report, total=None, every=50):
+        self.report = report
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.done / elapsed if elapsed else 0.0
+
+    def message(self):
+        of_total = f"/{self.total}" if self.total is not None else ""
+        return f"{self.done}{of_total} invoices rendered ({self.rate:.1f} pages/s)"
+
+    def track(self, files):
+        for item in files:
+            self.done += 1
+            if self.done % self.every == 0:
+                self.report(self.message())
+            yield item
+        self.report(self.message())
@@ -0,0 +1,232 @@
+"""
+Invoice PDFs drawn straight onto a ReportLab canvas.
+
+The fast alternative to the WeasyPrint path: the same layout as
+templates/invoice_pdf.html (title, invoice number and date, bill-to block,
+GST line table, grand total, status) but placed by hand, so there is no
+HTML parsing, CSS cascade or layout pass. Long product names wrap inside
+their cell and long invoices continue on further pages with the table
+header repeated.
+
+render() takes the plain dict from invoice_data() rather than the model,
+so it can run in a pool worker like pdf_export.render_pdf.
+
+Bump LAYOUT_VERSION whenever the drawing changes; it is part of the PDF
+cache key the way the template hash is for the HTML renderer.
+"""
+import io
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+# Compressed streams are ASCII85 encoded on top by default, which only
+# matters for 7-bit transports and costs a third of the render time.
+rl_config.useA85 = 0
+
+LAYOUT_VERSION = 1
+
+FONT = 'Helvetica'
+BOLD = 'Helvetica-Bold'
+FONT_SIZE = 9          # 12px in the HTML template
+TITLE_SIZE = 13.5      # 18px
+LEADING = 11
+PADDING = 4.5          # 6px cell padding
+MARGIN = 40
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+TABLE_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+# (heading, share of the table width, right aligned)
+COLUMNS = (
+    ('#', 0.04, False),
+    ('Product', 0.26, False),
+    ('Qty', 0.07, True),
+    ('Rate', 0.10, True),
+    ('Taxable', 0.11, True),
+    ('CGST', 0.095, True),
+    ('SGST', 0.095, True),
+    ('IGST', 0.095, True),
+    ('Total', 0.135, True),
+)
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _row_height(cells):
+    return max(len(lines) for lines in cells) * LEADING + 2 * PADDING
+
+
+def invoice_data(invoice):
+    """Everything render() prints, as picklable plain values."""
+    return {
+        'number': _text(invoice.invoice_no or invoice.id),
+        'date': invoice.created_at.strftime('%d-%m-%Y'),
+        'customer_name': _text(invoice.customer_name),
+        'billing_address': _text(invoice.billing_address),
+        'customer_gstin': _text(invoice.customer_gstin),
+        'items': [
+            (_text(i.product_name), _text(i.quantity), _text(i.unit_price), _text(i.taxable_value),
+             _text(i.cgst), _text(i.sgst), _text(i.igst), _text(i.total))
+            for i in invoice.items
+        ],
+        'amount': _text(invoice.amount),
+        'status': _text(invoice.status),
+    }
+
+
+class _Page:
+    """
+    Canvas plus a cursor that moves down the page.
+
+    Text goes into one text object and rules into one list of segments per
+    page, written out together on flush(); drawing them one call at a time
+    costs several times more than the layout itself.
+    """
+
+    def __init__(self, title):
+        self.buffer = io.BytesIO()
+        self.canvas = canvas.Canvas(self.buffer, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle(title)
+        widths = [TABLE_WIDTH * share for _, share, _ in COLUMNS]
+        self.x = [MARGIN + sum(widths[:i]) for i in range(len(widths) + 1)]
+        self._start()
+
+    def _start(self):
+        self.y = PAGE_HEIGHT - MARGIN
+        self.glyphs = self.canvas.beginText()
+        self.font = None
+        self.segments = []
+        self.table_top = None
+
+    def flush(self):
+        self.end_table()
+        self.canvas.drawText(self.glyphs)
+        self.canvas.setLineWidth(0.75)
+        self.canvas.lines(self.segments)
+
+    def new_page(self):
+        self.flush()
+        self.canvas.showPage()
+        self._start()
+
+    def finish(self):
+        self.flush()
+        self.canvas.save()
+        return self.buffer.getvalue()
+
+    # ---- text ----
+    def put(self, x, y, value, font=FONT, size=FONT_SIZE, align='left'):
+        if (font, size) != self.font:
+            self.glyphs.setFont(font, size)
+            self.font = (font, size)
+        if align != 'left':
+            width = stringWidth(value, font, size)
+            x -= width if align == 'right' else width / 2
+        self.glyphs.setTextOrigin(x, y)
+        self.glyphs.textOut(value)
+
+    def text(self, value, bold=False, size=FONT_SIZE):
+        self.y -= size + 2
+        self.put(MARGIN, self.y, value, BOLD if bold else FONT, size)
+
+    def label(self, label, value, bold_value=False):
+        """`label value` on one line; the label is bold unless bold_value."""
+        label_font, value_font = (FONT, BOLD) if bold_value else (BOLD, FONT)
+        self.y -= LEADING
+        self.put(MARGIN, self.y, label, label_font)
+        self.put(MARGIN + stringWidth(label, label_font, FONT_SIZE) + 3, self.y, value, value_font)
+
+    def gap(self, height):
+        self.y -= height
+
+    def fits(self, height):
+        return self.y - height >= MARGIN
+
+    # ---- table ----
+    def row(self, cells, bold=False):
+        """One bordered table row; cells are lists of lines."""
+        if self.table_top is None:
+            self.table_top = self.y
+            self.segments.append((self.x[0], self.y, self.x[-1], self.y))
+        font = BOLD if bold else FONT
+        top = self.y
+        for i, (lines, (_, _, right)) in enumerate(zip(cells, COLUMNS)):
+            baseline = top - PADDING - FONT_SIZE
+            for line in lines:
+                if right:
+                    self.put(self.x[i + 1] - PADDING, baseline, line, font, align='right')
+                else:
+                    self.put(self.x[i] + PADDING, baseline, line, font)
+                baseline -= LEADING
+        self.y = top - _row_height(cells)
+        self.segments.append((self.x[0], self.y, self.x[-1], self.y))
+
+    def end_table(self):
+        """Column rules for the rows drawn since the table (re)started."""
+        if self.table_top is not None:
+            self.segments += [(x, self.table_top, x, self.y) for x in self.x]
+            self.table_top = None
+
+    def total_row(self, label, value):
+        """Bold row whose label spans every column but the last."""
+        self.end_table()
+        top = self.y
+        baseline = top - PADDING - FONT_SIZE
+        self.put(self.x[-2] - PADDING, baseline, label, BOLD, align='right')
+        self.put(self.x[-1] - PADDING, baseline, value, BOLD, align='right')
+        self.y = top - _row_height([[label]])
+        self.segments += [
+            (self.x[0], self.y, self.x[-1], self.y),
+            (self.x[0], top, self.x[0], self.y),
+            (self.x[-2], top, self.x[-2], self.y),
+            (self.x[-1], top, self.x[-1], self.y),
+        ]
+
+    def wrap(self, value, column):
+        width = self.x[column + 1] - self.x[column] - 2 * PADDING
+        return simpleSplit(value, FONT, FONT_SIZE, width) or ['']
+
+
+def render(data):
+    """invoice_data() dict -> PDF bytes."""
+    page = _Page(f"Invoice {data['number']}")
+
+    page.gap(TITLE_SIZE + 2)
+    page.put(PAGE_WIDTH / 2, page.y, 'TAX INVOICE', BOLD, TITLE_SIZE, align='center')
+
+    page.gap(LEADING)
+    page.label('Invoice No:', data['number'])
+    page.label('Date:', data['date'])
+
+    page.gap(LEADING)
+    page.text('Bill To:', bold=True, size=FONT_SIZE + 1)
+    page.gap(4)
+    page.text(data['customer_name'])
+    for line in data['billing_address'].splitlines() or ['']:
+        page.text(line)
+    page.text(f"GSTIN: {data['customer_gstin']}")
+    page.gap(LEADING)
+
+    header = [[heading] for heading, _, _ in COLUMNS]
+    page.row(header, bold=True)
+
+    for n, item in enumerate(data['items'], start=1):
+        cells = [[str(n)], page.wrap(item[0], 1)] + [[value] for value in item[1:]]
+        if not page.fits(_row_height(cells)):
+            page.new_page()
+            page.row(header, bold=True)
+        page.row(cells)
+
+    if not page.fits(_row_height([['']]) + 2 * LEADING):  # total and status stay together
+        page.new_page()
+    page.total_row('Grand Total', data['amount'])
+
+    page.gap(LEADING)
+    page.label('Status:', data['status'], bold_value=True)
+
+    return page.finish()
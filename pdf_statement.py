@@ -0,0 +1,206 @@
+"""
+Customer statements of account as a streamed PDF.
+
+ReportLab's canvas holds every page until save(), so a statement with tens
+of thousands of lines would be built in memory before the first byte goes
+out. A statement is only text in a grid, so this module writes the PDF
+objects itself: each page is compressed and yielded as soon as it is full,
+and all that is kept across pages is the byte offset of every object for
+the cross-reference table at the end (two numbers per page).
+
+Text is set in the standard Helvetica fonts, which PDF viewers provide, so
+nothing is embedded; ReportLab is only used for their character widths.
+"""
+import zlib
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+FONT = 'Helvetica'
+BOLD = 'Helvetica-Bold'
+FONT_SIZE = 9          # same type sizes as pdf_reportlab
+TITLE_SIZE = 13.5
+LEADING = 11
+ROW_HEIGHT = 13
+MARGIN = 40
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+TABLE_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+# (heading, share of the table width, right aligned)
+COLUMNS = (
+    ('Date', 0.13, False),
+    ('Type', 0.12, False),
+    ('Document', 0.19, False),
+    ('Invoice', 0.19, False),
+    ('Debit', 0.12, True),
+    ('Credit', 0.12, True),
+    ('Balance', 0.13, True),
+)
+
+# object numbers: fixed ones first, then a content stream and a page per page
+CATALOG, PAGES, FONT_OBJ, BOLD_OBJ, FIRST_PAGE = 1, 2, 3, 4, 5
+FONT_NAMES = {FONT: b'F1', BOLD: b'F2'}
+
+
+def _escape(value):
+    data = value.encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _date(value):
+    """dd-mm-yyyy from a date, datetime or ISO string (SQLite returns DATE() as text)."""
+    if not value:
+        return ''
+    text = str(value)[:10]
+    return f"{text[8:10]}-{text[5:7]}-{text[:4]}"
+
+
+def _amount(value):
+    return '' if value is None else f"{value:.2f}"
+
+
+class _Writer:
+    """Numbered PDF objects, written in any order, with their offsets."""
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+
+    def raw(self, data):
+        self.position += len(data)
+        return data
+
+    def obj(self, number, body):
+        self.offsets[number] = self.position
+        return self.raw(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def stream(self, number, content):
+        data = zlib.compress(content)
+        return self.obj(number, b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream'
+                        % (len(data), data))
+
+    def trailer(self):
+        size = max(self.offsets) + 1
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+        xref += [b'%010d 00000 n \n' % self.offsets[n] for n in range(1, size)]
+        xref.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (size, CATALOG, self.position))
+        return self.raw(b''.join(xref))
+
+
+class _Page:
+    """Drawing operators of the page being filled, and a cursor moving down it."""
+
+    def __init__(self, number):
+        self.number = number
+        self.ops = []
+        self.y = PAGE_HEIGHT - MARGIN
+        widths = [TABLE_WIDTH * share for _, share, _ in COLUMNS]
+        self.x = [MARGIN + sum(widths[:i]) for i in range(len(widths) + 1)]
+
+    def put(self, x, y, value, font=FONT, size=FONT_SIZE, align='left'):
+        if not value:
+            return
+        if align != 'left':
+            width = stringWidth(value, font, size)
+            x -= width if align == 'right' else width / 2
+        self.ops.append(b'BT /%s %g Tf %.2f %.2f Td (%s) Tj ET'
+                        % (FONT_NAMES[font], size, x, y, _escape(value)))
+
+    def text(self, value, font=FONT, size=FONT_SIZE):
+        self.y -= size + 2
+        self.put(MARGIN, self.y, value, font, size)
+
+    def rule(self):
+        self.ops.append(b'%.2f %.2f m %.2f %.2f l S' % (self.x[0], self.y, self.x[-1], self.y))
+
+    def row(self, cells, font=FONT):
+        self.y -= ROW_HEIGHT
+        baseline = self.y + (ROW_HEIGHT - FONT_SIZE) / 2
+        for i, (value, (_, _, right)) in enumerate(zip(cells, COLUMNS)):
+            if right:
+                self.put(self.x[i + 1] - 3, baseline, value, font, align='right')
+            else:
+                self.put(self.x[i] + 3, baseline, value, font)
+
+    def header_row(self):
+        self.row([heading for heading, _, _ in COLUMNS], BOLD)
+        self.rule()
+
+    def fits(self, rows):
+        return self.y - rows * ROW_HEIGHT >= MARGIN + LEADING
+
+    def content(self):
+        self.put(PAGE_WIDTH / 2, MARGIN - LEADING, f"Page {self.number}", align='center')
+        return b'0.75 w\n' + b'\n'.join(self.ops)
+
+
+def render(customer, date_from, date_to, opening, rows):
+    """
+    Yield a statement PDF in chunks.
+
+    `customer` is the Customer row; `rows` are (date, type, document,
+    invoice_no, debit, credit, balance) tuples in statement order, as
+    produced by views.reports.statement_lines(), and are consumed lazily.
+    """
+    writer = _Writer()
+    pages = 0
+    debits = credits = 0.0
+    balance = opening
+
+    def page_objects(page):
+        content = FIRST_PAGE + 2 * (page.number - 1)
+        return writer.stream(content, page.content()) + writer.obj(content + 1, (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Contents %d 0 R '
+            b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>'
+        ) % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, content, FONT_OBJ, BOLD_OBJ))
+
+    yield writer.raw(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    yield writer.obj(CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES)
+    for number, name in ((FONT_OBJ, FONT), (BOLD_OBJ, BOLD)):
+        yield writer.obj(number, b'<< /Type /Font /Subtype /Type1 /BaseFont /%s '
+                                 b'/Encoding /WinAnsiEncoding >>' % name.encode())
+
+    # ---- first page heading ----
+    pages += 1
+    page = _Page(pages)
+    page.y -= TITLE_SIZE + 2
+    page.put(PAGE_WIDTH / 2, page.y, 'STATEMENT OF ACCOUNT', BOLD, TITLE_SIZE, align='center')
+    page.y -= LEADING
+    page.text(customer.customer_name or '', BOLD, FONT_SIZE + 1)
+    for line in (customer.billing_address or '').splitlines():
+        page.text(line)
+    page.text(f"GSTIN: {customer.customer_gstin or ''}")
+    period = f"{_date(date_from) or 'Beginning'} to {_date(date_to) or 'date'}"
+    page.text(f"Period: {period}")
+    page.y -= LEADING
+    page.header_row()
+    page.row([_date(date_from), 'Opening balance', '', '', '', '', _amount(opening)])
+
+    for row in rows:
+        if not page.fits(1):
+            yield page_objects(page)
+            pages += 1
+            page = _Page(pages)
+            page.text(f"Statement of account: {customer.customer_name} (continued)", BOLD)
+            page.y -= LEADING / 2
+            page.header_row()
+
+        day, kind, document, invoice_no, debit, credit, balance = row
+        debits += debit or 0
+        credits += credit or 0
+        page.row([_date(day), kind, document, invoice_no or '',
+                  _amount(debit), _amount(credit), _amount(balance)])
+
+    if not page.fits(2):
+        yield page_objects(page)
+        pages += 1
+        page = _Page(pages)
+    page.rule()
+    page.row(['', 'Closing balance', '', '', _amount(debits), _amount(credits), _amount(balance)], BOLD)
+    yield page_objects(page)
+
+    kids = b' '.join(b'%d 0 R' % (FIRST_PAGE + 2 * n + 1) for n in range(pages))
+    yield writer.obj(PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, pages))
+    yield writer.trailer()
@@ -0,0 +1,67 @@
+"""
+Full-text search over invoices, invoice lines, customers and products.
+
+The FTS5 tables are created by migration 4 as external-content indexes
+(the text stays in the base tables) with the trigram tokenizer, so any
+fragment of three or more characters matches: part of a GSTIN, a street
+name, the middle of a product name. Triggers on the base tables keep
+them in sync; rebuild() refills them from scratch.
+
+A hit on an invoice line counts as a hit on its invoice. Results from the
+four indexes are merged and ranked by bm25 (lower is better).
+"""
+import re
+
+from sqlalchemy import text
+
+FTS_TABLES = ('invoice_fts', 'invoice_item_fts', 'customer_fts', 'product_fts')
+
+MIN_TERM_LENGTH = 3  # shortest fragment the trigram tokenizer can match
+
+_SEARCH = text("""
+    SELECT kind, ref_id, MIN(score) AS score FROM (
+        SELECT 'invoice' AS kind, rowid AS ref_id, bm25(invoice_fts) AS score
+        FROM invoice_fts WHERE invoice_fts MATCH :q
+        UNION ALL
+        SELECT 'invoice', invoice_item.invoice_id, bm25(invoice_item_fts)
+        FROM invoice_item_fts JOIN invoice_item ON invoice_item.id = invoice_item_fts.rowid
+        WHERE invoice_item_fts MATCH :q
+        UNION ALL
+        SELECT 'customer', rowid, bm25(customer_fts)
+        FROM customer_fts WHERE customer_fts MATCH :q
+        UNION ALL
+        SELECT 'product', rowid, bm25(product_fts)
+        FROM product_fts WHERE product_fts MATCH :q
+    )
+    GROUP BY kind, ref_id
+    ORDER BY score, kind, ref_id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def match_expression(query):
+    """
+    User input -> FTS5 query: every term of MIN_TERM_LENGTH or more
+    characters, quoted so punctuation and FTS operators are taken
+    literally, all of which must match. None if nothing is searchable.
+    """
+    terms = [t for t in re.split(r'\s+', query or '') if len(t) >= MIN_TERM_LENGTH]
+    if not terms:
+        return None
+    return ' '.join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def search(conn, query, limit, offset=0):
+    """Ranked (kind, id, score) rows for one page of results."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    return conn.execute(
+        _SEARCH, {'q': expression, 'limit': limit, 'offset': offset}
+    ).all()
+
+
+def rebuild(conn):
+    for table in FTS_TABLES:
+        conn.execute(text(f"INSERT INTO {table} ({table}) VALUES ('rebuild')"))
+        conn.execute(text(f"INSERT INTO {table} ({table}) VALUES ('optimize')"))
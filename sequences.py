@@ -0,0 +1,54 @@
+"""
+Document number sequences (PAY / SO / INV), one counter per series and
+fiscal year, e.g. PAY/2025-26/00042.
+
+Numbers are handed out by a single upsert ... RETURNING against the
+document_sequence table, so two concurrent writers can never read the
+same "last" value: the database serializes the increment on the counter
+row. Bulk paths reserve a whole block with one statement.
+
+The allocation runs on whatever connection or session it is given, so
+it commits or rolls back with the document it numbers and series stay
+gap-free.
+"""
+from sqlalchemy import text
+
+FISCAL_YEAR_START_MONTH = 4  # April
+
+_ALLOCATE = text(
+    "INSERT INTO document_sequence (name, next_value) VALUES (:name, :count + 1) "
+    "ON CONFLICT (name) DO UPDATE SET next_value = document_sequence.next_value + :count "
+    "RETURNING next_value"
+)
+
+
+def fiscal_year(when):
+    start = when.year if when.month >= FISCAL_YEAR_START_MONTH else when.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def series_name(prefix, when):
+    return f"{prefix}/{fiscal_year(when)}"
+
+
+def format_number(prefix, when, value):
+    return f"{series_name(prefix, when)}/{value:05d}"
+
+
+def allocate(conn, prefix, when, count=1):
+    """Reserve `count` consecutive numbers and return the first one."""
+    if count < 1:
+        raise ValueError("count must be positive")
+    next_value = conn.execute(
+        _ALLOCATE, {'name': series_name(prefix, when), 'count': count}
+    ).scalar()
+    return next_value - count
+
+
+def next_number(conn, prefix, when):
+    return format_number(prefix, when, allocate(conn, prefix, when))
+
+
+def next_numbers(conn, prefix, when, count):
+    first = allocate(conn, prefix, when, count)
+    return [format_number(prefix, when, value) for value in range(first, first + count)]
@@ -0,0 +1,39 @@
+// Attach a typeahead to a text input. Matches are fetched from `url`
+// (?q=...) as the user types; `label(item)` is what the list shows and
+// `onPick(item)` is called with the chosen result.
+function typeahead(input, url, label, onPick) {
+    const list = document.createElement("ul");
+    list.className = "typeahead-list";
+    input.insertAdjacentElement("afterend", list);
+    input.setAttribute("autocomplete", "off");
+
+    let timer = null;
+    let latest = 0;
+
+    function show(items) {
+        list.innerHTML = "";
+        items.forEach(item => {
+            const li = document.createElement("li");
+            li.textContent = label(item);
+            li.addEventListener("mousedown", e => {
+                e.preventDefault();
+                list.innerHTML = "";
+                onPick(item);
+            });
+            list.appendChild(li);
+        });
+    }
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+            const request = ++latest;
+            const response = await fetch(`${url}?q=${encodeURIComponent(input.value)}`);
+            const items = await response.json();
+            if (request === latest) show(items);  // ignore out-of-order replies
+        }, 150);
+    });
+
+    input.addEventListener("focus", () => input.dispatchEvent(new Event("input")));
+    input.addEventListener("blur", () => { list.innerHTML = ""; });
+}
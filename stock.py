@@ -0,0 +1,129 @@
+"""
+Stock on hand and the movements that explain it.
+
+Product.quantity is the stock on hand. Every change to it goes through
+here and is recorded in stock_movement, which is append-only (a mistake
+is put right by another movement), so a product's movements always add
+up to its quantity; stock_drift() checks that.
+
+Invoicing takes stock with one conditional UPDATE per product, sent as a
+single executemany for the whole invoice:
+
+    UPDATE product SET quantity = quantity - :qty WHERE id = :pid AND quantity >= :qty
+
+The check and the decrement are one statement, so two invoices racing
+for the last units cannot both get them, and no decrement is lost the
+way a read-modify-write in Python would lose one. If fewer rows match
+than products were asked for, take_stock() raises OutOfStock and the
+caller rolls back. With oversell allowed (ALLOW_OVERSELL=1) the
+condition is dropped and stock may go negative.
+
+Everything here works inside the caller's transaction.
+"""
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from models import Product, StockMovement, db
+
+SET_STOCK_ATTEMPTS = 5
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def record_movements(rows):
+    """Insert (product_id, change, reason, invoice_id) movements in one executemany."""
+    now = datetime.utcnow()
+    rows = [
+        {'product_id': pid, 'change': change, 'reason': reason, 'invoice_id': invoice_id, 'created_at': now}
+        for pid, change, reason, invoice_id in rows if change
+    ]
+    if rows:
+        db.session.execute(insert(StockMovement.__table__), rows)
+
+
+def take_stock(quantities, invoice_id, allow_oversell=False):
+    """
+    Take {product_id: quantity} out of stock for an invoice. Raises
+    OutOfStock, with some of the products already decremented, if any of
+    them has less on hand; the caller must then roll back.
+    """
+    if not quantities:
+        return
+    product = Product.__table__
+    statement = (
+        update(product)
+        .where(product.c.id == bindparam('pid'))
+        .values(quantity=product.c.quantity - bindparam('qty'))
+    )
+    if not allow_oversell:
+        statement = statement.where(product.c.quantity >= bindparam('qty'))
+
+    taken = db.session.execute(
+        statement, [{'pid': pid, 'qty': qty} for pid, qty in quantities.items()]
+    ).rowcount
+    if taken != len(quantities):
+        raise OutOfStock()
+
+    record_movements((pid, -qty, 'invoice', invoice_id) for pid, qty in quantities.items())
+
+
+def shortages(quantities):
+    """(product name, on hand, wanted) for each product that cannot cover its quantity."""
+    rows = db.session.query(Product.id, Product.name, Product.quantity).filter(
+        Product.id.in_(list(quantities))
+    ).all()
+    return [(row.name, row.quantity, quantities[row.id])
+            for row in rows if row.quantity < quantities[row.id]]
+
+
+def set_stock(product_id, quantity, reason='adjustment'):
+    """
+    Set a product's stock to a counted `quantity`, recording the difference.
+    A compare-and-set, retried if an invoice takes stock in between.
+    """
+    product = Product.__table__
+    for _ in range(SET_STOCK_ATTEMPTS):
+        current = db.session.execute(
+            select(product.c.quantity).where(product.c.id == product_id)
+        ).scalar()
+        updated = db.session.execute(
+            update(product)
+            .where(product.c.id == product_id, product.c.quantity == current)
+            .values(quantity=quantity)
+        ).rowcount
+        if updated:
+            record_movements([(product_id, quantity - current, reason, None)])
+            return
+    raise RuntimeError(f"stock of product {product_id} kept changing; try again")
+
+
+def low_stock(threshold, limit):
+    """Products with `threshold` or fewer on hand, fewest first (ix_product_quantity)."""
+    return db.session.query(Product.id, Product.name, Product.quantity).filter(
+        Product.quantity <= threshold
+    ).order_by(Product.quantity, Product.id).limit(limit).all()
+
+
+def stock_drift():
+    """(product_id, on hand, sum of movements) for every product where they differ."""
+    moved = db.session.query(
+        StockMovement.product_id, func.sum(StockMovement.change).label('total')
+    ).group_by(StockMovement.product_id).subquery()
+    total = func.coalesce(moved.c.total, 0)
+
+    return db.session.query(Product.id, Product.quantity, total).outerjoin(
+        moved, moved.c.product_id == Product.id
+    ).filter(Product.quantity != total).order_by(Product.id).all()
+
+
+def reconcile_stock():
+    """
+    Take the stock on hand as right and record the difference as an
+    'adjustment' movement for every product whose ledger disagrees.
+    """
+    drift = stock_drift()
+    record_movements((pid, on_hand - moved, 'adjustment', None) for pid, on_hand, moved in drift)
+    return drift
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import event
+
+import stock
+from app import create_app, init_db
+from models import Category, Customer, Product, db
+
+
+@pytest.fixture
+def app(tmp_path):
+    """The app on a throwaway SQLite database, inside an app context."""
+    flask_app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'PDF_CACHE_DIR': str(tmp_path / 'pdf_cache'),
+    })
+    with flask_app.app_context():
+        init_db()
+        yield flask_app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def customer(app):
+    customer = Customer(customer_name="Acme Traders", customer_gstin="33ABCDE1234F1Z5",
+                        customer_address="1 Main Road, Chennai", billing_address="1 Main Road, Chennai",
+                        receivables=0)
+    db.session.add(customer)
+    db.session.commit()
+    return customer
+
+
+@pytest.fixture
+def make_products(app):
+    """make_products(n, quantity=1000): n products in one category, with opening stock."""
+    def make(n, quantity=1000):
+        category = Category(name=f"Category {Category.query.count() + 1}")
+        db.session.add(category)
+        products = [Product(name=f"Product {category.id}-{i}", price=100 + i, tax_rate=18,
+                            quantity=quantity, category=category) for i in range(n)]
+        db.session.add_all(products)
+        db.session.flush()
+        stock.record_movements((p.id, quantity, 'opening', None) for p in products)
+        db.session.commit()
+        return products
+    return make
+
+
+@pytest.fixture
+def count_statements(app):
+    """Context manager that counts the SQL statements run inside it."""
+    class Counter:
+        def __init__(self):
+            self.count = 0
+
+        def __enter__(self):
+            event.listen(db.engine, 'before_cursor_execute', self._seen)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(db.engine, 'before_cursor_execute', self._seen)
+
+        def _seen(self, *args):
+            self.count += 1
+
+    return Counter
@@ -0,0 +1,41 @@
+"""The sales snapshot reloads once, however many requests find it stale."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import analytics
+
+
+def test_concurrent_stale_queries_load_once(app, client, customer, make_products, monkeypatch):
+    product_id = make_products(1)[0].id
+    for day in ('2026-04-10', '2026-04-11'):
+        client.post('/add_invoice', data={
+            'invoice_date': day, 'customer_id': customer.id, 'status': 'Pending',
+            'product_id[]': [product_id], 'quantity[]': ['1'],
+        })
+
+    loads = []
+    empty_columns = analytics._empty_columns
+
+    def slow_empty_columns():
+        loads.append(1)
+        time.sleep(0.05)  # long enough for the other queries to find the snapshot stale too
+        return empty_columns()
+
+    monkeypatch.setattr(analytics, '_empty_columns', slow_empty_columns)
+    snapshot = analytics.SalesSnapshot()  # a cold start: nothing to serve until the first load
+
+    def query(_):
+        with app.app_context():
+            return len(snapshot.lines().columns['invoice'])
+
+    with ThreadPoolExecutor(8) as pool:
+        sizes = list(pool.map(query, range(16)))
+    assert loads == [1]
+    assert sizes == [2] * 16
+
+    # stale again: one query reloads while the others use the arrays they have
+    snapshot.invalidate()
+    with ThreadPoolExecutor(8) as pool:
+        sizes = list(pool.map(query, range(16)))
+    assert loads == [1, 1]
+    assert sizes == [2] * 16
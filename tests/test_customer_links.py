@@ -0,0 +1,37 @@
+"""Linking invoices to customers after the fact."""
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+import ledger
+from models import Customer, Invoice, db
+
+
+def walk_in(name, gstin):
+    invoice = Invoice(customer_name=name, customer_gstin=gstin, customer_address="a", billing_address="b",
+                      amount=100, status="Pending")
+    db.session.add(invoice)
+    db.session.commit()
+    return invoice
+
+
+def test_linking_bumps_the_version_of_linked_invoices_only(app):
+    linked_id = walk_in("New Customer", "33NEWCU0000N1Z5").id
+    walk_in_id = walk_in("Walk-in", "").id
+    db.session.add(Customer(customer_name="New Customer", customer_gstin="33NEWCU0000N1Z5",
+                            customer_address="a", billing_address="b", receivables=0))
+    db.session.commit()
+
+    held = db.session.get(Invoice, linked_id)  # as an edit request that read it earlier
+    versions = {invoice.id: invoice.version for invoice in Invoice.query}
+    with db.engine.begin() as conn:
+        assert ledger.link_invoice_customers(conn) == 1
+
+    # that request must not overwrite the link
+    held.status = "Paid"
+    with pytest.raises(StaleDataError):
+        db.session.commit()
+    db.session.rollback()
+
+    assert db.session.get(Invoice, linked_id).customer_id is not None
+    assert db.session.get(Invoice, linked_id).version == versions[linked_id] + 1
+    assert db.session.get(Invoice, walk_in_id).version == versions[walk_in_id]
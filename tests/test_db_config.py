@@ -0,0 +1,70 @@
+"""The engine profile picked from DATABASE_URL."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+import db_config
+
+
+@pytest.mark.parametrize('env, expected', [
+    (None, 'sqlite:///{base}/invoices.db'),
+    ('sqlite:///{base}/other.db', 'sqlite:///{base}/other.db'),
+    ('postgres://invoiceo:secret@db/invoiceo', 'postgresql://invoiceo:secret@db/invoiceo'),
+    ('postgresql://invoiceo:secret@db/invoiceo', 'postgresql://invoiceo:secret@db/invoiceo'),
+])
+def test_database_uri(monkeypatch, tmp_path, env, expected):
+    if env is None:
+        monkeypatch.delenv('DATABASE_URL', raising=False)
+    else:
+        monkeypatch.setenv('DATABASE_URL', env.format(base=tmp_path))
+    assert db_config.database_uri(str(tmp_path)) == expected.format(base=tmp_path)
+
+
+@pytest.mark.parametrize('url', ['sqlite:///{base}/invoices.db', 'sqlite:///{base}/other.db'])
+def test_sqlite_file_pragmas(tmp_path, url):
+    url = url.format(base=tmp_path)
+    options = db_config.engine_options(url)
+    assert options['poolclass'] is QueuePool
+    assert options['connect_args']['check_same_thread'] is False
+
+    engine = db_config.configure_engine(create_engine(url, **options))
+    try:
+        with engine.connect() as conn:
+            def pragma(name):
+                return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('busy_timeout') == db_config.SQLITE_BUSY_TIMEOUT_MS
+            assert pragma('foreign_keys') == 1
+            assert pragma('synchronous') == 1  # NORMAL
+    finally:
+        engine.dispose()
+
+
+def test_sqlite_memory_keeps_default_pool():
+    assert db_config.engine_options('sqlite://') == {}
+    assert db_config.engine_options('sqlite:///:memory:') == {}
+
+
+@pytest.mark.parametrize('env', [
+    'postgres://invoiceo:secret@db/invoiceo',
+    'postgresql://invoiceo:secret@db:5432/invoiceo',
+])
+def test_postgres_engine_options(monkeypatch, env):
+    monkeypatch.setenv('DATABASE_URL', env)
+    options = db_config.engine_options(db_config.database_uri('/unused'))
+    assert options == {
+        'pool_size': db_config.POOL_SIZE,
+        'max_overflow': db_config.MAX_OVERFLOW,
+        'pool_pre_ping': True,
+        'pool_recycle': db_config.POOL_RECYCLE,
+    }
+
+
+def test_postgres_engine_is_built_without_connecting():
+    pytest.importorskip('psycopg2')
+    url = 'postgresql://invoiceo:secret@db/invoiceo'
+    engine = db_config.configure_engine(create_engine(url, **db_config.engine_options(url)))
+    assert engine.pool.size() == db_config.POOL_SIZE
+    assert engine.pool._pre_ping
+    assert not db_config.event.contains(engine, 'connect', db_config._set_sqlite_pragmas)
@@ -0,0 +1,52 @@
+"""gst.py against hand-computed golden values, to the paisa."""
+import pytest
+
+import gst
+
+SELLER = "33ABCDE1234F1Z5"
+INTRA = "33AAAAA0000A1Z5"
+INTER = "29AAAAA0000A1Z5"
+
+# (price, qty, rate, buyer) -> (taxable, cgst, sgst, igst, total) in paise
+GOLDEN = [
+    ((100.00, 1, 18, INTRA), (10000, 900, 900, 0, 11800)),
+    ((99.99, 3, 18, INTER), (29997, 0, 0, 5399, 35396)),
+    ((0.05, 1, 5, INTRA), (5, 0, 0, 0, 5)),
+    ((1.10, 1, 5, INTRA), (110, 3, 3, 0, 116)),
+    ((12.50, 1, 12, INTRA), (1250, 75, 75, 0, 1400)),
+    ((0.25, 1, 18, INTRA), (25, 2, 2, 0, 29)),
+    ((0.50, 1, 3, INTRA), (50, 1, 1, 0, 52)),
+    ((1.00, 1, 1, INTRA), (100, 1, 1, 0, 102)),
+    ((1000.00, 7, 28, INTER), (700000, 0, 0, 196000, 896000)),
+    ((0.99, 10, 0.25, INTRA), (990, 1, 1, 0, 992)),
+]
+
+
+def paise_rows(result):
+    return [tuple(int(value) for value in row) for row in zip(*(result[field] for field in gst.FIELDS))]
+
+
+@pytest.mark.parametrize('line, expected', GOLDEN)
+def test_golden_line(line, expected):
+    price, qty, rate, buyer = line
+    result = gst.compute([price], [qty], [rate], gst.is_intra_state(SELLER, buyer))
+    assert paise_rows(result) == [expected]
+
+
+def test_golden_batch_matches_line_by_line():
+    # large enough for the NumPy path when NumPy is installed
+    repeat = gst.VECTOR_THRESHOLD // len(GOLDEN) + 1
+    lines = [line for line, _ in GOLDEN] * repeat
+    prices, quantities, rates, buyers = map(list, zip(*lines))
+    intra = [gst.is_intra_state(SELLER, buyer) for buyer in buyers]
+
+    result = gst.compute(prices, quantities, rates, intra)
+    assert paise_rows(result) == [expected for _, expected in GOLDEN] * repeat
+
+
+def test_invoice_lines_in_rupees():
+    lines = gst.invoice_lines([(99.99, 3, 18), (0.25, 1, 18)], SELLER, INTER)
+    assert lines == [
+        {'taxable': 299.97, 'cgst': 0, 'sgst': 0, 'igst': 53.99, 'total': 353.96},
+        {'taxable': 0.25, 'cgst': 0, 'sgst': 0, 'igst': 0.05, 'total': 0.30},
+    ]
@@ -0,0 +1,18 @@
+"""Request metrics keep a bounded set of label series."""
+import re
+
+import metrics
+from extensions import request_metrics
+
+
+def test_unknown_methods_share_one_label(client):
+    for n in range(20):
+        client.open(f'/no-such-page-{n}', method=f'X{n}"}}')
+    client.open('/invoices', method='BREW')
+
+    rendered = request_metrics.render()
+    methods = set(re.findall(r'method="([^"]*)"', rendered))
+    assert methods <= metrics.METHODS | {'other'}
+    assert 'invoiceo_http_requests_total{endpoint="unmatched",method="other",status="405"}' in rendered
+    assert re.search(r'invoiceo_http_requests_total\{endpoint="unmatched",method="other",status="404"\} '
+                     r'([2-9]\d|\d{3,})\n', rendered)
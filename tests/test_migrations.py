@@ -0,0 +1,46 @@
+"""Schema migrations on databases written by older versions."""
+import sqlite3
+
+from sqlalchemy import text
+
+import migrations
+from models import db
+
+OLD_PAYMENT = (
+    "CREATE TABLE payment (id INTEGER NOT NULL, payment_no VARCHAR(20) NOT NULL, "
+    "invoice_id INTEGER NOT NULL, customer_id INTEGER NOT NULL, amount FLOAT NOT NULL, "
+    "mode VARCHAR(50), reference VARCHAR(100), payment_date DATETIME NOT NULL, created_at DATETIME, "
+    "PRIMARY KEY (id), UNIQUE (payment_no), "
+    "FOREIGN KEY(invoice_id) REFERENCES invoice (id), FOREIGN KEY(customer_id) REFERENCES customer (id))"
+)
+
+
+def test_payments_of_deleted_customers_survive_migration_10(app, customer, tmp_path):
+    db.engine.dispose()
+    # as left by version 9, before foreign keys were enforced
+    raw = sqlite3.connect(tmp_path / 'test.db')
+    raw.executescript(f"""
+        DROP TABLE payment;
+        {OLD_PAYMENT};
+        CREATE INDEX ix_payment_invoice_id ON payment (invoice_id);
+        INSERT INTO invoice (id, customer_id, customer_name, customer_gstin, customer_address,
+                             billing_address, amount, status, created_at, paid_total, version)
+            VALUES (1, NULL, 'Gone Traders', '33ZZZZZ0000Z1Z5', 'a', 'b', 500, 'Partially Paid',
+                    '2026-04-10', 100, 1);
+        INSERT INTO payment VALUES (1, 'PAY/2026-27/00001', 1, 999, 100, 'UPI', NULL, '2026-04-11', NULL);
+        INSERT INTO payment VALUES (2, 'PAY/2026-27/00002', 1, {customer.id}, 50, 'UPI', NULL, '2026-04-12', NULL);
+        DELETE FROM schema_migrations WHERE version >= 10;
+    """)
+    raw.commit()
+    raw.close()
+
+    assert 10 in migrations.upgrade(db.engine)
+
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT id, customer_id FROM payment ORDER BY id")).all() == [
+            (1, None), (2, customer.id),
+        ]
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+        indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE tbl_name = 'payment' "
+                                    "AND type = 'index' AND sql IS NOT NULL")).scalars().all()
+        assert indexes == ['ix_payment_invoice_id']
@@ -0,0 +1,90 @@
+"""The PDF cache: one directory per invoice, a running size total, and keys that cover included templates."""
+import os
+
+import pytest
+from jinja2 import DictLoader, Environment
+
+from pdf_cache import PdfCache
+from views.pdfs import template_sources
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PdfCache(str(tmp_path / 'cache'), max_bytes=1000)
+
+
+def files(cache):
+    return sorted(os.path.relpath(os.path.join(root, name), cache.directory)
+                  for root, _, names in os.walk(cache.directory) for name in names)
+
+
+def test_entries_live_under_their_invoice(cache):
+    cache.put(1, 'html', b'one')
+    cache.put(2, 'bbb', b'two')
+    cache.put(1, 'reportlab', b'one again')  # another renderer's PDF of the same invoice
+    cache.put(2, 'bbb', b'two again')  # rewritten in place
+
+    assert files(cache) == ['1/html.pdf', '1/reportlab.pdf', '2/bbb.pdf']
+    assert cache.get(1, 'html') == b'one'
+    assert cache.get(1, 'reportlab') == b'one again'
+    assert cache.get(2, 'bbb') == b'two again'
+    assert cache._size == len(b'one' b'one again' b'two again')
+
+    cache.invalidate(1)
+    assert files(cache) == ['2/bbb.pdf']
+    assert not os.path.exists(os.path.join(cache.directory, '1'))
+    cache.invalidate(3)  # nothing cached: a no-op
+
+
+def test_running_size_and_eviction(cache):
+    for invoice_id in range(1, 5):
+        cache.put(invoice_id, 'key', b'x' * 300)
+        path = os.path.join(cache.directory, str(invoice_id), 'key.pdf')
+        os.utime(path, (invoice_id, invoice_id))  # invoice 1 is the least recently used
+    os.utime(os.path.join(cache.directory, '2', 'key.pdf'), (10, 10))  # a hit keeps 2
+
+    # 1200 bytes went in; the oldest file went to get back under 1000
+    assert files(cache) == ['2/key.pdf', '3/key.pdf', '4/key.pdf']
+    assert cache._size == 900
+
+    cache.invalidate(3)
+    assert cache._size == 600
+
+
+def test_startup_counts_existing_entries_and_drops_the_old_layout(cache):
+    cache.put(7, 'key', b'x' * 100)
+    with open(os.path.join(cache.directory, '7-oldkey.pdf'), 'wb') as f:
+        f.write(b'flat layout')
+
+    reopened = PdfCache(cache.directory, max_bytes=1000)
+    assert reopened._size == 100
+    assert files(reopened) == ['7/key.pdf']
+
+
+def test_template_sources_follow_includes_and_extends():
+    env = Environment(loader=DictLoader({
+        'invoice_pdf.html': '{% extends "base.html" %}{% block body %}{% include "lines.html" %}{% endblock %}',
+        'base.html': '<html>{% block body %}{% endblock %}{% import "macros.html" as m %}</html>',
+        'lines.html': '{% for line in lines %}{{ line }}{% endfor %}',
+        'macros.html': '{% macro money(v) %}{{ v }}{% endmacro %}',
+        'unused.html': '',
+    }))
+    assert sorted(template_sources(env, 'invoice_pdf.html')) == [
+        'base.html', 'invoice_pdf.html', 'lines.html', 'macros.html',
+    ]
+
+
+def test_invoice_pdf_is_cached_per_invoice(app, client, customer, make_products):
+    product_id = make_products(1)[0].id
+    client.post('/add_invoice', data={
+        'invoice_date': '2026-04-10', 'customer_id': customer.id, 'status': 'Pending',
+        'product_id[]': [product_id], 'quantity[]': ['1'],
+    })
+
+    first = client.get('/invoice/1/pdf?renderer=reportlab')
+    assert first.status_code == 200
+    cached = os.listdir(os.path.join(app.config['PDF_CACHE_DIR'], '1'))
+    assert cached == [f"{first.get_etag()[0]}.pdf"]
+
+    client.post('/add_payment/1', data={'amount': '10', 'mode': 'UPI', 'payment_date': '2026-04-11'})
+    assert not os.path.exists(os.path.join(app.config['PDF_CACHE_DIR'], '1'))
@@ -0,0 +1,50 @@
+"""add_invoice and add_sales_order run the same number of statements however many lines they get."""
+from models import Invoice, SalesOrder, db
+
+
+def sales_order_form(customer_id, products):
+    return {
+        'customer_id': customer_id,
+        'customer_po_number': 'PO-1',
+        'product_id[]': [p.id for p in products],
+        'quantity[]': ['5'] * len(products),
+        'price[]': [str(p.price) for p in products],
+    }
+
+
+def invoice_form(so_id, products):
+    return {
+        'invoice_date': '2026-04-10',
+        'sales_order_id': so_id,
+        'status': 'Pending',
+        'product_id[]': [p.id for p in products],
+        'quantity[]': ['2'] * len(products),
+    }
+
+
+def statements_for(client, customer, products, count_statements):
+    """(statements for a sales order of `products`, statements for an invoice against all of it)."""
+    form = sales_order_form(customer.id, products)  # built first: reading expired rows is SQL too
+    with count_statements() as so_statements:
+        assert client.post('/add_sales_order', data=form).status_code == 302
+    so = SalesOrder.query.order_by(SalesOrder.id.desc()).first()
+    assert len(so.items) == len(products)
+
+    form = invoice_form(so.id, products)
+    with count_statements() as invoice_statements:
+        assert client.post('/add_invoice', data=form).status_code == 302
+    invoice = Invoice.query.order_by(Invoice.id.desc()).first()
+    assert len(invoice.items) == len(products)
+    db.session.refresh(so)
+    assert [item.invoiced_qty for item in so.items] == [2] * len(products)
+
+    return so_statements.count, invoice_statements.count
+
+
+def test_statement_count_does_not_grow_with_lines(client, customer, make_products, count_statements):
+    # the first documents of the year also create their number sequences
+    statements_for(client, customer, make_products(1), count_statements)
+
+    few = statements_for(client, customer, make_products(2), count_statements)
+    many = statements_for(client, customer, make_products(40), count_statements)
+    assert few == many
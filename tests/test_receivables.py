@@ -0,0 +1,105 @@
+"""Payments keep paid totals and receivables exact, retrying when an invoice changes underneath them."""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, update
+from sqlalchemy.orm.exc import StaleDataError
+
+from ledger import WRITE_ATTEMPTS, adjust_receivables, apply_payment_to_invoice, retry_on_conflict
+from models import BALANCE_EPSILON, Customer, Invoice, Payment, db
+
+WRITERS = 6
+PAYMENTS = 30  # per writer
+
+
+@pytest.fixture
+def invoices(client, customer, make_products):
+    """Ids of three invoices of `customer`, worth 1180.00 each."""
+    product_id = make_products(1)[0].id  # 100.00 + 18% GST
+    for _ in range(3):
+        response = client.post('/add_invoice', data={
+            'invoice_date': '2026-04-10', 'customer_id': customer.id, 'status': 'Pending',
+            'product_id[]': [product_id], 'quantity[]': ['10'],
+        })
+        assert response.status_code == 302
+    return [invoice.id for invoice in Invoice.query.order_by(Invoice.id)]
+
+
+def pay_someone_else(invoice_id, amount):
+    """What a concurrent request does: pays on its own connection and commits."""
+    inv = Invoice.__table__
+    with db.engine.begin() as conn:
+        conn.execute(update(inv).where(inv.c.id == invoice_id).values(
+            paid_total=inv.c.paid_total + amount, version=inv.c.version + 1))
+
+
+def test_stale_invoice_is_read_again(app, invoices):
+    invoice = db.session.get(Invoice, invoices[0])
+    attempts = []
+
+    def pay_balance():
+        attempts.append(invoice.balance)
+        if len(attempts) == 1:
+            pay_someone_else(invoice.id, 1000)  # lands after this attempt read the invoice
+        apply_payment_to_invoice(invoice, invoice.balance)
+
+    retry_on_conflict(pay_balance)
+
+    assert attempts == [pytest.approx(1180), pytest.approx(180)]
+    db.session.expire_all()
+    invoice = db.session.get(Invoice, invoices[0])
+    assert invoice.paid_total == pytest.approx(1180)
+    assert invoice.status == "Paid"
+
+
+def test_retry_gives_up(app, invoices):
+    invoice = db.session.get(Invoice, invoices[0])
+    attempts = []
+
+    def always_beaten():
+        attempts.append(invoice.version)
+        pay_someone_else(invoice.id, 1)
+        apply_payment_to_invoice(invoice, 1)
+
+    with pytest.raises(StaleDataError):
+        retry_on_conflict(always_beaten)
+    assert len(attempts) == WRITE_ATTEMPTS
+
+
+def test_adjust_receivables_skips_walk_in_invoices(app, customer):
+    adjust_receivables(None, 100)
+    adjust_receivables(customer.id, 250.5)
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(Customer, customer.id).receivables == pytest.approx(250.5)
+
+
+def test_parallel_payments_are_exact(app, customer, invoices):
+    customer_id = customer.id
+    opening = db.session.get(Customer, customer_id).receivables
+    assert opening == pytest.approx(3 * 1180)
+
+    def writer(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        statuses = []
+        for _ in range(PAYMENTS):
+            response = client.post(f'/add_payment/{rng.choice(invoices)}', data={
+                'amount': f"{rng.uniform(1, 40):.2f}", 'mode': 'UPI', 'payment_date': '2026-04-11'})
+            statuses.append(response.status_code)
+        return statuses
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        statuses = [status for result in pool.map(writer, range(WRITERS)) for status in result]
+    assert set(statuses) <= {302, 409}  # 409 only once every retry lost
+
+    db.session.expire_all()
+    paid = dict(db.session.query(Payment.invoice_id, func.sum(Payment.amount)).group_by(Payment.invoice_id))
+    for invoice in Invoice.query.filter(Invoice.id.in_(invoices)):
+        assert invoice.paid_total == pytest.approx(paid.get(invoice.id, 0))
+        assert invoice.paid_total <= invoice.amount + BALANCE_EPSILON
+        assert invoice.status == ("Paid" if invoice.balance <= BALANCE_EPSILON else "Partially Paid")
+
+    receivables = db.session.get(Customer, customer_id).receivables
+    assert receivables == pytest.approx(opening - sum(paid.values()))
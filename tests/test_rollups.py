@@ -0,0 +1,31 @@
+"""Dashboard rollups filled from the base tables, as migration 11 does for an existing database."""
+from datetime import datetime
+
+import pytest
+
+import ledger
+from models import Expense, MonthlyRollup, db
+
+
+def test_fill_rollups_from_base_tables(client, customer, make_products):
+    product_id = make_products(1)[0].id  # 100.00 + 18% GST
+    client.post('/add_invoice', data={
+        'invoice_date': '2026-01-15', 'customer_id': customer.id, 'status': 'Pending',
+        'product_id[]': [product_id], 'quantity[]': ['2'],
+    })
+    db.session.add(Expense(title="Rent", category="Office", amount=5000, expense_date=datetime(2026, 2, 1)))
+    # as after an upgrade from before the rollups existed
+    MonthlyRollup.query.delete()
+    db.session.commit()
+    assert ledger.rollup_drift()
+
+    with db.engine.begin() as conn:
+        assert ledger.fill_rollups(conn) == 3
+
+    assert ledger.rollup_drift() == []
+    stored = {(r.year, r.month, r.metric): r.value for r in MonthlyRollup.query}
+    assert stored == {
+        (2026, 1, 'sales'): pytest.approx(236),
+        (2026, 1, 'receivables'): pytest.approx(236),
+        (2026, 2, 'expenses'): pytest.approx(5000),
+    }
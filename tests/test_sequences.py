@@ -0,0 +1,59 @@
+"""Document numbers stay unique and contiguous under parallel writers."""
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+import sequences
+from models import DocumentSequence, db
+
+WHEN = datetime(2025, 6, 1)
+WRITERS = 8
+ALLOCATIONS = 100  # per writer
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sequences.db'}", connect_args={'timeout': 60})
+    db.metadata.create_all(engine, tables=[DocumentSequence.__table__])
+    yield engine
+    engine.dispose()
+
+
+def test_parallel_allocations_tile_the_series(engine):
+    def writer(seed):
+        rng = random.Random(seed)
+        taken = []
+        for _ in range(ALLOCATIONS):
+            count = 1 if rng.random() < 0.8 else rng.randint(2, 20)
+            with engine.begin() as conn:
+                taken.append((sequences.allocate(conn, "PAY", WHEN, count), count))
+        return taken
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        results = list(pool.map(writer, range(WRITERS)))
+
+    numbers = sorted(n for taken in results for first, count in taken for n in range(first, first + count))
+    assert numbers == list(range(1, len(numbers) + 1))
+
+
+def test_rolled_back_allocation_is_reused(engine):
+    with engine.begin() as conn:
+        assert sequences.next_number(conn, "INV", WHEN) == "INV/2025-26/00001"
+
+    with pytest.raises(RuntimeError):
+        with engine.begin() as conn:
+            sequences.next_numbers(conn, "INV", WHEN, 5)
+            raise RuntimeError("invoice failed")
+
+    with engine.begin() as conn:
+        assert sequences.next_numbers(conn, "INV", WHEN, 2) == ["INV/2025-26/00002", "INV/2025-26/00003"]
+
+
+def test_series_restart_each_fiscal_year(engine):
+    with engine.begin() as conn:
+        assert sequences.next_number(conn, "SO", datetime(2026, 3, 31)) == "SO/2025-26/00001"
+        assert sequences.next_number(conn, "SO", datetime(2026, 4, 1)) == "SO/2026-27/00001"
+        assert sequences.next_number(conn, "SO", datetime(2026, 3, 1)) == "SO/2025-26/00002"
@@ -0,0 +1,77 @@
+"""Invoices take stock atomically: nothing is lost under parallel writers, and oversells are refused."""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+import stock
+from models import Invoice, InvoiceItem, Product, StockMovement, db
+
+OPENING = 60
+WRITERS = 6
+INVOICES = 25  # per writer
+
+
+def invoice_form(customer_id, lines):
+    return {
+        'invoice_date': '2026-04-10',
+        'customer_id': customer_id,
+        'status': 'Pending',
+        'product_id[]': [pid for pid, _ in lines],
+        'quantity[]': [str(qty) for _, qty in lines],
+    }
+
+
+def test_parallel_invoices_never_lose_stock(app, customer, make_products):
+    product_ids = [p.id for p in make_products(3, quantity=OPENING)]
+    customer_id = customer.id
+
+    def writer(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        statuses = []
+        for _ in range(INVOICES):
+            lines = [(pid, rng.randint(1, 5)) for pid in rng.sample(product_ids, rng.randint(1, 3))]
+            statuses.append(client.post('/add_invoice', data=invoice_form(customer_id, lines)).status_code)
+        return statuses
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        statuses = [status for result in pool.map(writer, range(WRITERS)) for status in result]
+
+    # together the writers ask for far more than there is
+    assert set(statuses) == {302, 409}
+
+    db.session.expire_all()
+    invoiced = dict(db.session.query(InvoiceItem.product_id, func.sum(InvoiceItem.quantity))
+                    .group_by(InvoiceItem.product_id))
+    moved = dict(db.session.query(StockMovement.product_id, func.sum(StockMovement.change))
+                 .group_by(StockMovement.product_id))
+    for product in Product.query.filter(Product.id.in_(product_ids)):
+        assert product.quantity >= 0
+        assert product.quantity == OPENING - invoiced.get(product.id, 0)
+        assert product.quantity == moved[product.id]
+    assert stock.stock_drift() == []
+
+
+def test_oversell_is_refused(client, customer, make_products):
+    product = make_products(1, quantity=2)[0]
+    product_id = product.id
+
+    response = client.post('/add_invoice', data=invoice_form(customer.id, [(product_id, 3)]))
+
+    assert response.status_code == 409
+    assert Invoice.query.count() == 0
+    assert db.session.get(Product, product_id).quantity == 2
+    assert StockMovement.query.filter_by(reason='invoice').count() == 0
+
+
+def test_oversell_allowed_when_configured(app, client, customer, make_products):
+    app.config['ALLOW_OVERSELL'] = True
+    product_id = make_products(1, quantity=2)[0].id
+
+    response = client.post('/add_invoice', data=invoice_form(customer.id, [(product_id, 3)]))
+
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Product, product_id).quantity == -1
+    assert stock.stock_drift() == []
@@ -0,0 +1,79 @@
+"""Typeahead indexes rebuild once, however many requests find them stale."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import typeahead
+from extensions import product_index
+from models import db
+
+
+def make_index(names):
+    """A PrefixIndex over `names` (a list that may change) that counts full loads."""
+    loads = []
+
+    def load(ids=None):
+        rows = [SimpleNamespace(id=i, name=name) for i, name in enumerate(names, start=1)]
+        if ids is None:
+            loads.append(1)
+            time.sleep(0.05)  # long enough for the other searches to find the index stale too
+            return rows
+        return [row for row in rows if row.id in ids]
+
+    index = typeahead.PrefixIndex(load, lambda row: (row.id, (row.name,), {'name': row.name}),
+                                  fallback=lambda prefix, limit: [])
+    return index, loads
+
+
+def test_concurrent_first_searches_build_once():
+    names = ["Steel Rod", "Mild Steel", "Copper Wire"]
+    index, loads = make_index(names)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: index.search("ste"), range(32)))
+
+    assert len(loads) == 1
+    assert all(sorted(r['name'] for r in result) == ["Mild Steel", "Steel Rod"] for result in results)
+
+
+def test_stale_index_is_served_while_one_request_rebuilds():
+    names = ["Steel Rod"]
+    index, loads = make_index(names)
+    assert index.search("ste") == [{'name': "Steel Rod"}]
+
+    started, release = threading.Event(), threading.Event()
+    original = index._load
+
+    def slow_load(ids=None):
+        if ids is None:
+            started.set()
+            release.wait(5)
+        return original(ids)
+
+    index._load = slow_load
+    names.append("Steel Plate")
+    index.invalidate()
+
+    rebuilding = threading.Thread(target=index.search, args=("ste",))
+    rebuilding.start()
+    assert started.wait(5)
+
+    # the rebuild is stuck in its load: other searches get the old index, without loading again
+    assert index.search("ste") == [{'name': "Steel Rod"}]
+    assert len(loads) == 1
+
+    release.set()
+    rebuilding.join(5)
+    assert len(loads) == 2
+    assert [r['name'] for r in index.search("ste")] == ["Steel Plate", "Steel Rod"]
+
+
+def test_product_without_a_price_is_suggested_at_zero(client, make_products):
+    product, = make_products(1)
+    product.price = None
+    db.session.commit()
+    product_index.invalidate()
+
+    hits = client.get('/typeahead/products', query_string={'q': 'prod'}).get_json()
+    assert [(hit['name'], hit['price']) for hit in hits] == [(product.name, 0)]
@@ -0,0 +1,175 @@
+"""
+In-memory prefix indexes for the typeahead endpoints.
+
+Each index keeps a sorted list of (key, id) pairs, where the keys are the
+lower-cased search fields and every word inside them, so "ste" finds both
+"Steel Rod" and "Mild Steel". A lookup is a bisect to the first key with
+the prefix plus a short scan, and returns small payload dicts that the
+forms can use directly.
+
+Memory is bounded: keys are truncated to MAX_KEY_LENGTH, each entry has
+at most MAX_KEYS keys, and an index that would hold more than
+max_entries rows is not built at all; lookups then go to the `fallback`
+SQL query instead.
+
+The write routes call refresh(ids) after they commit, which re-reads just
+those rows and drops the ones the index query no longer returns. Other
+worker processes do not see those calls, so every index also reloads
+itself once it is older than max_age seconds. Only one request rebuilds
+at a time; the others keep searching the index they have until the new
+one is swapped in, and wait only when there is none yet.
+"""
+import bisect
+import threading
+import time
+
+MAX_KEY_LENGTH = 40
+MAX_KEYS = 8
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_AGE = 300  # seconds
+
+
+def normalize(text):
+    return ' '.join(str(text or '').lower().split())
+
+
+def index_keys(fields):
+    """Keys for one entry: each field, then each word after the first."""
+    keys = []
+    for field in fields:
+        text = normalize(field)
+        if not text:
+            continue
+        keys.append(text[:MAX_KEY_LENGTH])
+        keys.extend(word[:MAX_KEY_LENGTH] for word in text.split()[1:])
+    return tuple(dict.fromkeys(keys))[:MAX_KEYS]
+
+
+class PrefixIndex:
+    """
+    load(ids=None)     -> rows to index (all of them, or just `ids`)
+    describe(row)      -> (id, search fields, payload dict)
+    fallback(q, limit) -> rows matching q straight from the database, used
+                          when the index is too large
+    """
+
+    def __init__(self, load, describe, fallback,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE):
+        self._load = load
+        self._describe = describe
+        self._fallback = fallback
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._rebuild_lock = threading.Lock()  # one loader at a time
+        self._lock = threading.Lock()          # guards the index itself
+        self._built = False
+        self._keys = []      # sorted (key, id)
+        self._entries = {}   # id -> (keys, payload)
+        self._loaded_at = None
+        self.overflow = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age
+
+    def rebuild(self):
+        with self._rebuild_lock:
+            self._build()
+
+    def _rebuild_if_stale(self):
+        if not self._stale():
+            return
+        # while another request rebuilds, serve the current index if there is one
+        if not self._rebuild_lock.acquire(blocking=not self._built):
+            return
+        try:
+            if self._stale():  # unless that other request has just finished
+                self._build()
+        finally:
+            self._rebuild_lock.release()
+
+    def _build(self):
+        keys = []
+        entries = {}
+        overflow = False
+        for row in self._load():
+            if len(entries) >= self.max_entries:
+                overflow = True
+                keys, entries = [], {}
+                break
+            entry_id, fields, payload = self._describe(row)
+            entry_keys = index_keys(fields)
+            entries[entry_id] = (entry_keys, payload)
+            keys.extend((key, entry_id) for key in entry_keys)
+        keys.sort()
+
+        with self._lock:
+            self._keys = keys
+            self._entries = entries
+            self.overflow = overflow
+            self._loaded_at = time.monotonic()
+            self._built = True
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _remove_locked(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in entry[0]:
+            i = bisect.bisect_left(self._keys, (key, entry_id))
+            if i < len(self._keys) and self._keys[i] == (key, entry_id):
+                del self._keys[i]
+
+    def _upsert_locked(self, row):
+        entry_id, fields, payload = self._describe(row)
+        self._remove_locked(entry_id)
+        entry_keys = index_keys(fields)
+        self._entries[entry_id] = (entry_keys, payload)
+        for key in entry_keys:
+            bisect.insort(self._keys, (key, entry_id))
+
+    def refresh(self, ids):
+        """Re-read `ids` from the database after a write."""
+        ids = list(ids)
+        with self._lock:
+            if self._loaded_at is None or self.overflow:
+                return  # the next lookup rebuilds or goes to SQL anyway
+        rows = self._load(ids)
+
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for entry_id in ids:
+                self._remove_locked(entry_id)
+            if len(self._entries) + len(rows) > self.max_entries:
+                self._loaded_at = None
+                return
+            for row in rows:
+                self._upsert_locked(row)
+
+    def search(self, prefix, limit=10):
+        self._rebuild_if_stale()
+        if self.overflow:
+            return [self._describe(row)[2] for row in self._fallback(prefix, limit)]
+
+        key = normalize(prefix)[:MAX_KEY_LENGTH]
+        results = []
+        seen = set()
+        with self._lock:
+            keys = self._keys
+            i = bisect.bisect_left(keys, (key,))
+            while i < len(keys) and len(results) < limit:
+                found, entry_id = keys[i]
+                if not found.startswith(key):
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    results.append(self._entries[entry_id][1])
+                i += 1
+        return results
@@ -0,0 +1,17 @@
+"""
+Route blueprints, one module per area of the app. CLI commands that
+belong to an area are registered on its blueprint without a group, so
+they stay top level (flask --app app export-invoices, ...).
+"""
+from views import (analytics, customers, dashboard, expenses, invoices, lookup, payments, pdfs,
+                   products, reports, returns, sales_orders)
+
+BLUEPRINTS = (
+    dashboard.bp, invoices.bp, pdfs.bp, payments.bp, sales_orders.bp, expenses.bp,
+    customers.bp, products.bp, reports.bp, returns.bp, analytics.bp, lookup.bp,
+)
+
+
+def register(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
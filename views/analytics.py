@@ -0,0 +1,61 @@
+"""JSON analytics for the dashboard, answered from the in-memory sales snapshot."""
+from flask import Blueprint, jsonify, request
+
+import analytics
+from extensions import sales_snapshot
+from listing import parse_date_arg
+
+bp = Blueprint('analytics', __name__, cli_group=None)
+
+TOP_LIMIT = 10
+TOP_MAX_LIMIT = 100
+
+
+def analytics_filters():
+    """Drill-down filters from the query string, as keyword arguments for Lines.select()."""
+    filters = {
+        'date_from': parse_date_arg(request.args, 'date_from'),
+        'date_to': parse_date_arg(request.args, 'date_to'),
+        'customer_id': request.args.get('customer_id', type=int),
+        'product_id': request.args.get('product_id', type=int),
+        'category_id': request.args.get('category_id', type=int),
+    }
+    return {key: value for key, value in filters.items() if value is not None}
+
+
+def analytics_response(results, filters):
+    shown = {key: value.date().isoformat() if key.startswith('date') else value
+             for key, value in filters.items()}
+    return jsonify({'filters': shown, 'results': results})
+
+
+def top_limit():
+    return max(1, min(request.args.get('limit', TOP_LIMIT, type=int), TOP_MAX_LIMIT))
+
+
+@bp.route('/api/analytics/top-customers')
+def top_customers():
+    filters = analytics_filters()
+    lines = sales_snapshot.lines()
+    return analytics_response(analytics.top_customers(lines, top_limit(), **filters), filters)
+
+
+@bp.route('/api/analytics/top-products')
+def top_products():
+    filters = analytics_filters()
+    lines = sales_snapshot.lines()
+    return analytics_response(analytics.top_products(lines, top_limit(), **filters), filters)
+
+
+@bp.route('/api/analytics/categories')
+def categories():
+    filters = analytics_filters()
+    lines = sales_snapshot.lines()
+    return analytics_response(analytics.category_summary(lines, **filters), filters)
+
+
+@bp.route('/api/analytics/monthly')
+def monthly():
+    filters = analytics_filters()
+    lines = sales_snapshot.lines()
+    return analytics_response(analytics.monthly_sales(lines, **filters), filters)
@@ -0,0 +1,123 @@
+"""Customer master, and linking invoices to it."""
+import click
+from flask import Blueprint, abort, redirect, render_template, request, url_for
+from sqlalchemy.orm.exc import StaleDataError
+
+import ledger
+from extensions import customer_index, sales_order_index, sales_snapshot
+from models import Customer, Invoice, Payment, SalesOrder, db
+
+bp = Blueprint('customers', __name__, cli_group=None)
+
+STALE_CUSTOMER_FORM = "The customer was changed since this form was opened; reload it and try again"
+CUSTOMER_HAS_ORDERS = "The customer has sales orders and cannot be deleted"
+
+
+# View All Customers
+@bp.route('/customers', methods=['GET'])
+def customers():
+    all_customers = Customer.query.all()
+    return render_template('customers.html', customers=all_customers)
+
+# Add Customer
+@bp.route('/add_customer', methods=['POST'])
+def add_customer():
+    customer_name = request.form['customer_name']
+    customer_gstin = request.form['customer_gstin']
+    customer_address = request.form['customer_address']
+    billing_address = request.form['billing_address']
+    receivables = float(request.form['receivables'])
+
+    new_customer = Customer(
+        customer_name=customer_name, 
+        customer_gstin = customer_gstin,
+        customer_address=customer_address, 
+        billing_address=billing_address, 
+        receivables=receivables
+    )
+    
+    db.session.add(new_customer)
+    db.session.commit()
+    customer_index.refresh([new_customer.id])
+    return redirect(url_for('customers.customers'))
+
+# Edit Customer
+@bp.route('/edit_customer/<int:id>', methods=['GET', 'POST'])
+def edit_customer(id):
+    customer = Customer.query.get_or_404(id)
+    
+    if request.method == 'POST':
+        # receivables on the form are as of its version; invoices and
+        # payments since then would be overwritten
+        if request.form.get('version', type=int) not in (None, customer.version):
+            abort(409, STALE_CUSTOMER_FORM)
+        customer.customer_name = request.form['customer_name']
+        customer.customer_gstin = request.form['customer_gstin']
+        customer.customer_address = request.form['customer_address']
+        customer.billing_address = request.form['billing_address']
+        customer.receivables = float(request.form['receivables'])
+
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            abort(409, STALE_CUSTOMER_FORM)
+        customer_index.refresh([id])
+        sales_order_index.invalidate()  # open orders carry the customer's details
+        return redirect(url_for('customers.customers'))
+
+    return render_template('edit_customer.html', customer=customer)
+
+# Delete Customer
+@bp.route('/delete_customer/<int:id>', methods=['POST'])
+def delete_customer(id):
+    customer = Customer.query.get_or_404(id)
+    if db.session.query(SalesOrder.id).filter_by(customer_id=id).first():
+        abort(409, CUSTOMER_HAS_ORDERS)
+    # its invoices and payments keep their printed details but no longer belong to anyone
+    unlinked = [invoice_id for invoice_id, in db.session.query(Invoice.id).filter_by(customer_id=id)]
+    Invoice.query.filter_by(customer_id=id).update(
+        {Invoice.customer_id: None, Invoice.version: Invoice.version + 1}, synchronize_session=False
+    )
+    Payment.query.filter_by(customer_id=id).update({Payment.customer_id: None}, synchronize_session=False)
+    db.session.delete(customer)
+    db.session.commit()
+    customer_index.refresh([id])
+    sales_order_index.invalidate()
+    sales_snapshot.refresh_invoices(unlinked)
+    return redirect(url_for('customers.customers'))
+
+
+@bp.cli.command('link-customers')
+@click.option('--invoice', 'invoice_id', type=int, help='Invoice to link by hand (with --customer)')
+@click.option('--customer', 'customer_id', type=int, help='Customer the --invoice belongs to')
+def link_customers_command(invoice_id, customer_id):
+    """Link unlinked invoices to the customer with their GSTIN or name; list the rest."""
+    if (invoice_id is None) != (customer_id is None):
+        raise click.UsageError("--invoice and --customer go together")
+
+    if invoice_id is not None:
+        invoice = db.session.get(Invoice, invoice_id)
+        customer = db.session.get(Customer, customer_id)
+        if invoice is None or customer is None:
+            raise click.ClickException(f"no {'invoice' if invoice is None else 'customer'} with that id")
+        invoice.customer_id = customer.id
+        db.session.commit()
+        sales_snapshot.refresh_invoices([invoice.id])
+        click.echo(f"Linked invoice {invoice.id} to customer {customer.id} ({customer.customer_name})")
+        return
+
+    linked = ledger.link_invoice_customers(db.session.connection())
+    db.session.commit()
+    sales_snapshot.invalidate()
+    click.echo(f"Linked {linked} invoice(s)")
+
+    unlinked = ledger.unlinked_invoices(db.session.connection())
+    walk_in = 0
+    for invoice_id, name, gstin, by_gstin, by_name in unlinked:
+        if by_gstin > 1 or by_name > 1:
+            click.echo(f"invoice {invoice_id} ({name}, {gstin or 'no GSTIN'}): {by_gstin} customer(s) "
+                       f"with this GSTIN, {by_name} with this name; link it with --invoice/--customer")
+        else:
+            walk_in += 1
+    click.echo(f"{len(unlinked) - walk_in} ambiguous, {walk_in} matching no customer")
@@ -0,0 +1,62 @@
+"""Dashboard, /metrics and the rollup maintenance commands."""
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, render_template
+
+from extensions import request_metrics
+from ledger import ROLLUP_METRICS, rebuild_rollups, rollup_drift
+from models import MonthlyRollup
+
+bp = Blueprint('dashboard', __name__, cli_group=None)
+
+
+@bp.route('/metrics')
+def metrics_view():
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/')
+@bp.route('/dashboard')
+def dashboard():
+    current_year = datetime.now().year
+
+    months = ["Jan","Feb","Mar","Apr","May","Jun",
+              "Jul","Aug","Sep","Oct","Nov","Dec"]
+
+    series = {metric: [0] * 12 for metric in ROLLUP_METRICS}
+
+    for row in MonthlyRollup.query.filter_by(year=current_year).all():
+        if row.metric in series:
+            series[row.metric][row.month - 1] = float(row.value or 0)
+
+    return render_template(
+        "dashboard.html",
+        months=months,
+        sales=series['sales'],
+        payments=series['payments'],
+        receivables=series['receivables'],
+        orders=series['orders'],
+        expenses=series['expenses'],
+        year=current_year
+    )
+
+
+@bp.cli.command('verify-rollups')
+@click.option('--year', type=int, help='Only check one calendar year')
+def verify_rollups_command(year):
+    """Compare the dashboard rollups with the base tables and report drift."""
+    drift = rollup_drift(year)
+    for (y, month, metric), have, want in drift:
+        click.echo(f"{y}-{month:02d} {metric}: stored {have:.2f}, expected {want:.2f}")
+    click.echo(f"{len(drift)} rollup(s) out of sync")
+    if drift:
+        raise SystemExit(1)
+
+
+@bp.cli.command('rebuild-rollups')
+@click.option('--year', type=int, help='Only rebuild one calendar year')
+def rebuild_rollups_command(year):
+    """Recompute the dashboard rollups from the base tables."""
+    drift = rebuild_rollups(year)
+    click.echo(f"Rebuilt rollups, corrected {len(drift)} drifted value(s)")
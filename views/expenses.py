@@ -0,0 +1,40 @@
+"""Expenses."""
+from datetime import datetime
+
+from flask import Blueprint, redirect, render_template, request, url_for
+
+from ledger import bump_rollup
+from models import Expense, db
+
+bp = Blueprint('expenses', __name__)
+
+
+@bp.route('/expenses')
+def expenses():
+    expenses = Expense.query.order_by(Expense.expense_date.desc()).all()
+    return render_template('expenses.html', expenses=expenses)
+
+
+@bp.route('/add_expense', methods=['POST'])
+def add_expense():
+    expense = Expense(
+        title=request.form['title'],
+        category=request.form['category'],
+        amount=float(request.form['amount']),
+        payment_mode=request.form.get('payment_mode'),
+        reference=request.form.get('reference'),
+        notes=request.form.get('notes'),
+        expense_date=datetime.strptime(request.form['expense_date'], "%Y-%m-%d")
+    )
+    db.session.add(expense)
+    bump_rollup('expenses', expense.expense_date, expense.amount)
+    db.session.commit()
+    return redirect(url_for('expenses.expenses'))
+
+@bp.route('/delete_expense/<int:id>', methods=['POST'])
+def delete_expense(id):
+    exp = Expense.query.get_or_404(id)
+    bump_rollup('expenses', exp.expense_date, -exp.amount)
+    db.session.delete(exp)
+    db.session.commit()
+    return redirect(url_for('expenses.expenses'))
@@ -0,0 +1,556 @@
+"""Invoice list, entry and editing, and bulk import."""
+import io
+import time
+from datetime import datetime
+
+import click
+from flask import Blueprint, abort, current_app, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import bindparam, case, exists, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+
+import gst
+import invoice_import
+import sequences
+import stock
+from extensions import pdf_cache, sales_order_index, sales_snapshot
+from gst_returns import add_invoice_gst, apply_invoice_gst
+from ledger import (adjust_receivables, apply_invoice_rollups, bump_rollup, find_customer,
+                    generate_invoice_no)
+from listing import filter_invoices, keyset_page, list_filters
+from models import (SELLER_GSTIN, Customer, Invoice, InvoiceItem, Product, SalesOrder,
+                    SalesOrderItem, db)
+
+bp = Blueprint('invoices', __name__, cli_group=None)
+
+STALE_INVOICE_FORM = "The invoice was changed since this form was opened; reload it and try again"
+
+
+@bp.route('/invoices')
+def invoices():
+    filters = list_filters()
+    query = filter_invoices(Invoice.query, filters)
+
+    if filters.get('sort') == 'balance':
+        page, next_cursor = keyset_page(
+            query, Invoice.balance, Invoice.id,
+            cursor_of=lambda invoice: (invoice.amount - invoice.paid_total, invoice.id)
+        )
+    else:
+        page, next_cursor = keyset_page(query, Invoice.created_at, Invoice.id)
+
+    return render_template(
+        'invoices.html',
+        invoices=page,
+        filters=filters,
+        next_cursor=next_cursor
+    )
+
+
+@bp.route('/add_invoice', methods=['POST'])
+def add_invoice():
+    current_app.logger.debug("add_invoice form: %s", request.form.to_dict())
+
+    invoice_date_str = request.form.get("invoice_date")
+
+    if not invoice_date_str:
+        abort(400, "Invoice date is required")
+
+    invoice_date = datetime.strptime(invoice_date_str, "%Y-%m-%d")
+
+
+
+    # ---------------- CUSTOMER ----------------
+    customer = None
+    so = None
+    customer_id = request.form.get('customer_id')
+    sales_order_id = request.form.get('sales_order_id')
+
+    if sales_order_id:
+        so = SalesOrder.query.options(
+            joinedload(SalesOrder.customer),
+            selectinload(SalesOrder.items)
+        ).get_or_404(sales_order_id)
+        customer = so.customer
+
+    elif customer_id:
+        customer = Customer.query.get_or_404(customer_id)
+
+    if customer:
+        customer_name = customer.customer_name
+        customer_gstin = customer.customer_gstin
+        customer_address = customer.customer_address
+        billing_address = customer.billing_address
+    else:
+        customer_name = request.form['customer_name']
+        customer_gstin = request.form['customer_gstin']
+        customer_address = request.form['customer_address']
+        billing_address = request.form['billing_address']
+        # typed-in details still belong to a customer if exactly one matches
+        customer = find_customer(customer_gstin, customer_name)
+
+    status = request.form['status']
+
+    # ---------------- PRODUCTS (one IN query) ----------------
+    try:
+        requested = [
+            (int(pid), int(qty))
+            for pid, qty in zip(request.form.getlist('product_id[]'), request.form.getlist('quantity[]'))
+        ]
+    except ValueError:
+        abort(400, "Invalid product or quantity")
+    if any(qty <= 0 for _, qty in requested):
+        abort(400, "Quantities must be positive")
+
+    products = {
+        p.id: p
+        for p in Product.query.filter(Product.id.in_({pid for pid, _ in requested})).all()
+    }
+    lines = [(products[pid], qty) for pid, qty in requested if pid in products]
+
+    # ---------------- VALIDATE AGAINST SALES ORDER ----------------
+    # everything is checked before the first write
+    so_quantities = {}
+    if so:
+        so_items = {i.product_id: i for i in so.items}
+
+        for product, qty in lines:
+            so_quantities[product.id] = so_quantities.get(product.id, 0) + qty
+
+        for pid, qty in so_quantities.items():
+            so_item = so_items.get(pid)
+
+            if not so_item:
+                current_app.logger.info("add_invoice: product %s not in sales order %s", pid, so.id)
+                return redirect(url_for('invoices.invoices'))
+
+            if qty > so_item.ordered_qty - so_item.invoiced_qty:
+                current_app.logger.info("add_invoice: qty %s of product %s exceeds sales order %s", qty, pid, so.id)
+                return redirect(url_for('invoices.invoices'))
+
+    # ---------------- GST (whole invoice in one pass) ----------------
+    taxes = gst.invoice_lines(
+        [(product.price, qty, product.tax_rate) for product, qty in lines],
+        SELLER_GSTIN,
+        customer_gstin
+    )
+    total_amount = gst.rupees(sum(gst.to_paise(tax["total"]) for tax in taxes))
+
+    # ---------------- CREATE INVOICE ----------------
+    new_invoice = Invoice(
+        invoice_no=generate_invoice_no(invoice_date),
+        customer_id=customer.id if customer else None,
+        customer_name=customer_name,
+        customer_gstin=customer_gstin,
+        customer_address=customer_address,
+        billing_address=billing_address,
+        amount=total_amount,
+        status=status,
+        created_at=invoice_date
+    )
+
+    db.session.add(new_invoice)
+    db.session.flush()  # get invoice.id
+
+    # ---------------- ADD INVOICE ITEMS (one executemany) ----------------
+    item_rows = [
+        {
+            'invoice_id': new_invoice.id,
+            'product_id': product.id,
+            'product_name': product.name,
+            'quantity': qty,
+            'unit_price': product.price,
+            'gst_rate': product.tax_rate,
+            'taxable_value': tax["taxable"],
+            'cgst': tax["cgst"],
+            'sgst': tax["sgst"],
+            'igst': tax["igst"],
+            'total': tax["total"],
+        }
+        for (product, qty), tax in zip(lines, taxes)
+    ]
+    if item_rows:
+        db.session.execute(insert(InvoiceItem.__table__), item_rows)
+        add_invoice_gst([(new_invoice.id, invoice_date, customer_gstin, item_rows)])
+
+    apply_invoice_rollups(new_invoice)
+
+    # ---------------- STOCK (one conditional UPDATE per product) ----------------
+    stock_quantities = {}
+    for product, qty in lines:
+        stock_quantities[product.id] = stock_quantities.get(product.id, 0) + qty
+    try:
+        stock.take_stock(stock_quantities, new_invoice.id, current_app.config['ALLOW_OVERSELL'])
+    except stock.OutOfStock:
+        db.session.rollback()
+        short = ', '.join(f"{name} ({on_hand} on hand, {wanted} wanted)"
+                          for name, on_hand, wanted in stock.shortages(stock_quantities))
+        current_app.logger.info("add_invoice: not enough stock for %s", short)
+        abort(409, f"Not enough stock: {short or 'taken by another invoice, try again'}")
+
+    # ---------------- UPDATE CUSTOMER RECEIVABLES ----------------
+    if customer and status != "Paid":
+        adjust_receivables(customer.id, total_amount)
+
+    # ---------------- SALES ORDER QTY REDUCTION ----------------
+    if so and so_quantities:
+        so_item_table = SalesOrderItem.__table__
+        reduced = db.session.execute(
+            update(so_item_table)
+            .where(so_item_table.c.sales_order_id == so.id)
+            .where(so_item_table.c.product_id == bindparam('pid'))
+            .where(so_item_table.c.ordered_qty - so_item_table.c.invoiced_qty >= bindparam('qty'))
+            .values(invoiced_qty=so_item_table.c.invoiced_qty + bindparam('qty')),
+            [{'pid': pid, 'qty': qty} for pid, qty in so_quantities.items()]
+        ).rowcount
+
+        if reduced != len(so_quantities):
+            # another invoice used up the remaining quantity since we checked
+            db.session.rollback()
+            current_app.logger.info("add_invoice: sales order %s used up concurrently", so.id)
+            return redirect(url_for('invoices.invoices'))
+
+        # update SO status
+        pending = exists().where(
+            SalesOrderItem.sales_order_id == so.id,
+            SalesOrderItem.invoiced_qty < SalesOrderItem.ordered_qty
+        )
+        SalesOrder.query.filter_by(id=so.id).update(
+            {SalesOrder.status: case((pending, "Partially Invoiced"), else_="Completed")},
+            synchronize_session=False
+        )
+
+    # ---------------- COMMIT ----------------
+    db.session.commit()
+
+    if so:
+        sales_order_index.refresh([so.id])
+
+    return redirect(url_for('invoices.invoices'))
+
+
+@bp.route('/edit_invoice/<int:id>', methods=['GET', 'POST'])
+def edit_invoice(id):
+    invoice = Invoice.query.get_or_404(id)
+
+    if request.method == 'POST':
+        # the form carries the version it was opened at; a payment since then
+        # has changed the status and paid total it would overwrite
+        if request.form.get('version', type=int) not in (None, invoice.version):
+            abort(409, STALE_INVOICE_FORM)
+        moves_gst = request.form['customer_gstin'] != invoice.customer_gstin
+        apply_invoice_rollups(invoice, -1)
+        if moves_gst:
+            apply_invoice_gst(invoice, -1)
+
+        invoice.customer_name = request.form['customer_name']
+        invoice.customer_gstin = request.form['customer_gstin']
+        invoice.customer_address = request.form['customer_address']
+        invoice.billing_address = request.form['billing_address']
+        invoice.amount = float(request.form['amount'])
+        invoice.status = request.form['status']
+
+        apply_invoice_rollups(invoice)
+        if moves_gst:
+            apply_invoice_gst(invoice)
+
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            abort(409, STALE_INVOICE_FORM)
+        pdf_cache.invalidate(invoice.id)
+        sales_snapshot.refresh_invoices([invoice.id])
+        return redirect(url_for('invoices.invoices'))
+
+    return render_template('edit_invoice.html', invoice=invoice)
+
+
+# ---------------- BULK IMPORT ----------------
+IMPORT_BATCH_SIZE = 500  # invoices per transaction
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+
+class ImportRowError(ValueError):
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
+
+
+def load_import_lookups():
+    """Products and customers as plain dicts so validation needs no queries."""
+    products = {}
+    products_by_name = {}
+    for pid, name, price, tax_rate in db.session.execute(
+        select(Product.id, Product.name, Product.price, Product.tax_rate)
+    ):
+        products[pid] = (name, price or 0.0, tax_rate or 0.0)
+        products_by_name.setdefault(name, pid)
+
+    customers = {}
+    customers_by_gstin = {}
+    customers_by_name = {}
+    for row in db.session.execute(select(
+        Customer.id, Customer.customer_name, Customer.customer_gstin,
+        Customer.customer_address, Customer.billing_address
+    )):
+        customers[row.id] = row
+        # a GSTIN or name shared by several customers matches none of them
+        customers_by_gstin[row.customer_gstin] = None if row.customer_gstin in customers_by_gstin else row
+        customers_by_name[row.customer_name] = None if row.customer_name in customers_by_name else row
+
+    return {
+        'products': products,
+        'products_by_name': products_by_name,
+        'customers': customers,
+        'customers_by_gstin': customers_by_gstin,
+        'customers_by_name': customers_by_name,
+    }
+
+
+def build_import_invoice(record, lookups):
+    """
+    Validate one import record and return (customer_id, invoice_row, item_rows).
+    GST is filled in later for the whole batch by price_import_batch().
+    """
+    try:
+        invoice_date = datetime.strptime(str(record['invoice_date']), "%Y-%m-%d")
+    except ValueError:
+        raise ImportRowError(f"invalid invoice_date {record['invoice_date']!r}")
+
+    customer = None
+    if record['customer_id']:
+        try:
+            customer = lookups['customers'].get(int(record['customer_id']))
+        except (TypeError, ValueError):
+            raise ImportRowError(f"invalid customer_id {record['customer_id']!r}")
+        if customer is None:
+            raise ImportRowError(f"unknown customer_id {record['customer_id']}")
+    else:
+        customer = (lookups['customers_by_gstin'].get(record['customer_gstin'] or None)
+                    or lookups['customers_by_name'].get(record['customer_name']))
+
+    if customer:
+        invoice_row = {
+            'customer_id': customer.id,
+            'customer_name': customer.customer_name,
+            'customer_gstin': customer.customer_gstin,
+            'customer_address': customer.customer_address,
+            'billing_address': customer.billing_address,
+        }
+    else:
+        invoice_row = {
+            field: record[field]
+            for field in ('customer_name', 'customer_gstin', 'customer_address', 'billing_address')
+        }
+        missing = [field for field, value in invoice_row.items() if not value]
+        if missing:
+            raise ImportRowError(f"unknown customer and missing {', '.join(missing)}")
+        invoice_row['customer_id'] = None
+
+    items = []
+    for item in record['items']:
+        pid = item['product_id']
+        if pid:
+            try:
+                pid = int(pid)
+            except (TypeError, ValueError):
+                raise ImportRowError(f"invalid product_id {pid!r}", item['line'])
+        else:
+            pid = lookups['products_by_name'].get(item['product_name'])
+
+        product = lookups['products'].get(pid)
+        if product is None:
+            raise ImportRowError(
+                f"unknown product {item['product_id'] or item['product_name']!r}", item['line']
+            )
+
+        try:
+            qty = int(item['quantity'])
+        except (TypeError, ValueError):
+            raise ImportRowError(f"invalid quantity {item['quantity']!r}", item['line'])
+        if qty <= 0:
+            raise ImportRowError("quantity must be positive", item['line'])
+
+        name, price, tax_rate = product
+        items.append({
+            'product_id': pid,
+            'product_name': name,
+            'quantity': qty,
+            'unit_price': price,
+            'gst_rate': tax_rate,
+        })
+
+    if not items:
+        raise ImportRowError("invoice has no items")
+
+    invoice_row.update(
+        status=record['status'] or "Pending",
+        created_at=invoice_date,
+    )
+    return customer.id if customer else None, invoice_row, items
+
+
+def price_import_batch(batch):
+    """Compute GST for every line of a batch in one pass and fill in the amounts."""
+    prices, quantities, rates, intra = [], [], [], []
+    for _, invoice_row, items in batch:
+        same_state = gst.is_intra_state(SELLER_GSTIN, invoice_row['customer_gstin'])
+        for item in items:
+            prices.append(item['unit_price'])
+            quantities.append(item['quantity'])
+            rates.append(item['gst_rate'])
+            intra.append(same_state)
+
+    paise = gst.compute(prices, quantities, rates, intra)
+
+    i = 0
+    for _, invoice_row, items in batch:
+        total_paise = 0
+        for item in items:
+            item['taxable_value'] = gst.rupees(paise['taxable'][i])
+            item['cgst'] = gst.rupees(paise['cgst'][i])
+            item['sgst'] = gst.rupees(paise['sgst'][i])
+            item['igst'] = gst.rupees(paise['igst'][i])
+            item['total'] = gst.rupees(paise['total'][i])
+            total_paise += paise['total'][i]
+            i += 1
+        invoice_row['amount'] = gst.rupees(total_paise)
+
+
+def write_import_batch(batch):
+    """Insert one batch of validated invoices in a single transaction."""
+    price_import_batch(batch)
+
+    conn = db.session.connection()
+    insert_invoice = insert(Invoice.__table__)
+
+    # one block of invoice numbers per fiscal year in the batch
+    by_year = {}
+    for _, invoice_row, _ in batch:
+        by_year.setdefault(sequences.fiscal_year(invoice_row['created_at']), []).append(invoice_row)
+    for rows in by_year.values():
+        when = rows[0]['created_at']
+        numbers = sequences.next_numbers(conn, "INV", when, len(rows))
+        for invoice_row, number in zip(rows, numbers):
+            invoice_row['invoice_no'] = number
+
+    item_rows = []
+    gst_invoices = []
+    receivables = {}
+    rollups = {}
+
+    for customer_id, invoice_row, items in batch:
+        invoice_id = conn.execute(insert_invoice, invoice_row).inserted_primary_key[0]
+
+        for item in items:
+            item['invoice_id'] = invoice_id
+        item_rows.extend(items)
+        gst_invoices.append((invoice_id, invoice_row['created_at'], invoice_row['customer_gstin'], items))
+
+        amount = invoice_row['amount']
+        month = invoice_row['created_at'].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        rollups[('sales', month)] = rollups.get(('sales', month), 0) + amount
+        if invoice_row['status'] != "Paid":
+            rollups[('receivables', month)] = rollups.get(('receivables', month), 0) + amount
+            if customer_id:
+                receivables[customer_id] = receivables.get(customer_id, 0) + amount
+
+    conn.execute(insert(InvoiceItem.__table__), item_rows)
+    add_invoice_gst(gst_invoices)
+
+    if receivables:
+        conn.execute(
+            update(Customer.__table__)
+            .where(Customer.__table__.c.id == bindparam('customer_id'))
+            .values(receivables=Customer.__table__.c.receivables + bindparam('delta'),
+                    version=Customer.__table__.c.version + 1),
+            [{'customer_id': cid, 'delta': delta} for cid, delta in receivables.items()]
+        )
+
+    for (metric, month), delta in rollups.items():
+        bump_rollup(metric, month, delta)
+
+    db.session.commit()
+    return len(item_rows)
+
+
+def import_invoices(records, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import (line_no, record, error) tuples from an invoice_import reader.
+    Bad records are collected with their line numbers and skipped; the
+    good ones are written `batch_size` invoices per transaction.
+    """
+    lookups = load_import_lookups()
+
+    result = {'invoices': 0, 'items': 0, 'error_count': 0, 'errors': []}
+
+    def report(line, message):
+        result['error_count'] += 1
+        if len(result['errors']) < IMPORT_MAX_REPORTED_ERRORS:
+            result['errors'].append({'line': line, 'error': message})
+
+    batch = []
+    for line, record, error in records:
+        if error:
+            report(line, error)
+            continue
+        try:
+            batch.append(build_import_invoice(record, lookups))
+        except ImportRowError as e:
+            report(e.line or line, str(e))
+            continue
+
+        if len(batch) >= batch_size:
+            result['items'] += write_import_batch(batch)
+            result['invoices'] += len(batch)
+            batch = []
+
+    if batch:
+        result['items'] += write_import_batch(batch)
+        result['invoices'] += len(batch)
+
+    return result
+
+
+@bp.route('/invoices/import', methods=['POST'])
+def import_invoices_upload():
+    upload = request.files.get('file')
+    if not upload:
+        abort(400, "file is required")
+
+    fmt = request.form.get('format') or invoice_import.detect_format(upload.filename)
+    if fmt not in invoice_import.READERS:
+        abort(400, f"format must be one of {', '.join(invoice_import.READERS)}")
+    batch_size = request.form.get('batch_size', IMPORT_BATCH_SIZE, type=int)
+
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    result = import_invoices(invoice_import.READERS[fmt](stream), batch_size=batch_size)
+    return jsonify(result)
+
+
+@bp.cli.command('import-invoices')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(sorted(invoice_import.READERS)),
+              help='Defaults to the file extension')
+@click.option('--batch-size', type=int, default=IMPORT_BATCH_SIZE, show_default=True,
+              help='Invoices per transaction')
+def import_invoices_command(path, fmt, batch_size):
+    """Import historical invoices from a CSV or JSONL file."""
+    fmt = fmt or invoice_import.detect_format(path)
+
+    started = time.perf_counter()
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        result = import_invoices(invoice_import.READERS[fmt](f), batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    for error in result['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    if result['error_count'] > len(result['errors']):
+        click.echo(f"... {result['error_count'] - len(result['errors'])} more errors", err=True)
+
+    click.echo(
+        f"Imported {result['invoices']} invoices / {result['items']} line items "
+        f"in {elapsed:.1f}s ({result['items'] / elapsed if elapsed else 0:.0f} items/s), "
+        f"{result['error_count']} bad rows"
+    )
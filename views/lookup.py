@@ -0,0 +1,106 @@
+"""Typeahead lookups and full-text search."""
+import time
+
+import click
+from flask import Blueprint, abort, jsonify, request, url_for
+
+import search
+from extensions import customer_index, product_index, sales_order_index
+from models import Customer, Invoice, Product, db
+
+bp = Blueprint('lookup', __name__, cli_group=None)
+
+
+# ---------------- TYPEAHEAD ----------------
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+def typeahead_response(index):
+    limit = request.args.get('limit', TYPEAHEAD_LIMIT, type=int)
+    limit = max(1, min(limit, TYPEAHEAD_MAX_LIMIT))
+    return jsonify(index.search(request.args.get('q', ''), limit))
+
+
+@bp.route('/typeahead/products')
+def typeahead_products():
+    return typeahead_response(product_index)
+
+
+@bp.route('/typeahead/customers')
+def typeahead_customers():
+    return typeahead_response(customer_index)
+
+
+@bp.route('/typeahead/sales_orders')
+def typeahead_sales_orders():
+    return typeahead_response(sales_order_index)
+
+
+# ---------------- SEARCH ----------------
+SEARCH_PAGE_SIZE = 20
+
+
+def search_hits(rows):
+    """Turn ranked (kind, id, score) rows into display dicts, one IN query per kind."""
+    ids = {kind: [ref_id for k, ref_id, _ in rows if k == kind]
+           for kind in ('invoice', 'customer', 'product')}
+
+    invoices = {i.id: i for i in Invoice.query.filter(Invoice.id.in_(ids['invoice']))} if ids['invoice'] else {}
+    customers = {c.id: c for c in Customer.query.filter(Customer.id.in_(ids['customer']))} if ids['customer'] else {}
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(ids['product']))} if ids['product'] else {}
+
+    hits = []
+    for kind, ref_id, score in rows:
+        if kind == 'invoice' and ref_id in invoices:
+            invoice = invoices[ref_id]
+            title = invoice.invoice_no or f"Invoice {invoice.id}"
+            subtitle = f"{invoice.customer_name} · ₹{invoice.amount:.2f} · {invoice.status}"
+            url = url_for('invoices.edit_invoice', id=ref_id)
+        elif kind == 'customer' and ref_id in customers:
+            customer = customers[ref_id]
+            title = customer.customer_name
+            subtitle = customer.customer_gstin
+            url = url_for('customers.edit_customer', id=ref_id)
+        elif kind == 'product' and ref_id in products:
+            product = products[ref_id]
+            title = product.name
+            subtitle = f"₹{(product.price or 0):.2f}"
+            url = url_for('products.edit_product', id=ref_id)
+        else:
+            continue  # deleted since the match
+        hits.append({
+            'kind': kind, 'id': ref_id, 'score': score,
+            'title': title, 'subtitle': subtitle, 'url': url,
+        })
+    return hits
+
+
+@bp.route('/search')
+def search_view():
+    if db.engine.dialect.name != 'sqlite':
+        abort(501, "Full-text search needs SQLite FTS5")
+
+    query = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    rows = search.search(
+        db.session.connection(), query,
+        limit=SEARCH_PAGE_SIZE + 1, offset=(page - 1) * SEARCH_PAGE_SIZE
+    )
+    has_more = len(rows) > SEARCH_PAGE_SIZE
+
+    return jsonify({
+        'query': query,
+        'page': page,
+        'results': search_hits(rows[:SEARCH_PAGE_SIZE]),
+        'next_page': page + 1 if has_more else None,
+    })
+
+
+@bp.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Refill the full-text search indexes from the base tables."""
+    started = time.perf_counter()
+    search.rebuild(db.session.connection())
+    db.session.commit()
+    click.echo(f"Rebuilt search indexes in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,163 @@
+"""Payments against invoices, and the paid-total consistency check."""
+from datetime import datetime
+
+import click
+from flask import Blueprint, abort, redirect, render_template, request, url_for
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.exc import StaleDataError
+
+from extensions import pdf_cache
+from ledger import (adjust_receivables, apply_invoice_rollups, apply_payment_to_invoice, bump_rollup,
+                    generate_payment_no, paid_total_mismatches, retry_on_conflict)
+from listing import filter_date_range, keyset_page, list_filters
+from models import Invoice, Payment, db
+
+bp = Blueprint('payments', __name__, cli_group=None)
+
+STALE_INVOICE = "The invoice kept changing while the payment was saved; try again"
+
+
+@bp.route('/payments')
+def payments():
+    filters = list_filters()
+
+    query = Payment.query.join(Payment.invoice).options(
+        contains_eager(Payment.invoice)
+    )
+    if 'status' in filters:
+        query = query.filter(Invoice.status == filters['status'])
+    if 'customer' in filters:
+        query = query.filter(Invoice.customer_name.ilike(f"%{filters['customer']}%"))
+    if 'mode' in filters:
+        query = query.filter(Payment.mode == filters['mode'])
+    query = filter_date_range(query, Payment.payment_date, filters)
+
+    page, next_cursor = keyset_page(query, Payment.payment_date, Payment.id)
+
+    return render_template(
+        'payments.html',
+        payments=page,
+        filters=filters,
+        next_cursor=next_cursor
+    )
+
+
+@bp.route('/add_payment/<int:invoice_id>', methods=['GET', 'POST'])
+def add_payment(invoice_id):
+    invoice = Invoice.query.get_or_404(invoice_id)
+
+    if request.method == 'POST':
+        amount = float(request.form['amount'])
+        mode = request.form.get('mode')
+        reference = request.form.get('reference')
+        payment_date_str = request.form.get("payment_date")
+
+        if not payment_date_str:
+           abort(400, "Payment date is required")
+
+        payment_date = datetime.strptime(payment_date_str, "%Y-%m-%d")
+
+
+        if amount <= 0:
+            return redirect(url_for('invoices.invoices'))
+
+        def record_payment():
+            # runs again on a fresh read of the invoice if another payment beats it
+            paid = min(amount, invoice.balance)
+
+            apply_invoice_rollups(invoice, -1)
+
+            payment = Payment(
+                payment_no=generate_payment_no(payment_date),
+                invoice_id=invoice.id,
+                customer_id=invoice.customer_id,
+                amount=paid,
+                mode=mode,
+                reference=reference,
+                payment_date=payment_date   # 🔥 USE USER DATE
+
+            )
+
+            db.session.add(payment)
+
+            # update receivables (walk-in invoices have none)
+            adjust_receivables(invoice.customer_id, -paid)
+
+            # update paid total and invoice status (fails if the invoice changed)
+            apply_payment_to_invoice(invoice, paid)
+
+            bump_rollup('payments', payment_date, paid)
+            apply_invoice_rollups(invoice)
+
+        try:
+            retry_on_conflict(record_payment)
+        except StaleDataError:
+            abort(409, STALE_INVOICE)
+        pdf_cache.invalidate(invoice_id)
+        return redirect(url_for('invoices.invoices'))
+    
+
+    return render_template('add_payment.html', invoice=invoice)
+
+@bp.route('/edit_payment/<int:id>', methods=['GET', 'POST'])
+def edit_payment(id):
+    payment = Payment.query.get_or_404(id)
+    invoice = payment.invoice
+
+    if request.method == 'POST':
+        new_amount = float(request.form['amount'])
+        mode = request.form.get('mode')
+        reference = request.form.get('reference')
+
+        def change_payment():
+            old_amount = payment.amount
+
+            # prevent overpayment
+            changed_amount = min(new_amount, invoice.balance + old_amount)
+
+            apply_invoice_rollups(invoice, -1)
+
+            payment.amount = changed_amount
+            payment.mode = mode
+            payment.reference = reference
+
+            # ---- FIX RECEIVABLES ----
+            adjust_receivables(payment.customer_id, old_amount - changed_amount)
+
+            # ---- UPDATE PAID TOTAL AND INVOICE STATUS ----
+            apply_payment_to_invoice(invoice, changed_amount - old_amount)
+
+            bump_rollup('payments', payment.payment_date, changed_amount - old_amount)
+            apply_invoice_rollups(invoice)
+
+        try:
+            retry_on_conflict(change_payment)
+        except StaleDataError:
+            abort(409, STALE_INVOICE)
+        pdf_cache.invalidate(invoice.id)
+        return redirect(url_for('payments.payments'))
+
+    return render_template('edit_payment.html', payment=payment)
+
+
+@bp.cli.command('check-paid-totals')
+@click.option('--fix', is_flag=True, help='Rebuild paid_total from the payments table')
+def check_paid_totals_command(fix):
+    """Compare Invoice.paid_total with the sum of its payments."""
+    mismatches = paid_total_mismatches()
+    for invoice_id, stored, actual in mismatches:
+        click.echo(f"invoice {invoice_id}: stored {stored:.2f}, payments {actual:.2f}")
+    click.echo(f"{len(mismatches)} invoice(s) out of sync")
+
+    if fix and mismatches:
+        paid = db.session.query(
+            func.coalesce(func.sum(Payment.amount), 0)
+        ).filter(Payment.invoice_id == Invoice.id).scalar_subquery()
+        Invoice.query.filter(
+            Invoice.id.in_([invoice_id for invoice_id, _, _ in mismatches])
+        ).update({Invoice.paid_total: paid, Invoice.version: Invoice.version + 1}, synchronize_session=False)
+        db.session.commit()
+        click.echo("Rebuilt paid totals")
+    elif mismatches:
+        raise SystemExit(1)
@@ -0,0 +1,180 @@
+"""
+Invoice PDFs, one at a time or in bulk as a ZIP.
+
+Neither PDF stack is imported until something is rendered: WeasyPrint
+loads in the export pool workers (or on the first HTML render here) and
+ReportLab on the first ReportLab render.
+"""
+import hashlib
+import json
+
+import click
+from flask import (Blueprint, Response, abort, current_app, make_response, render_template, request,
+                   stream_with_context)
+from jinja2 import meta
+from sqlalchemy.orm import selectinload
+
+import pdf_export
+from extensions import pdf_cache
+from listing import filter_invoices, list_filters
+from models import Invoice
+
+bp = Blueprint('pdfs', __name__, cli_group=None)
+
+
+_pdf_template_version = None
+
+
+def template_sources(env, name):
+    """Source of `name` and of every template it includes, imports or extends, by name."""
+    sources = {}
+    pending = [name]
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+        sources[name], _, _ = env.loader.get_source(env, name)
+        # names built at render time (None) cannot be followed
+        pending.extend(ref for ref in meta.find_referenced_templates(env.parse(sources[name])) if ref)
+    return sources
+
+
+def pdf_template_version():
+    global _pdf_template_version
+    if _pdf_template_version is None:
+        sources = template_sources(current_app.jinja_env, 'invoice_pdf.html')
+        _pdf_template_version = hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()
+    return _pdf_template_version
+
+
+PDF_RENDERERS = ('html', 'reportlab')
+
+
+def pdf_renderer():
+    """?renderer= if given, else the PDF_RENDERER setting."""
+    renderer = request.args.get('renderer') or current_app.config['PDF_RENDERER']
+    if renderer not in PDF_RENDERERS:
+        abort(400, f"renderer must be one of {', '.join(PDF_RENDERERS)}")
+    return renderer
+
+
+def reportlab_renderer():
+    import pdf_reportlab
+    return pdf_reportlab
+
+
+def render_invoice_pdf(invoice, renderer):
+    if renderer == 'reportlab':
+        pdf_reportlab = reportlab_renderer()
+        return pdf_reportlab.render(pdf_reportlab.invoice_data(invoice))
+    return pdf_export.render_pdf(render_template('invoice_pdf.html', invoice=invoice))
+
+
+def invoice_pdf_key(invoice, renderer='html'):
+    """Content hash of everything that goes into an invoice's PDF."""
+    if renderer == 'reportlab':
+        layout = f"reportlab-{reportlab_renderer().LAYOUT_VERSION}"
+    else:
+        layout = pdf_template_version()
+    content = {
+        'template': layout,
+        'invoice': [
+            invoice.id, invoice.invoice_no, invoice.customer_name, invoice.customer_gstin,
+            invoice.customer_address, invoice.billing_address,
+            invoice.amount, invoice.status, str(invoice.created_at), invoice.paid_total,
+        ],
+        'items': [
+            [i.id, i.product_id, i.product_name, i.quantity, i.unit_price,
+             i.gst_rate, i.taxable_value, i.cgst, i.sgst, i.igst, i.total]
+            for i in sorted(invoice.items, key=lambda i: i.id)
+        ],
+    }
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+
+@bp.route('/invoice/<int:invoice_id>/pdf')
+def invoice_pdf(invoice_id):
+    invoice = Invoice.query.get_or_404(invoice_id)
+    renderer = pdf_renderer()
+    key = invoice_pdf_key(invoice, renderer)
+
+    if key in request.if_none_match:
+        response = make_response('', 304)
+        response.set_etag(key)
+        return response
+
+    pdf = pdf_cache.get(invoice.id, key)
+    if pdf is None:
+        pdf = render_invoice_pdf(invoice, renderer)
+        pdf_cache.put(invoice.id, key, pdf)
+
+    response = make_response(pdf)
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'inline; filename=invoice_{invoice.id}.pdf'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(key)
+
+    return response
+
+
+def invoice_pdf_jobs(filters, renderer='html'):
+    """(filename, payload) for every invoice matching `filters`, oldest first."""
+    query = filter_invoices(
+        Invoice.query.options(selectinload(Invoice.items)), filters
+    ).order_by(Invoice.created_at, Invoice.id)
+
+    for invoice in query.yield_per(200):
+        if renderer == 'reportlab':
+            payload = reportlab_renderer().invoice_data(invoice)
+        else:
+            payload = render_template('invoice_pdf.html', invoice=invoice)
+        yield f"invoice_{invoice.id}.pdf", payload
+
+
+def invoice_pdfs(filters, renderer, workers):
+    """Rendered (filename, pdf_bytes) for every invoice matching `filters`."""
+    render = reportlab_renderer().render if renderer == 'reportlab' else pdf_export.render_pdf
+    return pdf_export.render_pdfs(invoice_pdf_jobs(filters, renderer), workers=workers, render=render)
+
+
+@bp.route('/invoices/export.zip')
+def export_invoice_pdfs():
+    filters = list_filters()
+    workers = request.args.get('workers', type=int)
+    renderer = pdf_renderer()
+    progress = pdf_export.Progress(current_app.logger.info, every=100)
+
+    def generate():
+        pdfs = invoice_pdfs(filters, renderer, workers)
+        yield from pdf_export.stream_zip(progress.track(pdfs))
+
+    response = Response(stream_with_context(generate()), mimetype='application/zip')
+    response.headers['Content-Disposition'] = 'attachment; filename=invoices.zip'
+    return response
+
+
+@bp.cli.command('export-invoices')
+@click.option('--output', '-o', default='invoices.zip', show_default=True)
+@click.option('--date-from', help='YYYY-MM-DD, inclusive')
+@click.option('--date-to', help='YYYY-MM-DD, inclusive')
+@click.option('--status')
+@click.option('--customer', help='Customer name fragment')
+@click.option('--workers', type=int, help='Render processes (default: CPU count)')
+@click.option('--renderer', type=click.Choice(PDF_RENDERERS), help='Default: the PDF_RENDERER setting')
+def export_invoices_command(output, date_from, date_to, status, customer, workers, renderer):
+    """Render matching invoices to PDF in parallel and write them to a ZIP."""
+    filters = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'status': status,
+        'customer': customer,
+    }
+    total = filter_invoices(Invoice.query, filters).count()
+    progress = pdf_export.Progress(click.echo, total=total)
+
+    pdfs = invoice_pdfs(filters, renderer or current_app.config['PDF_RENDERER'], workers)
+    with open(output, 'wb') as f:
+        for chunk in pdf_export.stream_zip(progress.track(pdfs)):
+            f.write(chunk)
+
+    click.echo(f"Wrote {output}")
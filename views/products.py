@@ -0,0 +1,145 @@
+"""Products, categories and stock."""
+import click
+from flask import Blueprint, abort, current_app, jsonify, redirect, render_template, request, url_for
+
+import stock
+from extensions import product_index
+from models import Category, InvoiceItem, Product, SalesOrderItem, StockMovement, db
+
+bp = Blueprint('products', __name__, cli_group=None)
+
+LOW_STOCK_LIMIT = 100
+PRODUCT_IN_USE = "The product is on invoices or sales orders and cannot be deleted"
+
+
+# Product Routes
+@bp.route('/products')
+def products():
+    all_products = Product.query.all()
+    all_categories = Category.query.all()
+    return render_template('products.html', products=all_products, categories=all_categories)
+
+@bp.route('/add_product', methods=['POST'])
+def add_product():
+    name = request.form['name']
+    description = request.form['description']
+    price = float(request.form['price'])
+    quantity = int(request.form['quantity'])
+    tax_rate = float(request.form.get('tax_rate', 0))
+    discount = float(request.form.get('discount', 0))
+    category_id = int(request.form['category_id'])
+
+    new_product = Product(
+        name=name,
+        description=description,
+        price=price,
+        quantity=quantity,
+        tax_rate=tax_rate,
+        discount=discount,
+        category_id=category_id
+    )
+    
+    db.session.add(new_product)
+    db.session.flush()
+    stock.record_movements([(new_product.id, quantity, 'opening', None)])
+    db.session.commit()
+    product_index.refresh([new_product.id])
+    return redirect(url_for('products.products'))
+
+@bp.route('/edit_product/<int:id>', methods=['GET', 'POST'])
+def edit_product(id):
+    product = Product.query.get_or_404(id)
+    categories = Category.query.all()
+    
+    if request.method == 'POST':
+        product.name = request.form['name']
+        product.description = request.form['description']
+        product.price = float(request.form['price'])
+        product.tax_rate = float(request.form.get('tax_rate', 0))
+        product.discount = float(request.form.get('discount', 0))
+        product.category_id = int(request.form['category_id'])
+        # a hand count: recorded as an adjustment, not assigned over the ledger
+        stock.set_stock(id, int(request.form['quantity']))
+
+        db.session.commit()
+        product_index.refresh([id])
+        return redirect(url_for('products.products'))
+
+    return render_template('edit_product.html', product=product, categories=categories)
+
+@bp.route('/delete_product/<int:id>', methods=['POST'])
+def delete_product(id):
+    product = Product.query.get_or_404(id)
+    if (db.session.query(InvoiceItem.id).filter_by(product_id=id).first()
+            or db.session.query(SalesOrderItem.id).filter_by(product_id=id).first()):
+        abort(409, PRODUCT_IN_USE)
+    # nothing was ever sold, so its stock ledger goes with it
+    StockMovement.query.filter_by(product_id=id).delete(synchronize_session=False)
+    db.session.delete(product)
+    db.session.commit()
+    product_index.refresh([id])
+    return redirect(url_for('products.products'))
+
+@bp.route('/products/low-stock')
+def low_stock():
+    threshold = request.args.get('threshold', current_app.config['LOW_STOCK_THRESHOLD'], type=int)
+    limit = max(1, min(request.args.get('limit', LOW_STOCK_LIMIT, type=int), LOW_STOCK_LIMIT))
+    return jsonify({
+        'threshold': threshold,
+        'products': [
+            {'id': row.id, 'name': row.name, 'quantity': row.quantity}
+            for row in stock.low_stock(threshold, limit)
+        ],
+    })
+
+
+@bp.cli.command('verify-stock')
+@click.option('--fix', is_flag=True, help='Record adjustments so the ledger matches the stock on hand')
+def verify_stock_command(fix):
+    """Check that every product's stock movements add up to its quantity."""
+    drift = stock.stock_drift()
+    for product_id, on_hand, moved in drift:
+        click.echo(f"product {product_id}: {on_hand} on hand, movements add up to {moved}")
+    click.echo(f"{len(drift)} product(s) out of sync")
+
+    if fix and drift:
+        stock.reconcile_stock()
+        db.session.commit()
+        click.echo("Recorded adjustments")
+    elif drift:
+        raise SystemExit(1)
+
+# Category Routes
+@bp.route('/categories')
+def categories():
+    all_categories = Category.query.all()
+    return render_template('categories.html', categories=all_categories)
+
+@bp.route('/add_category', methods=['POST'])
+def add_category():
+    name = request.form['name']
+    description = request.form['description']
+
+    new_category = Category(name=name, description=description)
+    db.session.add(new_category)
+    db.session.commit()
+    return redirect(url_for('products.categories'))
+
+@bp.route('/edit_category/<int:id>', methods=['GET', 'POST'])
+def edit_category(id):
+    category = Category.query.get_or_404(id)
+    
+    if request.method == 'POST':
+        category.name = request.form['name']
+        category.description = request.form['description']
+        db.session.commit()
+        return redirect(url_for('products.categories'))
+
+    return render_template('edit_category.html', category=category)
+
+@bp.route('/delete_category/<int:id>', methods=['POST'])
+def delete_category(id):
+    category = Category.query.get_or_404(id)
+    db.session.delete(category)
+    db.session.commit()
+    return redirect(url_for('products.categories'))
@@ -0,0 +1,303 @@
+"""Receivables aging, customer statements and the ledger CSV exports."""
+from datetime import date, datetime, timedelta
+from itertools import chain
+
+from flask import Blueprint, Response, abort, render_template, request, stream_with_context
+from sqlalchemy import case, cast, func, literal_column, select, union_all
+
+import csv_export
+from listing import filter_date_range, filter_invoices, list_filters, parse_date_arg
+from models import BALANCE_EPSILON, Customer, Expense, Invoice, InvoiceItem, Payment, db
+
+bp = Blueprint('reports', __name__)
+
+
+# ---------------- LEDGER EXPORTS ----------------
+def csv_response(filename, header, statement, leading=()):
+    """
+    Stream a Core select as a CSV download, gzipped when the client accepts
+    it. `leading` rows are written before the query's; with no statement
+    they are the whole file.
+    """
+    def generate():
+        rows = leading
+        if statement is not None:
+            rows = chain(leading, csv_export.stream_rows(db.session.connection(), statement))
+        chunks = csv_export.iter_csv(header, rows)
+        if use_gzip:
+            chunks = csv_export.gzip_chunks(chunks)
+        yield from chunks
+
+    use_gzip = bool(request.accept_encodings['gzip'])
+
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@bp.route('/export/invoices.csv')
+def export_invoices_csv():
+    filters = list_filters()
+    inv = Invoice.__table__
+    item = InvoiceItem.__table__
+
+    statement = filter_invoices(
+        select(
+            inv.c.id, inv.c.invoice_no, inv.c.created_at, inv.c.customer_name, inv.c.customer_gstin,
+            inv.c.billing_address, inv.c.status, inv.c.amount,
+            item.c.product_id, item.c.product_name, item.c.quantity, item.c.unit_price,
+            item.c.gst_rate, item.c.taxable_value, item.c.cgst, item.c.sgst, item.c.igst,
+            item.c.total,
+        ).select_from(inv.outerjoin(item, item.c.invoice_id == inv.c.id)),
+        filters
+    ).order_by(inv.c.created_at, inv.c.id, item.c.id)
+
+    header = [
+        'invoice_id', 'invoice_no', 'invoice_date', 'customer_name', 'customer_gstin',
+        'billing_address', 'status', 'invoice_amount',
+        'product_id', 'product_name', 'quantity', 'unit_price',
+        'gst_rate', 'taxable_value', 'cgst', 'sgst', 'igst', 'line_total',
+    ]
+    return csv_response('invoices.csv', header, statement)
+
+
+@bp.route('/export/payments.csv')
+def export_payments_csv():
+    filters = list_filters()
+    pay = Payment.__table__
+    inv = Invoice.__table__
+
+    statement = select(
+        pay.c.payment_no, pay.c.payment_date, pay.c.invoice_id, inv.c.customer_name,
+        pay.c.amount, pay.c.mode, pay.c.reference,
+    ).select_from(pay.join(inv, inv.c.id == pay.c.invoice_id))
+    if filters.get('customer'):
+        statement = statement.filter(inv.c.customer_name.ilike(f"%{filters['customer']}%"))
+    if filters.get('mode'):
+        statement = statement.filter(pay.c.mode == filters['mode'])
+    statement = filter_date_range(statement, pay.c.payment_date, filters)
+    statement = statement.order_by(pay.c.payment_date, pay.c.id)
+
+    header = ['payment_no', 'payment_date', 'invoice_id', 'customer_name', 'amount', 'mode', 'reference']
+    return csv_response('payments.csv', header, statement)
+
+
+@bp.route('/export/expenses.csv')
+def export_expenses_csv():
+    filters = list_filters()
+    exp = Expense.__table__
+
+    statement = select(
+        exp.c.id, exp.c.expense_date, exp.c.title, exp.c.category, exp.c.amount,
+        exp.c.payment_mode, exp.c.reference, exp.c.notes,
+    )
+    statement = filter_date_range(statement, exp.c.expense_date, filters)
+    statement = statement.order_by(exp.c.expense_date, exp.c.id)
+
+    header = ['id', 'expense_date', 'title', 'category', 'amount', 'payment_mode', 'reference', 'notes']
+    return csv_response('expenses.csv', header, statement)
+
+
+# ---------------- RECEIVABLES AGING ----------------
+AGING_BUCKETS = ('0-30', '31-60', '61-90', '90+')
+AGING_HEADER = ['customer_name', 'customer_gstin', 'invoices', *AGING_BUCKETS, 'total']
+
+
+def money(expression):
+    # round() on a float needs a NUMERIC argument in PostgreSQL
+    return func.round(cast(expression, db.Numeric), 2, type_=db.Float)
+
+
+def aging_as_of():
+    as_of = parse_date_arg(request.args, 'as_of')
+    return as_of.date() if as_of else date.today()
+
+
+def aging_statement(as_of):
+    """
+    One grouped query: balance of every invoice as of `as_of` (amount minus
+    payments made up to that day), summed per customer into age buckets.
+    Invoices not linked to a customer are grouped by their printed name
+    and GSTIN.
+    """
+    inv = Invoice.__table__
+    cust = Customer.__table__
+    pay = Payment.__table__
+    day_end = datetime.combine(as_of, datetime.min.time()) + timedelta(days=1)
+
+    paid = select(
+        pay.c.invoice_id, func.sum(pay.c.amount).label('paid')
+    ).where(
+        pay.c.payment_date < day_end
+    ).group_by(pay.c.invoice_id).subquery()
+
+    balance = inv.c.amount - func.coalesce(paid.c.paid, 0)
+
+    # an invoice dated on day_end - n days is n - 1 days old
+    def aged_within(days):
+        return inv.c.created_at >= day_end - timedelta(days=days + 1)
+
+    age_bucket = case(
+        (aged_within(30), AGING_BUCKETS[0]),
+        (aged_within(60), AGING_BUCKETS[1]),
+        (aged_within(90), AGING_BUCKETS[2]),
+        else_=AGING_BUCKETS[3]
+    )
+    bucket_sums = [
+        func.sum(case((age_bucket == bucket, balance), else_=0)).label(f'bucket{n}')
+        for n, bucket in enumerate(AGING_BUCKETS)
+    ]
+
+    # group on the invoice's own columns, then look up the customer's details
+    unlinked_name = case((inv.c.customer_id.is_(None), inv.c.customer_name))
+    unlinked_gstin = case((inv.c.customer_id.is_(None), inv.c.customer_gstin))
+    owed = select(
+        inv.c.customer_id,
+        unlinked_name.label('customer_name'),
+        unlinked_gstin.label('customer_gstin'),
+        func.count().label('invoices'),
+        *bucket_sums,
+        func.sum(balance).label('total'),
+    ).select_from(
+        inv.outerjoin(paid, paid.c.invoice_id == inv.c.id)
+    ).where(
+        inv.c.created_at < day_end,
+        balance > BALANCE_EPSILON
+    ).group_by(
+        inv.c.customer_id, unlinked_gstin, unlinked_name
+    ).subquery('owed')
+
+    return select(
+        func.coalesce(cust.c.customer_name, owed.c.customer_name).label('customer_name'),
+        func.coalesce(cust.c.customer_gstin, owed.c.customer_gstin).label('customer_gstin'),
+        owed.c.invoices,
+        *(money(owed.c[f'bucket{n}']) for n in range(len(AGING_BUCKETS))),
+        money(owed.c.total).label('total'),
+    ).select_from(
+        owed.outerjoin(cust, cust.c.id == owed.c.customer_id)
+    ).order_by(
+        owed.c.total.desc()
+    )
+
+
+@bp.route('/reports/aging')
+def aging_report():
+    as_of = aging_as_of()
+    rows = db.session.execute(aging_statement(as_of)).all()
+    totals = [round(sum(row[i] for row in rows), 2) for i in range(3, len(AGING_HEADER))]
+
+    return render_template(
+        'aging.html',
+        rows=rows,
+        totals=totals,
+        buckets=AGING_BUCKETS,
+        as_of=as_of
+    )
+
+
+@bp.route('/export/aging.csv')
+def export_aging_csv():
+    as_of = aging_as_of()
+    return csv_response(f'aging-{as_of.isoformat()}.csv', AGING_HEADER, aging_statement(as_of))
+
+
+# ---------------- CUSTOMER STATEMENT ----------------
+STATEMENT_HEADER = ['date', 'type', 'document', 'invoice_no', 'debit', 'credit', 'balance']
+STATEMENT_FORMATS = ('csv', 'pdf')
+
+
+def statement_entries(customer_id, narrow):
+    """
+    A customer's invoices and the payments against them as one UNION ALL:
+    kind 0 rows are invoices (debits), kind 1 rows payments (credits).
+    `narrow(select, date_column)` restricts each side to a date range, so
+    both can use their date indexes.
+    """
+    inv = Invoice.__table__
+    pay = Payment.__table__
+    invoice_no = func.coalesce(inv.c.invoice_no, cast(inv.c.id, db.String))
+
+    invoices = narrow(select(
+        inv.c.created_at.label('entry_date'),
+        literal_column('0').label('kind'),
+        inv.c.id.label('doc_id'),
+        invoice_no.label('document'),
+        invoice_no.label('invoice_no'),
+        inv.c.amount.label('amount'),
+    ).where(inv.c.customer_id == customer_id), inv.c.created_at)
+
+    payments = narrow(select(
+        pay.c.payment_date, literal_column('1'), pay.c.id, pay.c.payment_no, invoice_no, pay.c.amount,
+    ).select_from(
+        pay.join(inv, inv.c.id == pay.c.invoice_id)
+    ).where(inv.c.customer_id == customer_id), pay.c.payment_date)
+
+    return union_all(invoices, payments).subquery('entries')
+
+
+def signed(entries):
+    return case((entries.c.kind == 0, entries.c.amount), else_=-entries.c.amount)
+
+
+def statement_opening(customer_id, date_from):
+    """Balance brought forward: everything dated before date_from."""
+    if date_from is None:
+        return 0.0
+    entries = statement_entries(customer_id, lambda query, column: query.where(column < date_from))
+    return db.session.execute(select(money(func.coalesce(func.sum(signed(entries)), 0)))).scalar()
+
+
+def statement_lines(customer_id, filters, opening):
+    """
+    The statement lines in date order, invoices before payments on the same
+    day. The running balance is a window SUM in the database, so rows can be
+    streamed straight to the response.
+    """
+    entries = statement_entries(
+        customer_id, lambda query, column: filter_date_range(query, column, filters)
+    )
+    day = func.date(entries.c.entry_date)
+    order = (day, entries.c.kind, entries.c.entry_date, entries.c.doc_id)
+    running = func.sum(signed(entries)).over(order_by=order, rows=(None, 0))
+
+    return select(
+        day,
+        case((entries.c.kind == 0, 'Invoice'), else_='Payment'),
+        entries.c.document,
+        case((entries.c.kind == 1, entries.c.invoice_no)),
+        case((entries.c.kind == 0, entries.c.amount)),
+        case((entries.c.kind == 1, entries.c.amount)),
+        money(opening + running),
+    ).order_by(*order)
+
+
+@bp.route('/customers/<int:id>/statement')
+def customer_statement(id):
+    customer = Customer.query.get_or_404(id)
+    filters = list_filters()
+    fmt = request.args.get('format', 'csv')
+    if fmt not in STATEMENT_FORMATS:
+        abort(400, f"format must be one of {', '.join(STATEMENT_FORMATS)}")
+
+    date_from = parse_date_arg(filters, 'date_from')
+    date_to = parse_date_arg(filters, 'date_to')
+    opening = statement_opening(customer.id, date_from)
+    statement = statement_lines(customer.id, filters, opening)
+    filename = f"statement-{customer.id}"
+
+    if fmt == 'csv':
+        opening_row = (date_from.date() if date_from else '', 'Opening balance', '', '', '', '', opening)
+        return csv_response(f'{filename}.csv', STATEMENT_HEADER, statement, leading=[opening_row])
+
+    import pdf_statement
+
+    def generate():
+        rows = csv_export.stream_rows(db.session.connection(), statement)
+        yield from pdf_statement.render(customer, date_from, date_to, opening, rows)
+
+    response = Response(stream_with_context(generate()), mimetype='application/pdf')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.pdf'
+    return response
@@ -0,0 +1,96 @@
+"""GSTR-1 style GST summaries and the rollup check behind them."""
+from datetime import date, datetime, timedelta
+
+import click
+from flask import Blueprint, render_template, request
+
+import sequences
+from gst_returns import (B2B_INVOICE_HEADER, b2b_invoices_statement, b2b_summary, gst_rollup_drift,
+                         rate_summary, rebuild_gst_rollups)
+from listing import parse_date_arg
+from views.reports import csv_response
+
+bp = Blueprint('returns', __name__, cli_group=None)
+
+RATE_HEADER = ['gst_rate', 'inter_state', 'taxable_value', 'cgst', 'sgst', 'igst', 'total_tax']
+
+
+def fiscal_year_start(day):
+    year = day.year if day.month >= sequences.FISCAL_YEAR_START_MONTH else day.year - 1
+    return date(year, sequences.FISCAL_YEAR_START_MONTH, 1)
+
+
+def return_period():
+    """date_from / date_to from the query string, by default this financial year to date."""
+    date_from = parse_date_arg(request.args, 'date_from')
+    date_to = parse_date_arg(request.args, 'date_to')
+    date_from = date_from.date() if date_from else fiscal_year_start(date.today())
+    date_to = date_to.date() if date_to else date.today()
+    return date_from, date_to
+
+
+def period_bounds(date_from, date_to):
+    # half-open [date_from, date_to + 1 day), like filter_date_range
+    start = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    end = datetime.combine(date_to, datetime.min.time()) + timedelta(days=1) if date_to else None
+    return start, end
+
+
+@bp.route('/reports/gstr1')
+def gstr1_report():
+    date_from, date_to = return_period()
+    start, end = period_bounds(date_from, date_to)
+
+    b2b = rate_summary(start, end, b2b=True)
+    b2c = rate_summary(start, end, b2b=False)
+    return render_template(
+        'gstr1.html',
+        b2b=b2b,
+        b2c=b2c,
+        by_gstin=b2b_summary(start, end),
+        totals=[round(sum(row[i] for row in b2b + b2c), 2) for i in range(2, len(RATE_HEADER))],
+        date_from=date_from,
+        date_to=date_to
+    )
+
+
+@bp.route('/export/gstr1-rates.csv')
+def export_gstr1_rates_csv():
+    date_from, date_to = return_period()
+    start, end = period_bounds(date_from, date_to)
+
+    rows = [('B2B', *row) for row in rate_summary(start, end, b2b=True)]
+    rows += [('B2C', *row) for row in rate_summary(start, end, b2b=False)]
+    return csv_response(
+        f'gstr1-rates-{date_from.isoformat()}-{date_to.isoformat()}.csv',
+        ['section', *RATE_HEADER], None, leading=rows
+    )
+
+
+@bp.route('/export/gstr1-b2b.csv')
+def export_gstr1_b2b_csv():
+    date_from, date_to = return_period()
+    return csv_response(
+        f'gstr1-b2b-{date_from.isoformat()}-{date_to.isoformat()}.csv',
+        B2B_INVOICE_HEADER, b2b_invoices_statement(*period_bounds(date_from, date_to))
+    )
+
+
+@bp.cli.command('verify-gst-rollups')
+@click.option('--date-from', type=click.DateTime(formats=['%Y-%m-%d']), help='First invoice date')
+@click.option('--date-to', type=click.DateTime(formats=['%Y-%m-%d']), help='Last invoice date')
+@click.option('--fix', is_flag=True, help='Rebuild the rollups of the period from invoice_item')
+def verify_gst_rollups_command(date_from, date_to, fix):
+    """Cross-check the GST return rollups against the invoice line items."""
+    start, end = period_bounds(date_from and date_from.date(), date_to and date_to.date())
+    drift = gst_rollup_drift(start, end)
+    for table, key, have, want in drift:
+        key = ', '.join(str(part) for part in key)
+        click.echo(f"{table} ({key}): stored {have}, expected {want} (paise: taxable, cgst, sgst, igst)")
+    click.echo(f"{len(drift)} GST rollup row(s) out of sync")
+
+    if fix and drift:
+        rebuild_gst_rollups(start, end)
+        click.echo("Rebuilt GST rollups")
+    elif drift:
+        raise SystemExit(1)
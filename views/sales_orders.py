@@ -0,0 +1,92 @@
+"""Sales orders."""
+from datetime import datetime
+
+from flask import Blueprint, abort, redirect, render_template, request, url_for
+from sqlalchemy import insert
+from sqlalchemy.orm import contains_eager, selectinload
+
+from extensions import sales_order_index
+from ledger import bump_rollup, generate_so_number
+from listing import filter_date_range, keyset_page, list_filters
+from models import Customer, Product, SalesOrder, SalesOrderItem, db
+
+bp = Blueprint('sales_orders', __name__)
+
+
+@bp.route('/sales_orders')
+def sales_orders():
+    filters = list_filters()
+
+    query = SalesOrder.query.join(SalesOrder.customer).options(
+        contains_eager(SalesOrder.customer),
+        selectinload(SalesOrder.items)
+    )
+    if 'status' in filters:
+        query = query.filter(SalesOrder.status == filters['status'])
+    if 'customer' in filters:
+        query = query.filter(Customer.customer_name.ilike(f"%{filters['customer']}%"))
+    query = filter_date_range(query, SalesOrder.order_date, filters)
+
+    orders, next_cursor = keyset_page(query, SalesOrder.order_date, SalesOrder.id)
+
+    return render_template(
+        'sales_orders.html',
+        orders=orders,
+        filters=filters,
+        next_cursor=next_cursor
+    )
+
+@bp.route('/add_sales_order', methods=['POST'])
+def add_sales_order():
+    customer_id = request.form['customer_id']
+    po_number = request.form['customer_po_number']
+
+    product_ids = request.form.getlist('product_id[]')
+    quantities = request.form.getlist('quantity[]')
+    prices = request.form.getlist('price[]')
+
+    try:
+        lines = [
+            (int(pid), int(qty), float(price))
+            for pid, qty, price in zip(product_ids, quantities, prices)
+        ]
+    except ValueError:
+        abort(400, "Invalid product, quantity or price")
+
+    products = {
+        p.id: p
+        for p in Product.query.filter(Product.id.in_({pid for pid, _, _ in lines})).all()
+    }
+    if any(pid not in products for pid, _, _ in lines):
+        abort(400, "Unknown product")
+
+    order_date = datetime.utcnow()
+    so = SalesOrder(
+        so_number=generate_so_number(order_date),
+        customer_po_number=po_number,
+        customer_id=customer_id,
+        order_date=order_date
+    )
+
+    db.session.add(so)
+    db.session.flush()
+
+    item_rows = [
+        {
+            'sales_order_id': so.id,
+            'product_id': pid,
+            'product_name': products[pid].name,
+            'ordered_qty': qty,
+            'invoiced_qty': 0,
+            'unit_price': price,
+        }
+        for pid, qty, price in lines
+    ]
+    if item_rows:
+        db.session.execute(insert(SalesOrderItem.__table__), item_rows)
+
+    bump_rollup('orders', so.order_date, sum(qty * price for _, qty, price in lines))
+
+    db.session.commit()
+    sales_order_index.refresh([so.id])
+    return redirect(url_for('sales_orders.sales_orders'))